@@ -1,16 +1,21 @@
+import io
+
 from django import forms
 from django.conf import settings
 from django.contrib import admin, messages
-from django.http import HttpResponseRedirect
-from django.urls import reverse
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import path, reverse
 from django.utils.html import format_html
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 from django_admin_row_actions import AdminRowActionsMixin
 from django_object_actions import DjangoObjectActions
 
-from . import jobs
+from . import catalog, jobs
 from .filters import ErrorCodeFilter
-from .models import Content, SourceType
+from .models import Content, SourceType, StatusCounter
 
 
 class ContentForm(forms.ModelForm):
@@ -21,6 +26,14 @@ class ContentForm(forms.ModelForm):
             self.initial['content'] = self.instance.content.replace('\n', '<br/>')
 
 
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(label='File', help_text='Catalogo in formato JSONL o CSV, come esportato')
+    format = forms.ChoiceField(
+        label='Formato', required=False,
+        choices=[('', "dall'estensione del file")] + [(f, f.upper()) for f in catalog.FORMATS]
+    )
+
+
 class ContentAdmin(DjangoObjectActions, AdminRowActionsMixin, admin.ModelAdmin):
     form = ContentForm
     list_display = (
@@ -28,7 +41,8 @@ class ContentAdmin(DjangoObjectActions, AdminRowActionsMixin, admin.ModelAdmin):
         'verified_at', '_status_and_message',
         'is_verification_enabled', 'use_proxy', 'use_cleaner'
     )
-    search_fields = ('title', 'notes', 'verification_error', 'verification_status', 'url')
+    # searched through the full-text index, see get_search_results
+    search_fields = ('title', 'url', 'notes', 'verification_error', 'content')
     list_filter = (
         'verification_status', ErrorCodeFilter,
         'source_type', 'is_verification_enabled',
@@ -44,13 +58,24 @@ class ContentAdmin(DjangoObjectActions, AdminRowActionsMixin, admin.ModelAdmin):
             ),
         }),
         ('Verification', {
-            'fields': ('is_verification_enabled', 'verified_at', 'verification_status', 'verification_error')
+            'fields': (
+                'is_verification_enabled', 'trace_next_verification',
+                'verified_at', 'verification_status', 'verification_error',
+                'status_code', 'response_time', 'final_url', 'fingerprint', 'claimed_by', 'claimed_until'
+            )
         })
     )
     readonly_fields = (
-        'content', 'verified_at', 'verification_status', 'verification_error'
+        'content', 'verified_at', 'verification_status', 'verification_error',
+        'status_code', 'response_time', 'final_url', 'fingerprint', 'claimed_by', 'claimed_until'
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search the words in the full-text index of the contents, instead of scanning the fields"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+
     def _linked_title(self, obj):
         return mark_safe(
             '{o.title} <a href="{o.url}" target="_blank"><img '
@@ -119,10 +144,126 @@ class ContentAdmin(DjangoObjectActions, AdminRowActionsMixin, admin.ModelAdmin):
             obj.save()
     enable_objects.short_description = "Abilita verifica"
 
+    def trace_objects(self, request, objects):  # noqa
+        for obj in objects:
+            obj.trace_next_verification = True
+            obj.save()
+    trace_objects.short_description = "Traccia la prossima verifica"
+
     change_form_template = "admin/content_change_form.html"
     save_on_top = True
 
-    actions = [verify_queryset, update_queryset, disable_objects, enable_objects]
+    actions = [verify_queryset, update_queryset, disable_objects, enable_objects, trace_objects]
+
+    # catalog export and import, as changelist tools
+    def export_jsonl(self, request, queryset):
+        return self._export_response(queryset, 'jsonl')
+    export_jsonl.label = "Esporta (JSONL)"
+
+    def export_csv(self, request, queryset):
+        return self._export_response(queryset, 'csv')
+    export_csv.label = "Esporta (CSV)"
+
+    def import_catalog(self, request, queryset):  # noqa
+        return HttpResponseRedirect(reverse('admin:websourcemonitor_content_import'))
+    import_catalog.label = "Importa"
+
+    def show_dashboard(self, request, queryset):  # noqa
+        return HttpResponseRedirect(reverse('admin:websourcemonitor_content_dashboard'))
+    show_dashboard.label = "Riepilogo"
+
+    changelist_actions = ('show_dashboard', 'export_jsonl', 'export_csv', 'import_catalog')
+
+    @staticmethod
+    def _export_response(queryset, output_format):
+        """Stream the catalog of the contents, read from the db in chunks"""
+        response = StreamingHttpResponse(
+            catalog.dump(catalog.export_rows(queryset), output_format),
+            content_type=f"{catalog.CONTENT_TYPES[output_format]}; charset=utf-8"
+        )
+        response['Content-Disposition'] = f'attachment; filename="contenuti.{output_format}"'
+        return response
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='websourcemonitor_content_import'),
+            path(
+                'dashboard/', self.admin_site.admin_view(self.dashboard_view), name='websourcemonitor_content_dashboard'
+            ),
+        ] + super().get_urls()
+
+    def dashboard_view(self, request):
+        """Contents by source type and verification status, from the status counters,
+        with no query over the contents; each count links to the filtered contents"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        statuses = StatusCounter._meta.get_field('verification_status').choices
+        counts, source_types = {}, {}
+        for counter in StatusCounter.objects.select_related('source_type'):
+            counts[counter.source_type_id, counter.verification_status] = counter.count
+            source_types[counter.source_type_id] = counter.source_type
+
+        changelist_url = reverse('admin:websourcemonitor_content_changelist')
+
+        def cell(source_type_id, status):
+            count = counts.get((source_type_id, status), 0)
+            params = {'verification_status__isnull': 'True'} if status == StatusCounter.NOT_VERIFIED else {
+                'verification_status__exact': status
+            }
+            params['source_type__id__exact'] = source_type_id
+            return count, f"{changelist_url}?{urlencode(params)}"
+
+        rows = [
+            (source_type, [cell(source_type.id, status) for status, _ in statuses])
+            for source_type in sorted(source_types.values(), key=lambda t: t.name)
+        ]
+        return render(
+            request,
+            "admin/content_dashboard.html",
+            context=dict(
+                self.admin_site.each_context(request), opts=self.opts, title="Riepilogo dei contenuti",
+                statuses=statuses, rows=[
+                    (source_type, cells, sum(count for count, _ in cells)) for source_type, cells in rows
+                ],
+                totals=[sum(cells[n][0] for _, cells in rows) for n in range(len(statuses))],
+                total=sum(counts.values()),
+            )
+        )
+
+    def import_view(self, request):
+        """Upload a catalog of contents, created or updated in batches (see `websourcemonitor.catalog`)"""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        if request.method == 'POST':
+            form = CatalogImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                input_format = form.cleaned_data['format'] or catalog.guess_format(upload.name)
+                errors = []
+                stats = catalog.import_rows(
+                    catalog.read(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), input_format),
+                    on_error=lambda number, message: errors.append(f"riga {number}: {message}")
+                )
+                self.message_user(
+                    request,
+                    "Contenuti creati: {created}, aggiornati: {updated}, invariati: {unchanged}; "
+                    "tipi di fonte creati: {source_types}".format(**stats),
+                    messages.SUCCESS
+                )
+                if errors:
+                    shown = errors[:10] + ([f"... e altri {len(errors) - 10}"] if len(errors) > 10 else [])
+                    self.message_user(
+                        request, f"Righe scartate: {len(errors)} - " + "; ".join(shown), messages.WARNING
+                    )
+                return HttpResponseRedirect(reverse('admin:websourcemonitor_content_changelist'))
+        else:
+            form = CatalogImportForm()
+
+        return render(
+            request,
+            "admin/content_import.html",
+            context=dict(self.admin_site.each_context(request), opts=self.opts, form=form, title="Importa contenuti")
+        )
 
     def get_row_actions(self, obj):
         row_actions = [
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class WebappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'websourcemonitor'
+
+    def ready(self):
+        from . import search
+
+        connection_created.connect(search.register_functions)
+        post_migrate.connect(search.restore_triggers, sender=self)
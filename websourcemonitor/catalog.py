@@ -0,0 +1,258 @@
+"""Bulk import and export of the contents' catalog, as JSONL or CSV.
+
+The catalog holds the configuration of the sources (title, type, url, selector, options),
+not their verification state. Both directions stream: exports are generators of lines,
+read from the db in chunks, and imports read the lines one by one, writing them in batches,
+so that memory does not grow with the size of the catalog.
+
+Imported rows are matched to the existing contents by `(url, selector)`: matching contents
+are updated, the others created; source types are referred to by name, and created when missing.
+"""
+import csv
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .conf import CATALOG_BATCH_SIZE
+from .models import Content, ContentSearch, SourceType, StatusCounter
+
+# the columns of the catalog, in order; source_type is the name of the type
+FIELDS = (
+    'title', 'source_type', 'url', 'selector', 'op_url', 'notes',
+    'is_verification_enabled', 'use_cleaner', 'use_proxy', 'browser', 'timeout',
+    'scraping_class', 'dati_specifici',
+)
+REQUIRED_FIELDS = ('title', 'source_type', 'url')
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+_TRUE = ('1', 'true', 't', 'yes', 'y', 'si', 'sì')
+_FALSE = ('0', 'false', 'f', 'no', 'n', '')
+
+
+def guess_format(filename: str, default: str = 'jsonl') -> str:
+    """Return the format of the catalog file, from its extension."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else default
+
+
+# export
+
+def export_rows(contents: models.QuerySet, chunk_size: int = CATALOG_BATCH_SIZE) -> Iterator[dict]:
+    """Yield the catalog rows of the contents, reading them from the db `chunk_size` at a time."""
+    columns = ['source_type__name' if f == 'source_type' else f for f in FIELDS]
+    for values in contents.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size):
+        yield dict(zip(FIELDS, values))
+
+
+def dump_jsonl(rows: Iterable[dict]) -> Iterator[str]:
+    """Yield the rows as lines of JSON."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """A file-like object returning what is written, for `csv.writer` to format single lines."""
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+def dump_csv(rows: Iterable[dict]) -> Iterator[str]:
+    """Yield the rows as lines of CSV, after the header; `dati_specifici` is JSON encoded."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row['dati_specifici'] = json.dumps(row['dati_specifici'], ensure_ascii=False) if row['dati_specifici'] else ''
+        yield writer.writerow(['' if row[f] is None else row[f] for f in FIELDS])
+
+
+def dump(rows: Iterable[dict], output_format: str) -> Iterator[str]:
+    return dump_csv(rows) if output_format == 'csv' else dump_jsonl(rows)
+
+
+# import
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """Yield `(line number, row)` for the non-empty lines; rows that are not valid JSON objects
+    are yielded as `ValidationError`s."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValidationError(f"invalid JSON: {e}")
+            continue
+        yield number, row if isinstance(row, dict) else ValidationError("not a JSON object")
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """Yield `(line number, row)` for the records after the header."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read(lines: Iterable[str], input_format: str) -> Iterator[Tuple[int, object]]:
+    return read_csv(lines) if input_format == 'csv' else read_jsonl(lines)
+
+
+def _clean(row: dict) -> dict:
+    """Return the values of the known fields of the row, converted from their text form (CSV)."""
+    values = {}
+    for name in FIELDS:
+        if name not in row:
+            continue
+        value = row[name]
+        if name == 'source_type':
+            values[name] = str(value or '').strip()
+            continue
+        field = Content._meta.get_field(name)
+        if isinstance(value, str):
+            if isinstance(field, models.BooleanField):
+                if value.strip().lower() not in _TRUE + _FALSE:
+                    raise ValidationError({name: f"not a boolean: {value}"})
+                value = value.strip().lower() in _TRUE
+            elif isinstance(field, models.JSONField):
+                try:
+                    value = json.loads(value) if value.strip() else None
+                except ValueError as e:
+                    raise ValidationError({name: f"invalid JSON: {e}"})
+            elif value == '' and field.null:
+                value = None
+        if value is None and not field.null:
+            value = field.get_default()
+        values[name] = field.to_python(value)
+    missing = [name for name in REQUIRED_FIELDS if not values.get(name)]
+    if missing:
+        raise ValidationError({name: "required" for name in missing})
+    values['selector'] = values.get('selector') or ''
+    return values
+
+
+def _source_types(names) -> Tuple[Dict[str, SourceType], int]:
+    """Map the names to their source types, with one query, creating the missing ones.
+
+    :return: the map, and the number of created types
+    """
+    types = {}
+    # the oldest type wins, among homonyms
+    for source_type in SourceType.objects.filter(name__in=names).order_by('-id'):
+        types[source_type.name] = source_type
+    missing = [SourceType(name=name, slug=slugify(name)) for name in sorted(set(names) - set(types))]
+    if missing:
+        SourceType.objects.bulk_create(missing)
+        # bulk_create returns no primary keys on some dbs (mysql, sqlite before Django 4): read them back by name
+        if any(source_type.pk is None for source_type in missing):
+            missing = SourceType.objects.filter(name__in=[source_type.name for source_type in missing])
+        for source_type in missing:
+            types[source_type.name] = source_type
+    return types, len(missing)
+
+
+def _message(error: ValidationError) -> str:
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f"{name}: {', '.join(messages)}" for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def _import_batch(batch: List[Tuple[int, dict]], stats: dict, on_error: Callable[[int, str], None]):
+    """Create or update the contents of a batch of rows, with a few queries."""
+    types, created_types = _source_types({values['source_type'] for _, values in batch})
+    stats['source_types'] += created_types
+
+    existing = {}
+    # the oldest content wins, among duplicates
+    urls = {values['url'] for _, values in batch}
+    for content in Content.objects.filter(url__in=urls).select_related('source_type').order_by('-id'):
+        existing[(content.url, content.selector)] = content
+
+    created, updated, changed_fields = {}, {}, set()
+    for number, values in batch:
+        values['source_type'] = types[values['source_type']]
+        candidate = Content(**values)
+        try:
+            candidate.clean_fields(
+                exclude=[f.name for f in Content._meta.fields if f.name not in values or f.name == 'source_type']
+            )
+        except ValidationError as e:
+            on_error(number, _message(e))
+            continue
+
+        key = (values['url'], values['selector'])
+        content = created.get(key) or updated.get(key) or existing.get(key)
+        if content is None:
+            created[key] = candidate
+            continue
+        changes = {name for name, value in values.items() if getattr(content, name) != value}
+        for name in changes:
+            setattr(content, name, values[name])
+        if key in created or key in updated:
+            # the same content in an earlier row of the batch
+            changed_fields |= changes
+        elif changes:
+            updated[key] = content
+            changed_fields |= changes
+        else:
+            stats['unchanged'] += 1
+
+    with transaction.atomic():
+        Content.objects.bulk_create(created.values())
+        if any(content.pk is None for content in created.values()):
+            # bulk_create returns no primary keys on some dbs: read them back by (url, selector),
+            # no other content has those, as they were not found among the existing ones
+            for pk, url, selector in Content.objects.filter(url__in={url for url, _ in created}).values_list(
+                'pk', 'url', 'selector'
+            ):
+                if (url, selector) in created:
+                    created[(url, selector)].pk = pk
+        if updated:
+            # bulk_update skips auto_now fields
+            modified_at = timezone.now()
+            for content in updated.values():
+                content.modified_at = modified_at
+            Content.objects.bulk_update(updated.values(), sorted(changed_fields | {'modified_at'}))
+        ContentSearch.objects.index(list(created.values()) + list(updated.values()))
+        StatusCounter.objects.record(list(created.values()) + list(updated.values()))
+    stats['created'] += len(created)
+    stats['updated'] += len(updated)
+
+
+def import_rows(rows: Iterable[Tuple[int, object]], batch_size: int = CATALOG_BATCH_SIZE,
+                on_error: Optional[Callable[[int, str], None]] = None) -> dict:
+    """Create or update the contents of the catalog rows (as yielded by `read`),
+    upserting them by `(url, selector)`, `batch_size` rows at a time.
+
+    Invalid rows are skipped, and reported to `on_error(line number, message)`.
+
+    :return: the counts of created, updated, unchanged contents, created source types, and errors
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'source_types': 0, 'errors': 0}
+
+    def error(number, message):
+        stats['errors'] += 1
+        if on_error is not None:
+            on_error(number, message)
+
+    batch = []
+    for number, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            batch.append((number, _clean(row)))
+        except ValidationError as e:
+            error(number, _message(e))
+            continue
+        if len(batch) >= batch_size:
+            _import_batch(batch, stats, error)
+            batch = []
+    if batch:
+        _import_batch(batch, stats, error)
+    return stats
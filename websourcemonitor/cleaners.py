@@ -0,0 +1,139 @@
+"""Text cleaners.
+
+The textual content extracted from a page is normalised by a pipeline of cleaners,
+before being compared with the stored one.
+
+Each cleaner is a regular expression, with its replacement (a string or a callable);
+all cleaners of a pipeline are compiled into a single alternation,
+so that the text is scanned only once, whatever the number of cleaners.
+
+Cleaners are registered by name, with `register_cleaner`;
+the `CLEANERS` setting lists the names of the cleaners used by the default pipeline,
+in order of precedence.
+"""
+import hashlib
+import re
+from typing import Callable, Iterable, Union
+
+from .conf import CLEANERS
+
+# fragments are joined with this separator, so that the pipeline can run once
+# on the whole text, and still tell the fragments apart
+FRAGMENT_SEPARATOR = "\x00"
+
+# characters stripped from both ends of each fragment
+FRAGMENT_STRIP_CHARS = "- \n\t"
+
+_registry = {}
+
+
+def register_cleaner(name: str, pattern: str, replacement: Union[str, Callable], flags: int = 0):
+    """Register a cleaner, so that it can be referred to by name in pipelines.
+
+    :param name: the name of the cleaner, must be a valid python identifier
+    :param pattern: the regular expression matching the text to replace
+    :param replacement: the replacing string, or a callable receiving the match object;
+      backreferences are not expanded in replacing strings,
+      and groups must be referred to by name from callables, as the pattern is nested in the pipeline's
+      single expression, which shifts the group numbers; group names must be unique across the pipeline
+    :param flags: regular expression flags, applied only to this cleaner's pattern
+    """
+    _registry[name] = (pattern, replacement, flags)
+
+
+def unregister_cleaner(name: str):
+    """Remove a registered cleaner; pipelines already compiled keep it."""
+    _registry.pop(name, None)
+
+
+def _inline_flags(flags):
+    return "".join(
+        letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+        if flags & flag
+    )
+
+
+class CleanerPipeline:
+    """A sequence of cleaners, compiled in a single regular expression
+
+    simple usage:
+
+        pipeline = CleanerPipeline(['whitespace', 'dates'])
+        text = pipeline.clean(locator.all_inner_texts())
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(names)
+        branches = [f"(?P<separator>{FRAGMENT_SEPARATOR})"]
+        self.replacements = {"separator": "\n"}
+        for name in self.names:
+            try:
+                pattern, replacement, flags = _registry[name]
+            except KeyError:
+                raise ValueError(f"Cleaner {name} is not registered")
+            if flags:
+                pattern = f"(?{_inline_flags(flags)}:{pattern})"
+            branches.append(f"(?P<{name}>{pattern})")
+            self.replacements[name] = replacement
+        self.regex = re.compile("|".join(branches))
+        # identifies the patterns of the pipeline, to tell when stored contents were cleaned differently
+        self.signature = hashlib.sha1(self.regex.pattern.encode("utf-8")).hexdigest()[:8]
+
+    def _replace(self, match):
+        replacement = self.replacements[match.lastgroup]
+        if callable(replacement):
+            return replacement(match)
+        return replacement
+
+    def clean(self, fragments: Union[str, Iterable[str]]) -> str:
+        """Strip each fragment, then apply all cleaners to the joined fragments, in one pass."""
+        if isinstance(fragments, str):
+            fragments = [fragments]
+        text = FRAGMENT_SEPARATOR.join(x.strip(FRAGMENT_STRIP_CHARS) for x in fragments)
+        return self.regex.sub(self._replace, text)
+
+
+# sequences of newlines, tabs and non-breaking spaces, possibly interleaved with other spaces,
+# are squeezed into a single newline
+register_cleaner("whitespace", r"(?:\n|\t|\xa0)+(?:\s+(?:\n|\t|\xa0)+)?", "\n")
+
+# volatile tokens, that change at each visit, without any meaningful change in the content
+register_cleaner(
+    "session_ids",
+    r"\b(?P<session_ids_key>jsessionid|phpsessid|aspsessionid\w*|sessionid|sid)=[\w.-]+",
+    lambda m: f"{m.group('session_ids_key')}=[SESSIONE]",
+    re.IGNORECASE
+)
+register_cleaner(
+    "counters",
+    r"\b(?P<counters_label>visite|visitatori|visualizzazioni|accessi|contatore|visits|visitors|views|hits)"
+    r"(?P<counters_sep>\s*:?\s*)\d[\d.,]*",
+    lambda m: f"{m.group('counters_label')}{m.group('counters_sep')}[N]",
+    re.IGNORECASE
+)
+register_cleaner(
+    "dates",
+    r"\b(?:\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})\b",
+    "[DATA]"
+)
+register_cleaner("times", r"\b\d{1,2}:\d{2}(?::\d{2})?\b", "[ORA]")
+
+# pipeline used when the content's cleaner is enabled,
+# compiled once, when the module is imported
+default_pipeline = CleanerPipeline(CLEANERS)
+
+# pipeline used when the content's cleaner is disabled: only whitespaces are normalised,
+# as it has always been done
+base_pipeline = CleanerPipeline(["whitespace"])
+
+
+def get_pipeline(use_cleaner: bool = True) -> CleanerPipeline:
+    """Return the pipeline used to clean contents, depending on their `use_cleaner` flag."""
+    return default_pipeline if use_cleaner else base_pipeline
+
+
+def clean_text(fragments: Union[str, Iterable[str]], use_cleaner: bool = True) -> str:
+    """Normalise the textual fragments extracted from a page, with the default pipeline,
+    or only squeezing whitespaces, if `use_cleaner` is False.
+    """
+    return get_pipeline(use_cleaner).clean(fragments)
@@ -4,7 +4,27 @@ from .defaults import (
     DEFAULT_SMTP_HOST, DEFAULT_SMTP_PORT, DEFAULT_SMTP_USE_TLS, DEFAULT_SMTP_USERNAME, DEFAULT_SMTP_PASSWORD,
     DEFAULT_EMAIL_SUBJECT_PREFIX, DEFAULT_EMAIL_FROM,
     DEFAULT_REQUESTS_MAX_TIMEOUT, DEFAULT_REQUESTS_UA,
-    DEFAULT_PROXY_URL, DEFAULT_PROXY_USERNAME, DEFAULT_PROXY_PASSWORD, DEFAULT_USE_RQ
+    DEFAULT_PROXY_URL, DEFAULT_PROXY_USERNAME, DEFAULT_PROXY_PASSWORD, DEFAULT_USE_RQ,
+    DEFAULT_PROFILES_PATH, DEFAULT_TRACES_PATH, DEFAULT_TRACES_MAX_SIZE, DEFAULT_TRACES_RETENTION_DAYS,
+    DEFAULT_CLEANERS, DEFAULT_SNAPSHOTS_KEYFRAME_INTERVAL,
+    DEFAULT_RAW_HTML_CAPTURE, DEFAULT_RAW_HTML_RETENTION, DEFAULT_RAW_HTML_MAX_AGE_DAYS,
+    DEFAULT_HAR_MODE, DEFAULT_HARS_PATH,
+    DEFAULT_ASSET_CACHE, DEFAULT_ASSET_CACHE_PATH, DEFAULT_ASSET_CACHE_MAX_SIZE, DEFAULT_ASSET_CACHE_TTL,
+    DEFAULT_STORAGE_STATE, DEFAULT_STORAGE_STATE_PATH, DEFAULT_STORAGE_STATE_TTL,
+    DEFAULT_FETCH_CACHE_TTL, DEFAULT_FETCH_CACHE_ALIAS,
+    DEFAULT_RETRY_STATUSES, DEFAULT_RETRY_MAX_ATTEMPTS, DEFAULT_RETRY_BACKOFF_BASE, DEFAULT_RETRY_BACKOFF_MAX,
+    DEFAULT_CIRCUIT_BREAKER_THRESHOLD, DEFAULT_CIRCUIT_BREAKER_COOLDOWN, DEFAULT_CIRCUIT_BREAKER_STATUSES,
+    DEFAULT_PROXY_POOL, DEFAULT_PROXY_MAX_CONCURRENCY, DEFAULT_PROXY_EVICTION_THRESHOLD, DEFAULT_PROXY_EVICTION_TIME,
+    DEFAULT_FETCH_ENGINE,
+    DEFAULT_CLAIM_BATCH_SIZE, DEFAULT_CLAIM_LEASE_TIME, DEFAULT_CLAIM_MIN_AGE,
+    DEFAULT_SCHEDULER_PERIOD, DEFAULT_SCHEDULER_CONCURRENCY, DEFAULT_SCHEDULER_TICK,
+    DEFAULT_ADAPTIVE_TIMEOUT_MIN, DEFAULT_ADAPTIVE_TIMEOUT_MAX, DEFAULT_ADAPTIVE_TIMEOUT_FACTOR,
+    DEFAULT_ADAPTIVE_TIMEOUT_SAMPLES, DEFAULT_ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+    DEFAULT_PIPELINE_PROCESSES, DEFAULT_PIPELINE_QUEUE_SIZE, DEFAULT_PIPELINE_BATCH_SIZE,
+    DEFAULT_SEARCH_RESULTS_LIMIT, DEFAULT_CATALOG_BATCH_SIZE,
+    DEFAULT_STATUS_API_PAGE_SIZE, DEFAULT_STATUS_API_MAX_PAGE_SIZE,
+    DEFAULT_NOTIFY_RECIPIENTS, DEFAULT_NOTIFY_MAX_ITEMS, DEFAULT_NOTIFY_BASE_URL,
+    DEFAULT_SLACK_API_URL, DEFAULT_SLACK_MESSAGE_MAX_LENGTH, DEFAULT_SLACK_MIN_INTERVAL
 )
 
 SLACK_TOKEN = getattr(settings, 'SLACK_TOKEN', DEFAULT_SLACK_TOKEN)
@@ -22,3 +42,59 @@ PROXY_URL = getattr(settings, 'DEFAULT_PROXY_URL', DEFAULT_PROXY_URL)
 PROXY_USERNAME = getattr(settings, 'PROXY_USERNAME', DEFAULT_PROXY_USERNAME)
 PROXY_PASSWORD = getattr(settings, 'PROXY_PASSWORD', DEFAULT_PROXY_PASSWORD)
 USE_RQ = getattr(settings, 'USE_RQ', DEFAULT_USE_RQ)
+PROFILES_PATH = getattr(settings, 'PROFILES_PATH', DEFAULT_PROFILES_PATH)
+TRACES_PATH = getattr(settings, 'TRACES_PATH', DEFAULT_TRACES_PATH)
+TRACES_MAX_SIZE = getattr(settings, 'TRACES_MAX_SIZE', DEFAULT_TRACES_MAX_SIZE)
+TRACES_RETENTION_DAYS = getattr(settings, 'TRACES_RETENTION_DAYS', DEFAULT_TRACES_RETENTION_DAYS)
+CLEANERS = getattr(settings, 'CLEANERS', DEFAULT_CLEANERS)
+SNAPSHOTS_KEYFRAME_INTERVAL = getattr(settings, 'SNAPSHOTS_KEYFRAME_INTERVAL', DEFAULT_SNAPSHOTS_KEYFRAME_INTERVAL)
+RAW_HTML_CAPTURE = getattr(settings, 'RAW_HTML_CAPTURE', DEFAULT_RAW_HTML_CAPTURE)
+RAW_HTML_RETENTION = getattr(settings, 'RAW_HTML_RETENTION', DEFAULT_RAW_HTML_RETENTION)
+RAW_HTML_MAX_AGE_DAYS = getattr(settings, 'RAW_HTML_MAX_AGE_DAYS', DEFAULT_RAW_HTML_MAX_AGE_DAYS)
+HAR_MODE = getattr(settings, 'HAR_MODE', DEFAULT_HAR_MODE)
+HARS_PATH = getattr(settings, 'HARS_PATH', DEFAULT_HARS_PATH)
+ASSET_CACHE = getattr(settings, 'ASSET_CACHE', DEFAULT_ASSET_CACHE)
+ASSET_CACHE_PATH = getattr(settings, 'ASSET_CACHE_PATH', DEFAULT_ASSET_CACHE_PATH)
+ASSET_CACHE_MAX_SIZE = getattr(settings, 'ASSET_CACHE_MAX_SIZE', DEFAULT_ASSET_CACHE_MAX_SIZE)
+ASSET_CACHE_TTL = getattr(settings, 'ASSET_CACHE_TTL', DEFAULT_ASSET_CACHE_TTL)
+STORAGE_STATE = getattr(settings, 'STORAGE_STATE', DEFAULT_STORAGE_STATE)
+STORAGE_STATE_PATH = getattr(settings, 'STORAGE_STATE_PATH', DEFAULT_STORAGE_STATE_PATH)
+STORAGE_STATE_TTL = getattr(settings, 'STORAGE_STATE_TTL', DEFAULT_STORAGE_STATE_TTL)
+FETCH_CACHE_TTL = getattr(settings, 'FETCH_CACHE_TTL', DEFAULT_FETCH_CACHE_TTL)
+FETCH_CACHE_ALIAS = getattr(settings, 'FETCH_CACHE_ALIAS', DEFAULT_FETCH_CACHE_ALIAS)
+RETRY_STATUSES = getattr(settings, 'RETRY_STATUSES', DEFAULT_RETRY_STATUSES)
+RETRY_MAX_ATTEMPTS = getattr(settings, 'RETRY_MAX_ATTEMPTS', DEFAULT_RETRY_MAX_ATTEMPTS)
+RETRY_BACKOFF_BASE = getattr(settings, 'RETRY_BACKOFF_BASE', DEFAULT_RETRY_BACKOFF_BASE)
+RETRY_BACKOFF_MAX = getattr(settings, 'RETRY_BACKOFF_MAX', DEFAULT_RETRY_BACKOFF_MAX)
+CIRCUIT_BREAKER_THRESHOLD = getattr(settings, 'CIRCUIT_BREAKER_THRESHOLD', DEFAULT_CIRCUIT_BREAKER_THRESHOLD)
+CIRCUIT_BREAKER_COOLDOWN = getattr(settings, 'CIRCUIT_BREAKER_COOLDOWN', DEFAULT_CIRCUIT_BREAKER_COOLDOWN)
+CIRCUIT_BREAKER_STATUSES = getattr(settings, 'CIRCUIT_BREAKER_STATUSES', DEFAULT_CIRCUIT_BREAKER_STATUSES)
+PROXY_POOL = getattr(settings, 'PROXY_POOL', DEFAULT_PROXY_POOL)
+PROXY_MAX_CONCURRENCY = getattr(settings, 'PROXY_MAX_CONCURRENCY', DEFAULT_PROXY_MAX_CONCURRENCY)
+PROXY_EVICTION_THRESHOLD = getattr(settings, 'PROXY_EVICTION_THRESHOLD', DEFAULT_PROXY_EVICTION_THRESHOLD)
+PROXY_EVICTION_TIME = getattr(settings, 'PROXY_EVICTION_TIME', DEFAULT_PROXY_EVICTION_TIME)
+FETCH_ENGINE = getattr(settings, 'FETCH_ENGINE', DEFAULT_FETCH_ENGINE)
+CLAIM_BATCH_SIZE = getattr(settings, 'CLAIM_BATCH_SIZE', DEFAULT_CLAIM_BATCH_SIZE)
+CLAIM_LEASE_TIME = getattr(settings, 'CLAIM_LEASE_TIME', DEFAULT_CLAIM_LEASE_TIME)
+CLAIM_MIN_AGE = getattr(settings, 'CLAIM_MIN_AGE', DEFAULT_CLAIM_MIN_AGE)
+SCHEDULER_PERIOD = getattr(settings, 'SCHEDULER_PERIOD', DEFAULT_SCHEDULER_PERIOD)
+SCHEDULER_CONCURRENCY = getattr(settings, 'SCHEDULER_CONCURRENCY', DEFAULT_SCHEDULER_CONCURRENCY)
+SCHEDULER_TICK = getattr(settings, 'SCHEDULER_TICK', DEFAULT_SCHEDULER_TICK)
+ADAPTIVE_TIMEOUT_MIN = getattr(settings, 'ADAPTIVE_TIMEOUT_MIN', DEFAULT_ADAPTIVE_TIMEOUT_MIN)
+ADAPTIVE_TIMEOUT_MAX = getattr(settings, 'ADAPTIVE_TIMEOUT_MAX', DEFAULT_ADAPTIVE_TIMEOUT_MAX)
+ADAPTIVE_TIMEOUT_FACTOR = getattr(settings, 'ADAPTIVE_TIMEOUT_FACTOR', DEFAULT_ADAPTIVE_TIMEOUT_FACTOR)
+ADAPTIVE_TIMEOUT_SAMPLES = getattr(settings, 'ADAPTIVE_TIMEOUT_SAMPLES', DEFAULT_ADAPTIVE_TIMEOUT_SAMPLES)
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = getattr(settings, 'ADAPTIVE_TIMEOUT_MIN_SAMPLES', DEFAULT_ADAPTIVE_TIMEOUT_MIN_SAMPLES)
+PIPELINE_PROCESSES = getattr(settings, 'PIPELINE_PROCESSES', DEFAULT_PIPELINE_PROCESSES)
+PIPELINE_QUEUE_SIZE = getattr(settings, 'PIPELINE_QUEUE_SIZE', DEFAULT_PIPELINE_QUEUE_SIZE)
+PIPELINE_BATCH_SIZE = getattr(settings, 'PIPELINE_BATCH_SIZE', DEFAULT_PIPELINE_BATCH_SIZE)
+SEARCH_RESULTS_LIMIT = getattr(settings, 'SEARCH_RESULTS_LIMIT', DEFAULT_SEARCH_RESULTS_LIMIT)
+CATALOG_BATCH_SIZE = getattr(settings, 'CATALOG_BATCH_SIZE', DEFAULT_CATALOG_BATCH_SIZE)
+STATUS_API_PAGE_SIZE = getattr(settings, 'STATUS_API_PAGE_SIZE', DEFAULT_STATUS_API_PAGE_SIZE)
+STATUS_API_MAX_PAGE_SIZE = getattr(settings, 'STATUS_API_MAX_PAGE_SIZE', DEFAULT_STATUS_API_MAX_PAGE_SIZE)
+NOTIFY_RECIPIENTS = getattr(settings, 'NOTIFY_RECIPIENTS', DEFAULT_NOTIFY_RECIPIENTS)
+NOTIFY_MAX_ITEMS = getattr(settings, 'NOTIFY_MAX_ITEMS', DEFAULT_NOTIFY_MAX_ITEMS)
+NOTIFY_BASE_URL = getattr(settings, 'NOTIFY_BASE_URL', DEFAULT_NOTIFY_BASE_URL)
+SLACK_API_URL = getattr(settings, 'SLACK_API_URL', DEFAULT_SLACK_API_URL)
+SLACK_MESSAGE_MAX_LENGTH = getattr(settings, 'SLACK_MESSAGE_MAX_LENGTH', DEFAULT_SLACK_MESSAGE_MAX_LENGTH)
+SLACK_MIN_INTERVAL = getattr(settings, 'SLACK_MIN_INTERVAL', DEFAULT_SLACK_MIN_INTERVAL)
@@ -13,3 +13,59 @@ DEFAULT_PROXY_URL = ''
 DEFAULT_PROXY_USERNAME = ''
 DEFAULT_PROXY_PASSWORD = ''
 DEFAULT_USE_RQ = True
+DEFAULT_PROFILES_PATH = 'profiles'
+DEFAULT_TRACES_PATH = 'traces'
+DEFAULT_TRACES_MAX_SIZE = 200 * 1024 * 1024
+DEFAULT_TRACES_RETENTION_DAYS = 7
+DEFAULT_CLEANERS = ('whitespace', )
+DEFAULT_SNAPSHOTS_KEYFRAME_INTERVAL = 10
+DEFAULT_RAW_HTML_CAPTURE = False
+DEFAULT_RAW_HTML_RETENTION = 3
+DEFAULT_RAW_HTML_MAX_AGE_DAYS = 30
+DEFAULT_HAR_MODE = None
+DEFAULT_HARS_PATH = 'hars'
+DEFAULT_ASSET_CACHE = False
+DEFAULT_ASSET_CACHE_PATH = 'asset_cache'
+DEFAULT_ASSET_CACHE_MAX_SIZE = 500 * 1024 * 1024
+DEFAULT_ASSET_CACHE_TTL = 24 * 3600
+DEFAULT_STORAGE_STATE = False
+DEFAULT_STORAGE_STATE_PATH = 'storage_states'
+DEFAULT_STORAGE_STATE_TTL = 7 * 24 * 3600
+DEFAULT_FETCH_CACHE_TTL = 120
+DEFAULT_FETCH_CACHE_ALIAS = 'default'
+DEFAULT_RETRY_STATUSES = (408, 429, 500, 502, 503, 504, 990)
+DEFAULT_RETRY_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF_BASE = 30
+DEFAULT_RETRY_BACKOFF_MAX = 300
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 3
+DEFAULT_CIRCUIT_BREAKER_COOLDOWN = 300
+DEFAULT_CIRCUIT_BREAKER_STATUSES = (408, 504, 990)
+DEFAULT_PROXY_POOL = ()
+DEFAULT_PROXY_MAX_CONCURRENCY = 4
+DEFAULT_PROXY_EVICTION_THRESHOLD = 0.5
+DEFAULT_PROXY_EVICTION_TIME = 300
+DEFAULT_FETCH_ENGINE = 'websourcemonitor.services.playwright.PlaywrightWrapper'
+DEFAULT_CLAIM_BATCH_SIZE = 20
+DEFAULT_CLAIM_LEASE_TIME = 15 * 60
+DEFAULT_CLAIM_MIN_AGE = 60 * 60
+DEFAULT_SCHEDULER_PERIOD = 24 * 3600
+DEFAULT_SCHEDULER_CONCURRENCY = 4
+DEFAULT_SCHEDULER_TICK = 30
+DEFAULT_ADAPTIVE_TIMEOUT_MIN = 3
+DEFAULT_ADAPTIVE_TIMEOUT_MAX = DEFAULT_REQUESTS_MAX_TIMEOUT
+DEFAULT_ADAPTIVE_TIMEOUT_FACTOR = 2.0
+DEFAULT_ADAPTIVE_TIMEOUT_SAMPLES = 20
+DEFAULT_ADAPTIVE_TIMEOUT_MIN_SAMPLES = 5
+DEFAULT_PIPELINE_PROCESSES = 2
+DEFAULT_PIPELINE_QUEUE_SIZE = 20
+DEFAULT_PIPELINE_BATCH_SIZE = 20
+DEFAULT_SEARCH_RESULTS_LIMIT = 50
+DEFAULT_CATALOG_BATCH_SIZE = 500
+DEFAULT_STATUS_API_PAGE_SIZE = 100
+DEFAULT_STATUS_API_MAX_PAGE_SIZE = 1000
+DEFAULT_NOTIFY_RECIPIENTS = ()
+DEFAULT_NOTIFY_MAX_ITEMS = 100
+DEFAULT_NOTIFY_BASE_URL = ''
+DEFAULT_SLACK_API_URL = 'https://slack.com/api/chat.postMessage'
+DEFAULT_SLACK_MESSAGE_MAX_LENGTH = 3000
+DEFAULT_SLACK_MIN_INTERVAL = 1.0
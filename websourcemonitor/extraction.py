@@ -0,0 +1,117 @@
+"""Offline extraction of contents from stored html pages.
+
+Selectors and cleaners are applied with lxml to the html captured during verifications,
+with no browser and no network traffic.
+
+Selectors follow playwright's syntax, limited to XPath (`xpath=...`, or starting with `//` or `..`)
+and CSS (`css=...`, or any other selector); CSS selectors need the `cssselect` package.
+Playwright's own pseudo-classes (`:has-text`, `>>` chains, ...) are not supported.
+
+Textual content only approximates the browser's `innerText`: as styles are not evaluated,
+hidden elements are not skipped, and each text node goes on a line of its own,
+whether its element is displayed as a block, or inline.
+Contents extracted this way are meant to be compared with the stored ones, not to replace them;
+`PlaywrightWrapper.extract_from_html` renders captured pages in the browser, as verifications do.
+"""
+import re
+from typing import List, Tuple
+
+from lxml import etree
+
+from .cleaners import get_pipeline
+from .links import inner_html, make_links_absolute
+
+SKIPPED_ELEMENTS = frozenset((
+    'script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link', 'iframe', 'object', 'svg',
+    # form controls, whose text is their value, or their options
+    'select', 'datalist', 'textarea',
+))
+
+PREFORMATTED_ELEMENTS = frozenset(('pre',))
+
+_whitespace_re = re.compile(r"[ \t\n\r\f]+")
+
+
+def select(root, selector: str) -> list:
+    """Return the elements matching the selector, in document order.
+
+    :raise ValueError: if the selector is invalid or not supported
+    """
+    if selector.startswith('xpath='):
+        xpath = selector[len('xpath='):]
+    elif selector.startswith('//') or selector.startswith('..'):
+        xpath = selector
+    else:
+        css = selector[len('css='):] if selector.startswith('css=') else selector
+        try:
+            from lxml.cssselect import CSSSelector, SelectorError
+        except ImportError:
+            raise ValueError("I selettori CSS richiedono il pacchetto cssselect")
+        try:
+            return CSSSelector(css)(root)
+        except SelectorError as e:
+            raise ValueError(f"Selettore CSS non valido: {e}")
+
+    try:
+        result = root.xpath(xpath)
+    except etree.XPathError as e:
+        raise ValueError(f"XPath non valido: {e}")
+    if not isinstance(result, list):
+        return []
+    return [node for node in result if isinstance(node, etree._Element)]
+
+
+def _append(text, lines, preformatted):
+    if preformatted:
+        lines.extend(line.strip() for line in text.split("\n"))
+    else:
+        lines.append(_whitespace_re.sub(" ", text).strip())
+
+
+def _collect(element, lines, preformatted=False):
+    tag = element.tag if isinstance(element.tag, str) else None
+    if tag in SKIPPED_ELEMENTS or tag is None:
+        return
+
+    preformatted = preformatted or tag in PREFORMATTED_ELEMENTS
+    if element.text:
+        _append(element.text, lines, preformatted)
+    for child in element:
+        _collect(child, lines, preformatted)
+        if child.tail:
+            _append(child.tail, lines, preformatted)
+
+
+def inner_text(element) -> str:
+    """Return the text of the element, with each text node on a line of its own."""
+    lines = []
+    _collect(element, lines)
+    return "\n".join(line for line in lines if line)
+
+
+def extract(html: str, selector: str, output_format: str = 'text', url: str = '',
+            use_cleaner: bool = True) -> Tuple[int, str]:
+    """Extract the content selected from the html page,
+    approximately as `PlaywrightWrapper.get_live_content` would.
+
+    :return: 2-tuple
+      the status (200, or 900 if the selector is invalid or matches nothing)
+      and the content, or a comprehensible error message
+    """
+    root = etree.fromstring(html, etree.HTMLParser(remove_comments=False))
+    if root is None:
+        return 900, "Pagina vuota"
+
+    try:
+        elements: List = select(root, selector or "body")
+    except ValueError as e:
+        return 900, f"{e}"
+    if not elements:
+        return 900, "Selettore non trovato"
+
+    if output_format == 'text':
+        return 200, get_pipeline(use_cleaner).clean([inner_text(element) for element in elements])
+    elif output_format == 'html':
+        return 200, ' '.join(make_links_absolute([inner_html(element) for element in elements], url))
+    else:
+        raise Exception("Invalid output format")
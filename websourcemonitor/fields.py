@@ -0,0 +1,68 @@
+"""Model fields."""
+import zlib
+
+from django import forms
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    """A text field, transparently stored zlib-compressed in a binary column.
+
+    Values are `str` in python, and compressed `bytes` in the database;
+    they can not be looked up by content (i.e. with `icontains`).
+    """
+
+    description = "Compressed text"
+
+    def __init__(self, *args, compress_level=6, **kwargs):
+        self.compress_level = compress_level
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compress_level != 6:
+            kwargs['compress_level'] = self.compress_level
+        if kwargs.get('editable') is True:
+            del kwargs['editable']
+        else:
+            kwargs['editable'] = False
+        return name, path, args, kwargs
+
+    @staticmethod
+    def compress(value, level=6):
+        return zlib.compress(value.encode('utf-8'), level)
+
+    @staticmethod
+    def decompress(value):
+        return zlib.decompress(bytes(value)).decode('utf-8')
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.decompress(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.decompress(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        return self.compress(str(value), self.compress_level)
+
+    def get_default(self):
+        if self.has_default():
+            return super().get_default()
+        return None if self.null else ''
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return super(models.BinaryField, self).formfield(**{
+            'form_class': forms.CharField,
+            'widget': forms.Textarea,
+            **kwargs,
+        })
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.db.models import Q
 
+KNOWN_ERROR_CODES = ("403", "404", "500", "503", "900", "990")
+
 
 class ErrorCodeFilter(admin.SimpleListFilter):
     title = 'Error code'
@@ -12,20 +14,26 @@ class ErrorCodeFilter(admin.SimpleListFilter):
             ("900", "900 XPATH not found"), ("990", "990 Connection error"), ("999", "Errore sconosciuto")
 
     def queryset(self, request, queryset):
-        # implements the filter
+        # implements the filter, on the stored status code;
+        # contents not verified since status codes are stored are filtered on their error messages
         if self.value():
+            if not self.value().isdigit():
+                # hand-written query strings
+                return queryset
+            legacy = Q(status_code__isnull=True, verification_error__isnull=False)
             if self.value() == "999":
+                legacy_known = Q()
+                for code in KNOWN_ERROR_CODES:
+                    legacy_known |= Q(verification_error__icontains=code)
                 return queryset.filter(
-                    verification_error__isnull=False
-                ).exclude(
-                    Q(verification_error__icontains="403") |
-                    Q(verification_error__icontains="404") |
-                    Q(verification_error__icontains="500") |
-                    Q(verification_error__icontains="503") |
-                    Q(verification_error__icontains="900") |
-                    Q(verification_error__icontains="990")
+                    Q(status_code__isnull=False, verification_error__isnull=False) &
+                    ~Q(status_code__in=[int(code) for code in KNOWN_ERROR_CODES]) |
+                    legacy & ~legacy_known
                 )
             else:
-                return queryset.filter(verification_error__icontains=self.value())
+                return queryset.filter(
+                    Q(status_code=int(self.value()), verification_error__isnull=False) |
+                    legacy & Q(verification_error__icontains=self.value())
+                )
         else:
             return queryset
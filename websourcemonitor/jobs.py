@@ -3,31 +3,45 @@ from django_rq import job
 
 @job
 def verify_contents(contents):
-    from websourcemonitor.services.playwright import PlaywrightWrapper
+    from websourcemonitor.services.circuit_breaker import HostCircuitBreaker
+    from websourcemonitor.services.retry import verify_with_retries
+    from websourcemonitor.services.wrapper_pool import WrapperPool
 
-    pw = PlaywrightWrapper()
+    wrapper_pool = WrapperPool()
     results = []
-    for obj in contents:
-        results.append(
-            (obj.url, obj.verify(playwright_wrapper=pw))
-        )
-    pw.stop()
+    try:
+        for obj, error in verify_with_retries(
+            contents, circuit_breaker=HostCircuitBreaker(), wrapper_pool=wrapper_pool
+        ):
+            if error is not None:
+                raise error
+            result = getattr(obj, 'live_result', None)
+            results.append(
+                (obj.url, obj.verification_status, obj.status_code, result.response_time if result else None)
+            )
+    finally:
+        wrapper_pool.stop()
     return results
 
 
 @job
 def update_contents(contents):
-    from websourcemonitor.services.playwright import PlaywrightWrapper
-
-    pw = PlaywrightWrapper()
+    # updates only move the fetched contents, no browser is needed
     results = []
     for obj in contents:
-        res = obj.url, obj.update(playwright_wrapper=pw)
+        res = obj.url, obj.update()
         results.append(res)
-    pw.stop()
     return results
 
 
+@job
+def reconcile_counters():
+    # to be scheduled periodically, i.e. with rq-scheduler
+    from websourcemonitor.models import StatusCounter
+
+    return StatusCounter.objects.reconcile()
+
+
 def say_hello(name="world"):
     msg = f"Hello, {name}!"
     print(msg)
@@ -0,0 +1,155 @@
+"""Absolute links in html fragments.
+
+Html fragments extracted from pages have their links made absolute,
+and opened in a new window, before being stored.
+
+The fragments are parsed once, all together, with lxml, and serialised back
+the same way BeautifulSoup (with the `html.parser` builder) would serialise them,
+so that contents stored before this module was introduced are still comparable:
+- attributes are sorted alphabetically, and quoted as BeautifulSoup does;
+- multi-valued attributes (`class`, `rel`, ...) have their whitespaces squeezed;
+- void elements are closed with `/>`;
+- text is escaped minimally (`&`, `<`, `>`), except in `script` and `style` elements;
+- text made only of ascii whitespaces is squeezed into a newline or a space, except in `pre` and `textarea`.
+
+Html serialised by browsers is always well nested, and parsed the same way by lxml and BeautifulSoup;
+when lxml needs to fix the nesting of some elements (i.e. a `div` inside a `p`, only possible if
+created by scripts), the two parsers build different trees, and BeautifulSoup is used instead.
+"""
+import re
+from typing import Iterable, List
+from urllib.parse import urljoin
+
+from lxml import etree
+
+# fragments are parsed wrapped in elements with this tag, so that they can be told apart
+FRAGMENT_TAG = "wsm-fragment"
+
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+    'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track',
+    'wbr',
+))
+
+RAW_TEXT_ELEMENTS = frozenset(('script', 'style'))
+
+PRESERVE_WHITESPACE_ELEMENTS = frozenset(('pre', 'textarea'))
+
+ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+
+LIST_ATTRIBUTES = {
+    '*': frozenset(('class', 'accesskey', 'dropzone')),
+    'a': frozenset(('rel', 'rev')),
+    'link': frozenset(('rel', 'rev')),
+    'td': frozenset(('headers',)),
+    'th': frozenset(('headers',)),
+    'form': frozenset(('accept-charset',)),
+    'object': frozenset(('archive',)),
+    'area': frozenset(('rel',)),
+    'icon': frozenset(('sizes',)),
+    'iframe': frozenset(('sandbox',)),
+    'output': frozenset(('for',)),
+}
+
+_escape_re = re.compile(r"[&<>]")
+_escapes = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+_nonwhitespace_re = re.compile(r"\S+")
+
+
+def _escape(text):
+    return _escape_re.sub(lambda m: _escapes[m.group()], text)
+
+
+def _squeeze(text, preserve_whitespace):
+    if preserve_whitespace or not ASCII_SPACES.issuperset(text):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _quote(value):
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', "&quot;") + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def _start_tag(element):
+    tag = element.tag
+    list_attributes = LIST_ATTRIBUTES.get(tag, ())
+    attributes = []
+    for key, value in sorted(element.items()):
+        if key in LIST_ATTRIBUTES['*'] or key in list_attributes:
+            value = " ".join(_nonwhitespace_re.findall(value))
+        attributes.append(f" {key}={_quote(_escape(value))}")
+    return f"<{tag}{''.join(attributes)}"
+
+
+def _serialise(element, out, preserve_whitespace=False):
+    tag = element.tag
+    if tag is etree.Comment:
+        out.append(f"<!--{element.text or ''}-->")
+    elif tag is etree.ProcessingInstruction:
+        out.append(f"<?{element.target} {element.text or ''}>" if element.text else f"<?{element.target}>")
+    elif isinstance(tag, str):
+        out.append(_start_tag(element))
+        if tag in VOID_ELEMENTS and element.text is None and not len(element):
+            out.append("/>")
+        else:
+            out.append(">")
+            preserve_children = preserve_whitespace or tag in PRESERVE_WHITESPACE_ELEMENTS
+            if element.text:
+                text = _squeeze(element.text, preserve_children)
+                out.append(text if tag in RAW_TEXT_ELEMENTS else _escape(text))
+            for child in element:
+                _serialise(child, out, preserve_children)
+            out.append(f"</{tag}>")
+    if element.tail:
+        out.append(_escape(_squeeze(element.tail, preserve_whitespace)))
+
+
+def inner_html(element) -> str:
+    """Serialise the content of an lxml element, as `make_links_absolute` does."""
+    out = [_escape(_squeeze(element.text, element.tag in PRESERVE_WHITESPACE_ELEMENTS))] if element.text else []
+    for child in element:
+        _serialise(child, out, element.tag in PRESERVE_WHITESPACE_ELEMENTS)
+    return "".join(out)
+
+
+def _make_links_absolute_with_bs4(fragments, base_url):
+    from bs4 import BeautifulSoup
+
+    results = []
+    for fragment in fragments:
+        soup = BeautifulSoup(fragment, 'html.parser')
+        for tag in soup.find_all('a', href=True):
+            tag['href'] = urljoin(base_url, tag['href'])
+            tag['target'] = '_blank'
+        results.append(str(soup))
+    return results
+
+
+def make_links_absolute(fragments: Iterable[str], base_url: str) -> List[str]:
+    """Make the `href` of all links in the html fragments absolute, with respect to `base_url`,
+    and have them open in a new window.
+
+    All fragments are parsed in a single pass.
+
+    :return: the list of the transformed fragments
+    """
+    fragments = list(fragments)
+    if not fragments:
+        return []
+    document = "".join(f"<{FRAGMENT_TAG}>{fragment}</{FRAGMENT_TAG}>" for fragment in fragments)
+    parser = etree.HTMLParser(remove_comments=False, remove_pis=False, recover=True)
+    root = etree.fromstring(f"<html><body>{document}</body></html>", parser)
+    if any(error.type == etree.ErrorTypes.ERR_TAG_NAME_MISMATCH for error in parser.error_log):
+        return _make_links_absolute_with_bs4(fragments, base_url)
+
+    for link in root.iter('a'):
+        href = link.get('href')
+        if href is not None:
+            link.set('href', urljoin(base_url, href))
+            link.set('target', '_blank')
+
+    return [inner_html(wrapper) for wrapper in root.iter(FRAGMENT_TAG)]
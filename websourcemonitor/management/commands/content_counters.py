@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+from websourcemonitor.models import StatusCounter
+
+
+class Command(BaseCommand):
+    help = """
+        Reconcile the status counters shown in the admin dashboard with the contents:
+        recount the contents by source type and verification status, and correct the counters that drifted
+        (i.e. after bulk updates or deletions of contents, which do not move the counters).
+        Meant to be run periodically.
+    """
+
+    def handle(self, *args, **options):
+        self.setup_logger(__name__, formatter_key="simple", **options)
+
+        corrected = StatusCounter.objects.reconcile()
+        if corrected:
+            self.logger.warning(f"{corrected} status counters corrected")
+        else:
+            self.logger.info("status counters are up to date")
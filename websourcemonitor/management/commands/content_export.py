@@ -0,0 +1,50 @@
+from django.core.management import BaseCommand
+from websourcemonitor import catalog
+from websourcemonitor.conf import CATALOG_BATCH_SIZE
+from websourcemonitor.models import Content
+
+
+class Command(BaseCommand):
+    help = """
+        Export the catalog of the contents (title, source type, url, selector and options,
+        no verification state), as JSONL or CSV, to a file or to the standard output.
+        Contents are read and written in chunks, so that memory does not grow with the catalog.
+        The output can be loaded with content_import.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int)
+
+        parser.add_argument(
+            '--format',
+            dest='format',
+            choices=catalog.FORMATS,
+            help='Output format; by default, from the extension of the output file, or jsonl',
+        )
+        parser.add_argument(
+            '--output',
+            dest='output',
+            default='-',
+            help='Output file (default: standard output)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=CATALOG_BATCH_SIZE,
+            help='Number of contents read from the db at once',
+        )
+
+    def handle(self, *args, **options):
+        contents = Content.objects.all()
+        if options['ids']:
+            contents = contents.filter(id__in=options['ids'])
+
+        output_format = options['format'] or catalog.guess_format(options['output'])
+        lines = catalog.dump(catalog.export_rows(contents, options['chunk_size']), output_format)
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
@@ -0,0 +1,70 @@
+import sys
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from websourcemonitor import catalog
+from websourcemonitor.conf import CATALOG_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = """
+        Import a catalog of contents, as exported by content_export, from a JSONL or CSV file.
+        Contents are matched by url and selector: existing ones are updated, the others created;
+        missing source types are created. Rows are read one at a time and written in batches,
+        so that memory does not grow with the catalog. Invalid rows are reported and skipped.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Catalog file, or - for the standard input')
+
+        parser.add_argument(
+            '--format',
+            dest='format',
+            choices=catalog.FORMATS,
+            help='Input format; by default, from the extension of the file, or jsonl',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=CATALOG_BATCH_SIZE,
+            help='Number of contents written to the db at once',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            dest='dryrun',
+            default=False,
+            help='Execute a dry run: no db is written.',
+        )
+
+    def handle(self, *args, **options):
+        self.setup_logger(__name__, formatter_key="simple", **options)
+
+        path = options['path']
+        input_format = options['format'] or catalog.guess_format(path)
+        if path == '-':
+            stats = self.load(sys.stdin, input_format, **options)
+        else:
+            with open(path, encoding='utf-8', newline='') as lines:
+                stats = self.load(lines, input_format, **options)
+
+        self.logger.info(
+            "{created} contents created, {updated} updated, {unchanged} unchanged, "
+            "{source_types} source types created, {errors} errors".format(**stats)
+        )
+
+    def load(self, lines, input_format, **options):
+        """Import the catalog; batches are committed one by one, or all rolled back in a dry run."""
+        def import_rows():
+            return catalog.import_rows(
+                catalog.read(lines, input_format), options['batch_size'],
+                on_error=lambda number, message: self.logger.error(f"line {number}: {message}")
+            )
+
+        if not options['dryrun']:
+            return import_rows()
+        with transaction.atomic():
+            stats = import_rows()
+            transaction.set_rollback(True)
+        return stats
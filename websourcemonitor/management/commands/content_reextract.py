@@ -0,0 +1,119 @@
+from django.core.management import BaseCommand, CommandError
+from websourcemonitor.models import Content, RawCapture
+from websourcemonitor.services import engine
+
+
+class Command(BaseCommand):
+    help = """
+        Extract contents again from the latest raw captures of their pages,
+        applying the current selectors and cleaners, with no network traffic.
+        Captured pages are rendered again in the browser, with all their requests aborted;
+        with --offline, contents are extracted with lxml, and only compared with the stored ones.
+        Pages are captured during verifications, when RAW_HTML_CAPTURE is set,
+        or with content_verify --capture-html.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int)
+
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            dest='dryrun',
+            default=False,
+            help='Execute a dry run: no db is written.',
+        )
+        parser.add_argument(
+            '--rebaseline',
+            action='store_true',
+            dest='rebaseline',
+            default=False,
+            help='Replace the stored contents with the extracted ones, instead of comparing them.',
+        )
+        parser.add_argument(
+            '--offline',
+            action='store_true',
+            dest='offline',
+            default=False,
+            help='Extract with lxml, without launching the browser; results are only logged, no db is written.',
+        )
+        parser.add_argument(
+            '--offset',
+            type=int,
+            dest='offset',
+            default=0,
+            help='Force offset <> 0',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            dest='limit',
+            default=0,
+            help='Force offset <> 0',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=500,
+            help='Number of contents, and captures, read from the db at once',
+        )
+
+    def handle(self, *args, **options):
+        self.setup_logger(__name__, formatter_key="simple", **options)
+        if options['offline'] and options['rebaseline']:
+            raise CommandError("--rebaseline needs the browser, and cannot be used with --offline")
+
+        offset = options['offset']
+        limit = options['limit']
+        ids = options.get('ids', [])
+
+        contents = Content.objects.filter(raw_captures__isnull=False).distinct().order_by('id')
+        if len(ids) == 0:
+            if limit > 0:
+                contents = contents[offset:(offset + limit)]
+            else:
+                contents = contents[offset:]
+        else:
+            contents = contents.filter(id__in=ids)
+
+        content_ids = list(contents.values_list('id', flat=True))
+        if len(content_ids) == 0:
+            self.logger.info("no captured content to extract this time")
+            return
+
+        playwright_wrapper = None if options['offline'] else engine.new_engine()
+        try:
+            self.reextract_all(content_ids, playwright_wrapper, **options)
+        finally:
+            if playwright_wrapper is not None:
+                playwright_wrapper.stop()
+
+    def reextract_all(self, content_ids, playwright_wrapper, **options):
+        chunk_size = options['chunk_size']
+        for start in range(0, len(content_ids), chunk_size):
+            chunk = list(Content.objects.filter(id__in=content_ids[start:start + chunk_size]).order_by('id'))
+            captures = RawCapture.objects.latest_for(chunk)
+            for cnt, content in enumerate(chunk, start=start):
+                capture = captures.get(content.id)
+                if capture is None:
+                    # pruned since the contents were listed
+                    self.logger.warning("{0}/{1} - {2} (id: {3}) - nessuna cattura disponibile".format(
+                        cnt + 1, len(content_ids), content.title, content.id
+                    ))
+                    continue
+                self.reextract(content, capture, cnt, len(content_ids), playwright_wrapper, **options)
+
+    def reextract(self, content, capture, cnt, total, playwright_wrapper, **options):
+        content.reextract(
+            capture, rebaseline=options['rebaseline'], commit=not options['dryrun'],
+            playwright_wrapper=playwright_wrapper
+        )
+
+        if content.verification_error:
+            status = content.verification_error
+        else:
+            status = content.get_verification_status_display().upper()
+        self.logger.info(
+            "{0}/{1} - {2} (id: {3}) - {4}".format(cnt + 1, total, content.title, content.id, status)
+        )
@@ -0,0 +1,128 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection
+from websourcemonitor.conf import (
+    SCHEDULER_PERIOD, SCHEDULER_CONCURRENCY, SCHEDULER_TICK, RETRY_MAX_ATTEMPTS, CIRCUIT_BREAKER_THRESHOLD,
+    CLAIM_LEASE_TIME
+)
+from websourcemonitor.models import Content
+from websourcemonitor.services.circuit_breaker import HostCircuitBreaker
+from websourcemonitor.services.retry import RetryQueue, verify_with_retries
+from websourcemonitor.services.scheduler import WorkerPool, due_between
+from websourcemonitor.services.wrapper_pool import WrapperPool
+
+
+class Command(BaseCommand):
+    help = """
+        Verify contents continuously, each once per period, at a time derived from the hash of its id,
+        so that checks are spread evenly over the period, with a steady load, instead of hourly bursts.
+        Due contents are verified by a bounded pool of workers; runs until interrupted (SIGINT, SIGTERM).
+        Several schedulers can run at once, on different nodes: each content is claimed by one of them.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            type=int,
+            dest='period',
+            default=SCHEDULER_PERIOD,
+            help='Seconds over which the verifications of all the contents are spread',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            dest='concurrency',
+            default=SCHEDULER_CONCURRENCY,
+            help='Maximum number of contents verified at once',
+        )
+        parser.add_argument(
+            '--tick',
+            type=int,
+            dest='tick',
+            default=SCHEDULER_TICK,
+            help='Seconds between two looks for due contents',
+        )
+        parser.add_argument(
+            '--capture-html',
+            action='store_true',
+            dest='capture_html',
+            default=None,
+            help='Store the rendered pages, to extract contents again offline, with content_reextract',
+        )
+        parser.add_argument(
+            '--retry-attempts',
+            type=int,
+            dest='retry_attempts',
+            default=RETRY_MAX_ATTEMPTS,
+            help='Attempts for contents failing with transient errors (1: no retries); a worker waits between them',
+        )
+        parser.add_argument(
+            '--circuit-breaker-threshold',
+            type=int,
+            dest='circuit_breaker_threshold',
+            default=CIRCUIT_BREAKER_THRESHOLD,
+            help='Consecutive connection errors after which the contents of a host are skipped for a while (0: never)',
+        )
+
+    def handle(self, *args, **options):
+        self.setup_logger(__name__, formatter_key="simple", **options)
+
+        period = options['period']
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.options = options
+        self.circuit_breaker = None
+        if options['circuit_breaker_threshold'] > 0:
+            self.circuit_breaker = HostCircuitBreaker(threshold=options['circuit_breaker_threshold'])
+        # each worker thread launches its own browsers, and stops them when exiting
+        self.wrapper_pool = WrapperPool()
+
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.set())
+
+        pool = WorkerPool(self.verify, options['concurrency'], on_exit=self.close_worker)
+        self.logger.info(
+            f"{self.worker}: verifiche distribuite su {period}s, al massimo {options['concurrency']} alla volta"
+        )
+        last_tick = time.time()
+        try:
+            while not stopping.wait(options['tick']):
+                now = time.time()
+                ids = Content.objects.filter(is_verification_enabled=True).values_list('id', flat=True)
+                due = due_between(ids, last_tick, now, period)
+                last_tick = now
+                if not due:
+                    continue
+                # contents verified in the last half period (i.e. by hand) are not due
+                for content in Content.objects.filter(id__in=due).claim(
+                    self.worker, batch_size=len(due), lease_time=CLAIM_LEASE_TIME, min_age=period // 2
+                ):
+                    pool.submit(content)
+        finally:
+            self.logger.info(f"{self.worker}: in chiusura, completamento delle verifiche in corso")
+            pool.stop()
+            Content.objects.release(self.worker)
+
+    def verify(self, content):
+        try:
+            retry_queue = RetryQueue(max_attempts=self.options['retry_attempts'])
+            for content, error in verify_with_retries(
+                [content], retry_queue, self.circuit_breaker,
+                capture_html=self.options['capture_html'], wrapper_pool=self.wrapper_pool
+            ):
+                if error is not None:
+                    self.logger.warning(f"{content.title} (id: {content.id}) - Errore sconosciuto: {error}")
+                else:
+                    status = content.verification_error or content.get_verification_status_display().upper()
+                    self.logger.info(f"{content.title} (id: {content.id}) - {status}")
+        finally:
+            Content.objects.filter(id=content.id).release(self.worker)
+
+    def close_worker(self):
+        self.wrapper_pool.stop()
+        connection.close()
@@ -88,6 +88,6 @@ class Command(BaseCommand):
                         )
                     )
                     if options['showhtml'] is True:
-                        self.logger.info("Contenuto significativo: {0}".format(content.get_live_content()))
+                        self.logger.info("Contenuto significativo: {0}".format(content.get_live_content().content))
                     if options['dryrun'] is False:
                         content.save()
@@ -1,9 +1,22 @@
+import cProfile
 import difflib
+import os
+import socket
 
 from django.core import management
 from django.core.management import BaseCommand
 from django.utils.timezone import now
+from websourcemonitor.conf import (
+    PROFILES_PATH, RETRY_MAX_ATTEMPTS, CIRCUIT_BREAKER_THRESHOLD, CLAIM_BATCH_SIZE, CLAIM_LEASE_TIME, CLAIM_MIN_AGE,
+    PIPELINE_PROCESSES
+)
 from websourcemonitor.models import Content
+from websourcemonitor.services import har
+from websourcemonitor.services.circuit_breaker import HostCircuitBreaker
+from websourcemonitor.services.deadline import RunDeadline
+from websourcemonitor.services.pipeline import VerificationPipeline
+from websourcemonitor.services.retry import RetryQueue, verify_with_retries
+from websourcemonitor.services.wrapper_pool import WrapperPool
 
 
 class Command(BaseCommand):
@@ -60,65 +73,158 @@ class Command(BaseCommand):
             default='slack',
             help='What method to use for notification: slack|email|both',
         )
+        parser.add_argument(
+            '--capture-html',
+            action='store_true',
+            dest='capture_html',
+            default=None,
+            help='Store the rendered pages, to extract contents again offline, with content_reextract',
+        )
+        parser.add_argument(
+            '--har',
+            dest='har_mode',
+            choices=har.MODES,
+            default=None,
+            help='Record the traffic of each source in a HAR archive, or replay it from there, with no network',
+        )
+        parser.add_argument(
+            '--retry-attempts',
+            type=int,
+            dest='retry_attempts',
+            default=RETRY_MAX_ATTEMPTS,
+            help='Attempts for contents failing with transient errors, retried after all the others (1: no retries)',
+        )
+        parser.add_argument(
+            '--circuit-breaker-threshold',
+            type=int,
+            dest='circuit_breaker_threshold',
+            default=CIRCUIT_BREAKER_THRESHOLD,
+            help='Consecutive connection errors after which the remaining contents of a host are skipped (0: never)',
+        )
+        parser.add_argument(
+            '--pipeline',
+            action='store_true',
+            dest='pipeline',
+            default=False,
+            help='Fetch, process and save the contents in overlapping stages',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            dest='processes',
+            default=PIPELINE_PROCESSES,
+            help='Processes turning the fetched fragments into contents, with --pipeline (0: in the fetch thread)',
+        )
+        parser.add_argument(
+            '--deadline',
+            type=int,
+            dest='deadline',
+            default=None,
+            help='Time budget of the run, in seconds: contents are verified by priority, '
+                 'and those left when it runs out are skipped, until the next run',
+        )
+        parser.add_argument(
+            '--claim',
+            action='store_true',
+            dest='claim',
+            default=False,
+            help='Claim batches of due contents with expiring leases, so that several nodes can verify at once',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=CLAIM_BATCH_SIZE,
+            help='Contents claimed at once, with --claim',
+        )
+        parser.add_argument(
+            '--lease-time',
+            type=int,
+            dest='lease_time',
+            default=CLAIM_LEASE_TIME,
+            help='Seconds after which the contents claimed by a crashed node can be claimed again, with --claim',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            dest='min_age',
+            default=CLAIM_MIN_AGE,
+            help='Contents verified less than these seconds ago are not claimed, with --claim',
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            dest='profile',
+            default=False,
+            help='Write cProfile data of the run, to be inspected with pstats or snakeviz',
+        )
+        parser.add_argument(
+            '--profile-path',
+            dest='profile_path',
+            default=PROFILES_PATH,
+            help='Directory where profiling data are written',
+        )
 
     def handle(self, *args, **options):
         self.setup_logger(__name__, formatter_key="simple", **options)
+        # the digest notifies the contents verified by this run
+        started_at = now()
 
         offset = options['offset']
         limit = options['limit']
         ids = options.get('ids', [])
 
-        if len(ids) == 0:
-            if limit > 0:
-                contents = Content.objects.all()[
-                           offset:(offset + limit)]
-            else:
-                contents = Content.objects.all()[offset:]
-        else:
-            contents = Content.objects.filter(id__in=ids)
+        contents = Content.objects.all()
+        if options['deadline']:
+            # within a time budget, the most important contents come first
+            contents = contents.by_priority()
 
-        contents = contents.filter(is_verification_enabled=True)
+        if options['claim']:
+            if ids:
+                contents = contents.filter(id__in=ids)
+        else:
+            # filtered before slicing, as sliced querysets cannot be filtered
+            contents = contents.filter(is_verification_enabled=True)
+            if len(ids) == 0:
+                if limit > 0:
+                    contents = contents[offset:(offset + limit)]
+                else:
+                    contents = contents[offset:]
+            else:
+                contents = contents.filter(id__in=ids)
 
-        if len(contents) == 0:
-            self.logger.info("no content to check this time")
+            if len(contents) == 0:
+                self.logger.info("no content to check this time")
 
-        for cnt, content in enumerate(contents):
-            err_msg = ''
-            try:
-                _ = content.verify(options['dryrun'])
-            except IOError:
-                err_msg = "Url non leggibile: {0}".format(content.url)
-            except Exception as e:
-                err_msg = "Errore sconosciuto: {0}".format(e)
-            finally:
-                if err_msg != '':
-                    if options['dryrun'] is False:
-                        content.verification_status = Content.STATUS_ERROR
-                        content.verification_error = err_msg
-                        content.verified_at = now()
-                        content.save()
-                    self.logger.warning("{0}/{1} - {2} while processing {3} (id: {4})".format(
-                        cnt + 1, len(contents), err_msg, content.title, content.id
-                    ))
-                else:
-                    if content.verification_error:
-                        status = content.verification_error
-                    else:
-                        status = content.get_verification_status_display().upper()
-                    self.logger.info(
-                        "{0}/{1} - {2} (id: {4}) - {3}".format(
-                            cnt + 1, len(contents), content.title,
-                            status,
-                            content.id,
-                        )
-                    )
-                    if options['showmeat'] is True:
-                        self.logger.info("Contenuto significativo: {0}".format(content.get_live_content()))
-                    if options['showdiff'] is True:
-                        live = content.get_live_content().splitlines(1)
-                        stored = content.meat.splitlines(1)
-                        diff = difflib.ndiff(live, stored)
-                        self.logger.info("".join(diff))
+        profiler = None
+        if options['profile']:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        # shared by the batches of claimed contents
+        self.deadline = RunDeadline(options['deadline']) if options['deadline'] else None
+        # transient failures are retried after the main pass, and logged when final
+        self.retry_queue = RetryQueue(max_attempts=options['retry_attempts'])
+        self.circuit_breaker = None
+        if options['circuit_breaker_threshold'] > 0:
+            self.circuit_breaker = HostCircuitBreaker(threshold=options['circuit_breaker_threshold'])
+        # browsers are launched once per browser and proxy, and shared by all contents
+        self.wrapper_pool = WrapperPool(**({'har_mode': options['har_mode']} if options['har_mode'] else {}))
+        try:
+            if options['claim']:
+                self.verify_claimed_contents(contents, **options)
+            else:
+                self.verify_contents(contents, **options)
+        finally:
+            self.wrapper_pool.stop()
+            if profiler:
+                profiler.disable()
+                os.makedirs(options['profile_path'], exist_ok=True)
+                profile_file = os.path.join(
+                    options['profile_path'], f"content_verify_{now():%Y%m%d%H%M%S}.prof"
+                )
+                profiler.dump_stats(profile_file)
+                self.logger.info(f"profiling data written to {profile_file}")
+        self.log_summary()
 
         if options['notify'] and not options['dryrun']:
             verbosity = int(options.get("verbosity", 1))
@@ -126,5 +232,133 @@ class Command(BaseCommand):
                 'notify',
                 verbosity=verbosity,
                 notification_method=options['notification_method'],
+                since=started_at,
                 stdout=self.stdout,
             )
+
+    def verify_claimed_contents(self, contents, **options):
+        """Claim and verify batches of due contents, until none is left;
+        other nodes running with --claim get different batches.
+        """
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        # contents whose verification was not saved (dry runs, errors) are still due: they are not claimed twice
+        claimed = set()
+
+        # the batch may take longer than a lease: leases are extended after each content,
+        # including those of the contents waiting for a retry
+        def renew_lease():
+            Content.objects.all().renew(worker, lease_time=options['lease_time'])
+
+        try:
+            while self.deadline is None or not self.deadline.expired():
+                batch = contents.exclude(id__in=claimed).claim(
+                    worker, batch_size=options['batch_size'], lease_time=options['lease_time'],
+                    min_age=options['min_age']
+                )
+                if not batch:
+                    break
+                claimed.update(content.id for content in batch)
+                self.logger.info(f"{worker}: {len(batch)} contenuti presi in carico")
+                try:
+                    # retries are left for the end of the run
+                    self.verify_contents(batch, renew_lease=renew_lease, drain_retries=False, **options)
+                finally:
+                    # contents waiting for a retry are kept
+                    Content.objects.filter(id__in=[content.id for content in batch]).exclude(
+                        id__in=[content.id for content in self.retry_queue]
+                    ).release(worker)
+
+            if self.retry_queue:
+                self.logger.info(f"{worker}: {len(self.retry_queue)} contenuti da riprovare")
+                self.verify_contents([], renew_lease=renew_lease, total=len(self.retry_queue), **options)
+        finally:
+            Content.objects.all().release(worker)
+
+        if not claimed:
+            self.logger.info("no content to check this time")
+
+    def verify_contents(self, contents, renew_lease=None, drain_retries=True, total=None, **options):
+        if options['pipeline']:
+            verifications = VerificationPipeline(
+                options['processes'], retry_queue=self.retry_queue, circuit_breaker=self.circuit_breaker,
+                deadline=self.deadline, drain_retries=drain_retries, commit=not options['dryrun'],
+                capture_html=options['capture_html'], wrapper_pool=self.wrapper_pool
+            ).run(contents)
+        else:
+            verifications = verify_with_retries(
+                contents, self.retry_queue, self.circuit_breaker, self.deadline, drain_retries=drain_retries,
+                commit=not options['dryrun'], capture_html=options['capture_html'], wrapper_pool=self.wrapper_pool
+            )
+        if renew_lease is not None:
+            verifications = self.renewing(verifications, renew_lease)
+        self.log_verifications(verifications, len(contents) if total is None else total, **options)
+
+    def log_summary(self):
+        """Log the hosts skipped by the circuit breaker, and the contents skipped by the deadline, in the run."""
+        if self.circuit_breaker is not None:
+            for host, skipped in self.circuit_breaker.summary().items():
+                self.logger.warning(f"host non raggiungibile: {host} - {skipped} contenuti saltati")
+        if self.deadline is not None and self.deadline.skipped:
+            self.logger.warning(f"tempo esaurito: {len(self.deadline.skipped)} contenuti non verificati")
+            for content in self.deadline.skipped:
+                self.logger.info(f"non verificato: {content.title} (id: {content.id})")
+
+    @staticmethod
+    def renewing(verifications, renew_lease):
+        """Yield the verifications, calling `renew_lease` after each of them"""
+        for verification in verifications:
+            renew_lease()
+            yield verification
+
+    def log_verifications(self, verifications, total, **options):
+        for cnt, (content, error) in enumerate(verifications):
+            err_msg = ''
+            if isinstance(error, IOError):
+                err_msg = "Url non leggibile: {0}".format(content.url)
+            elif error is not None:
+                err_msg = "Errore sconosciuto: {0}".format(error)
+
+            if err_msg != '':
+                if options['dryrun'] is False:
+                    content.verification_status = Content.STATUS_ERROR
+                    content.verification_error = err_msg
+                    content.verified_at = now()
+                    content.save(update_fields=Content.SKIP_FIELDS)
+                self.logger.warning("{0}/{1} - {2} while processing {3} (id: {4})".format(
+                    cnt + 1, total, err_msg, content.title, content.id
+                ))
+            else:
+                if content.verification_error:
+                    status = content.verification_error
+                else:
+                    status = content.get_verification_status_display().upper()
+                if content.verification_status == Content.STATUS_SKIPPED:
+                    self.logger.info("{0}/{1} - {2} (id: {3}) - {4}".format(
+                        cnt + 1, total, content.title, content.id, status
+                    ))
+                    continue
+                result = content.live_result
+                attempts = getattr(content, 'retry_attempts', 1)
+                stats = getattr(content, 'diff_stats', None)
+                if stats and content.verification_status == Content.STATUS_CHANGED:
+                    status = f"{status} (+{stats['added']} -{stats['removed']} righe)"
+                self.logger.info(
+                    "{0}/{1} - {2} (id: {4}) - {3} - {5}{6}".format(
+                        cnt + 1, total, content.title,
+                        status,
+                        content.id,
+                        f"{result.response_time:.03}s" if result.response_time else "-",
+                        f" - tentativo {attempts}" if attempts > 1 else "",
+                    )
+                )
+                if result.redirected:
+                    self.logger.info("Redirect: {0} -> {1}".format(
+                        " -> ".join(result.redirect_chain), result.final_url
+                    ))
+                if options['showmeat'] is True:
+                    self.logger.info("Contenuto significativo: {0}".format(result.content))
+                if options['showdiff'] is True:
+                    live = (result.content or '').splitlines(1)
+                    stored = (content.content or '').splitlines(1)
+                    diff = difflib.ndiff(live, stored)
+                    self.logger.info("".join(diff))
@@ -0,0 +1,77 @@
+import datetime
+
+from django.core.management import BaseCommand
+from django.utils.timezone import now
+from websourcemonitor.conf import NOTIFY_MAX_ITEMS, NOTIFY_RECIPIENTS
+from websourcemonitor.services import notifications
+
+
+class Command(BaseCommand):
+    help = """
+        Notify a digest of the contents changed, or in error, verified since a given time,
+        grouped by source type and capped to --max-items contents,
+        by email (to each of the NOTIFY_RECIPIENTS, over a single SMTP connection) and/or on Slack
+        (SLACK_CHANNEL, in chunks, within the rate limits).
+        Called by content_verify --notify, at the end of the run.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--notification-method',
+            dest='notification_method',
+            default='slack',
+            choices=('slack', 'email', 'both'),
+            help='What method to use for notification: slack|email|both',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            type=notifications.parse_since,
+            help='Notify the contents verified since this time (ISO format, in the current time zone unless given); '
+                 'by default, in the last --hours',
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            dest='hours',
+            default=24,
+            help='Notify the contents verified in the last hours, when --since is not given',
+        )
+        parser.add_argument(
+            '--max-items',
+            type=int,
+            dest='max_items',
+            default=NOTIFY_MAX_ITEMS,
+            help='Maximum number of contents listed in the digest; the others are only counted',
+        )
+        parser.add_argument(
+            '--recipients',
+            nargs='*',
+            dest='recipients',
+            default=list(NOTIFY_RECIPIENTS),
+            help='Email recipients (default: NOTIFY_RECIPIENTS)',
+        )
+
+    def handle(self, *args, **options):
+        self.setup_logger(__name__, formatter_key="simple", **options)
+
+        since = options['since'] or now() - datetime.timedelta(hours=options['hours'])
+        digest = notifications.build_digest(since, max_items=options['max_items'])
+        if not digest:
+            self.logger.info(f"no changes or errors since {since:%Y-%m-%d %H:%M}, nothing to notify")
+            return
+        self.logger.info(f"digest: {digest.subject}")
+
+        method = options['notification_method']
+        if method in ('email', 'both'):
+            try:
+                sent = notifications.send_email(digest, options['recipients'])
+                self.logger.info(f"{sent} emails sent")
+            except Exception as e:
+                self.logger.error(f"error while sending the emails: {e}")
+        if method in ('slack', 'both'):
+            try:
+                posted = notifications.send_slack(digest)
+                self.logger.info(f"{posted} slack messages posted")
+            except Exception as e:
+                self.logger.error(f"error while posting on slack: {e}")
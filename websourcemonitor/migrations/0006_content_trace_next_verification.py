@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0005_content_dati_specifici"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="trace_next_verification",
+            field=models.BooleanField(
+                default=False,
+                help_text="Registra una traccia playwright (rete, DOM) alla prossima verifica",
+                verbose_name="Traccia la prossima verifica",
+            ),
+        ),
+    ]
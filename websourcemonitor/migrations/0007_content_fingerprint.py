@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0006_content_trace_next_verification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True,
+                help_text="Calcolata nella pagina, evita di trasferire i contenuti non cambiati",
+                max_length=64,
+                null=True,
+                verbose_name="Impronta del contenuto",
+            ),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+from django.db import migrations, transaction
+
+import websourcemonitor.fields
+
+CHUNK_SIZE = 500
+
+
+def compress_contents(apps, schema_editor):
+    """Copy contents into the compressed fields, in chunks, committing each chunk;
+    next_content is not copied when equal to content.
+
+    Rows already copied are skipped, so that the migration can be resumed.
+    """
+    Content = apps.get_model("websourcemonitor", "Content")
+    last_pk = 0
+    while True:
+        rows = list(
+            Content.objects.filter(pk__gt=last_pk, content_compressed__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "content", "next_content")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        objs = [
+            Content(
+                pk=pk,
+                content_compressed=content,
+                next_content_compressed=None if next_content == content else next_content,
+            )
+            for pk, content, next_content in rows
+        ]
+        with transaction.atomic(using=schema_editor.connection.alias):
+            Content.objects.bulk_update(objs, ["content_compressed", "next_content_compressed"])
+        last_pk = rows[-1][0]
+
+
+def decompress_contents(apps, schema_editor):
+    Content = apps.get_model("websourcemonitor", "Content")
+    last_pk = 0
+    while True:
+        rows = list(
+            Content.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "content_compressed", "next_content_compressed")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        objs = [
+            Content(
+                pk=pk,
+                content=content,
+                next_content=content if next_content is None else next_content,
+            )
+            for pk, content, next_content in rows
+        ]
+        with transaction.atomic(using=schema_editor.connection.alias):
+            Content.objects.bulk_update(objs, ["content", "next_content"])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("websourcemonitor", "0007_content_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="content_compressed",
+            field=websourcemonitor.fields.CompressedTextField(
+                blank=True, null=True, verbose_name="Contenuto significativo"
+            ),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="next_content_compressed",
+            field=websourcemonitor.fields.CompressedTextField(
+                blank=True, null=True, verbose_name="Contenuto significativo nuovo"
+            ),
+        ),
+        migrations.RunPython(compress_contents, decompress_contents, atomic=False),
+        migrations.RemoveField(
+            model_name="content",
+            name="content",
+        ),
+        migrations.RemoveField(
+            model_name="content",
+            name="next_content",
+        ),
+        migrations.RenameField(
+            model_name="content",
+            old_name="content_compressed",
+            new_name="content",
+        ),
+        migrations.RenameField(
+            model_name="content",
+            old_name="next_content_compressed",
+            new_name="next_content",
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:36
+
+import django.db.models.deletion
+import django.utils.timezone
+import websourcemonitor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0008_compress_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(verbose_name="Versione")),
+                (
+                    "text",
+                    websourcemonitor.fields.CompressedTextField(
+                        blank=True,
+                        help_text="Memorizzato solo per le versioni chiave",
+                        null=True,
+                        verbose_name="Testo completo",
+                    ),
+                ),
+                (
+                    "delta",
+                    websourcemonitor.fields.CompressedTextField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Differenze dalla versione precedente",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Data"
+                    ),
+                ),
+                (
+                    "content",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="websourcemonitor.content",
+                        verbose_name="Contenuto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "istantanea",
+                "verbose_name_plural": "istantanee",
+                "unique_together": {("content", "version")},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:38
+
+import django.db.models.deletion
+import django.utils.timezone
+import websourcemonitor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0009_contentsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RawCapture",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.URLField(max_length=1024)),
+                ("selector", models.CharField(blank=True, max_length=512)),
+                (
+                    "html",
+                    websourcemonitor.fields.CompressedTextField(
+                        verbose_name="Pagina html"
+                    ),
+                ),
+                (
+                    "captured_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Data",
+                    ),
+                ),
+                (
+                    "content",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="raw_captures",
+                        to="websourcemonitor.content",
+                        verbose_name="Contenuto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "pagina catturata",
+                "verbose_name_plural": "pagine catturate",
+            },
+        ),
+    ]
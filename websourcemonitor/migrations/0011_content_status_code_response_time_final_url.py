@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0010_rawcapture"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="final_url",
+            field=models.URLField(
+                blank=True,
+                help_text="URL reached after redirects, in the last verification",
+                max_length=1024,
+                null=True,
+                verbose_name="URL finale",
+            ),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="response_time",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Tempo di risposta (s)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="status_code",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="HTTP status of the last verification, or 900 (selector not found), 990 (connection error)",
+                null=True,
+                verbose_name="Codice di stato",
+            ),
+        ),
+    ]
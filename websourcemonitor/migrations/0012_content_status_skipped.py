@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0011_content_status_code_response_time_final_url"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="content",
+            name="verification_status",
+            field=models.IntegerField(
+                choices=[
+                    (0, "Immutato"),
+                    (1, "Cambiato"),
+                    (2, "Errore rilevato"),
+                    (3, "Aggiornato alla destinazione"),
+                    (4, "Errore segnalato"),
+                    (5, "Saltato (host non raggiungibile)"),
+                ],
+                null=True,
+                verbose_name="Stato",
+            ),
+        ),
+    ]
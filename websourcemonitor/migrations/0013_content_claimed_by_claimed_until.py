@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0012_content_status_skipped"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="claimed_by",
+            field=models.CharField(
+                blank=True,
+                help_text="Worker holding the lease on the content, while verifying it",
+                max_length=255,
+                null=True,
+                verbose_name="In verifica da",
+            ),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="claimed_until",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="Expiry of the lease; afterwards the content can be claimed by other workers",
+                null=True,
+                verbose_name="In verifica fino a",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0013_content_claimed_by_claimed_until"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="load_times",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Load times of the latest successful verifications, for the adaptive timeout",
+                verbose_name="Tempi di caricamento recenti (s)",
+            ),
+        ),
+    ]
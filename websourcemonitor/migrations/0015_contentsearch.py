@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# the index of this migration is frozen here: websourcemonitor.search indexes the contents differently since 0019
+POSTGRES_INDEX = 'websourcemonitor_search_gin'
+DOCUMENTS_TABLE = 'websourcemonitor_contentsearch'
+FTS_TABLE = 'websourcemonitor_contentsearch_fts'
+FTS_SQL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"document, content='{DOCUMENTS_TABLE}', content_rowid='content_id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {DOCUMENTS_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.content_id, new.document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {DOCUMENTS_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.content_id, old.document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {DOCUMENTS_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.content_id, old.document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.content_id, new.document); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+DOCUMENT_FIELDS = ('title', 'url', 'notes', 'verification_error', 'content', 'next_content')
+
+CHUNK_SIZE = 500
+
+
+def document(content):
+    return '\n'.join(str(value) for value in (getattr(content, f) for f in DOCUMENT_FIELDS) if value)
+
+
+def create_index(schema_editor, model):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        schema_editor.add_index(model, GinIndex(SearchVector('document', config='simple'), name=POSTGRES_INDEX))
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if not any(option == 'ENABLE_FTS5' for option, in cursor.fetchall()):
+                return
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def index_contents(apps, schema_editor):
+    """Store the search documents of the existing contents, in chunks, then create the full-text index."""
+    Content = apps.get_model("websourcemonitor", "Content")
+    ContentSearch = apps.get_model("websourcemonitor", "ContentSearch")
+    last_pk = 0
+    while True:
+        contents = list(Content.objects.filter(pk__gt=last_pk).order_by("pk")[:CHUNK_SIZE])
+        if not contents:
+            break
+        ContentSearch.objects.bulk_create(
+            [ContentSearch(content=content, document=document(content)) for content in contents]
+        )
+        last_pk = contents[-1].pk
+    create_index(schema_editor, ContentSearch)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
+    elif vendor == 'sqlite':
+        for suffix in ('insert', 'delete', 'update'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0014_content_load_times"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentSearch",
+            fields=[
+                (
+                    "content",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="websourcemonitor.content",
+                        verbose_name="Contenuto",
+                    ),
+                ),
+                ("document", models.TextField(verbose_name="Testo indicizzato")),
+            ],
+            options={
+                "verbose_name": "documento di ricerca",
+                "verbose_name_plural": "documenti di ricerca",
+            },
+        ),
+        migrations.RunPython(index_contents, drop_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0015_contentsearch"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="content",
+            name="verified_at",
+            field=models.DateTimeField(
+                blank=True, db_index=True, null=True, verbose_name="Last verification"
+            ),
+        ),
+    ]
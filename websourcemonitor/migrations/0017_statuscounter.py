@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+NOT_VERIFIED = -1
+
+
+def count_contents(apps, schema_editor):
+    """Fill the counters, with a GROUP BY over the contents."""
+    Content = apps.get_model("websourcemonitor", "Content")
+    StatusCounter = apps.get_model("websourcemonitor", "StatusCounter")
+    StatusCounter.objects.bulk_create([
+        StatusCounter(
+            source_type_id=source_type_id,
+            verification_status=NOT_VERIFIED if status is None else status,
+            count=count,
+        )
+        for source_type_id, status, count in Content.objects.order_by()
+        .values("source_type_id", "verification_status")
+        .annotate(count=models.Count("id"))
+        .values_list("source_type_id", "verification_status", "count")
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0016_content_verified_at_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatusCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "verification_status",
+                    models.IntegerField(
+                        choices=[
+                            (-1, "Non verificato"),
+                            (0, "Immutato"),
+                            (1, "Cambiato"),
+                            (2, "Errore rilevato"),
+                            (3, "Aggiornato alla destinazione"),
+                            (4, "Errore segnalato"),
+                            (5, "Saltato (host non raggiungibile)"),
+                        ],
+                        verbose_name="Stato",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="Contenuti")),
+                (
+                    "source_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_counters",
+                        to="websourcemonitor.sourcetype",
+                        verbose_name="Tipo di fonte",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "contatore di stato",
+                "verbose_name_plural": "contatori di stato",
+                "unique_together": {("source_type", "verification_status")},
+            },
+        ),
+        migrations.RunPython(count_contents, migrations.RunPython.noop),
+    ]
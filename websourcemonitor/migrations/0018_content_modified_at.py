@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0017_statuscounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="modified_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Ultima modifica"
+            ),
+        ),
+    ]
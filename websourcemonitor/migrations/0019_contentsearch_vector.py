@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:57
+
+import importlib
+
+from django.db import migrations, models
+
+from websourcemonitor import search
+
+CHUNK_SIZE = 500
+
+initial_search = importlib.import_module("websourcemonitor.migrations.0015_contentsearch")
+
+
+def drop_documents(apps, schema_editor):
+    """Drop the index of the plain documents, and the documents."""
+    initial_search.drop_index(apps, schema_editor)
+    apps.get_model("websourcemonitor", "ContentSearch").objects.all().delete()
+
+
+def restore_documents(apps, schema_editor):
+    apps.get_model("websourcemonitor", "ContentSearch").objects.all().delete()
+    initial_search.index_contents(apps, schema_editor)
+
+
+def index_contents(apps, schema_editor):
+    """Create the full-text index; on Postgres, store the vectors of the existing contents, in chunks."""
+    search.create_index(schema_editor)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Content = apps.get_model("websourcemonitor", "Content")
+    last_pk = 0
+    while True:
+        contents = list(Content.objects.filter(pk__gt=last_pk).order_by("pk")[:CHUNK_SIZE])
+        if not contents:
+            break
+        search.store_vectors(
+            {content.pk: search.document(content) for content in contents}, using=schema_editor.connection.alias
+        )
+        last_pk = contents[-1].pk
+
+
+def drop_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("websourcemonitor", "0018_content_modified_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_documents, restore_documents),
+        migrations.RemoveField(
+            model_name="contentsearch",
+            name="document",
+        ),
+        migrations.AddField(
+            model_name="contentsearch",
+            name="checksum",
+            field=models.CharField(
+                default="", max_length=40, verbose_name="Impronta del testo indicizzato"
+            ),
+        ),
+        migrations.RunPython(index_contents, drop_index),
+    ]
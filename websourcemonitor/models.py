@@ -1,8 +1,22 @@
-from django.db import models
+import collections
+import datetime
+import math
+
+from django.db import IntegrityError, connections, models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from websourcemonitor.services.playwright import PlaywrightWrapper
+from websourcemonitor import extraction, search, snapshots
+from websourcemonitor.conf import (
+    SNAPSHOTS_KEYFRAME_INTERVAL, RAW_HTML_CAPTURE, RAW_HTML_RETENTION, RAW_HTML_MAX_AGE_DAYS,
+    CLAIM_BATCH_SIZE, CLAIM_LEASE_TIME, CLAIM_MIN_AGE, SCHEDULER_PERIOD,
+    ADAPTIVE_TIMEOUT_MIN, ADAPTIVE_TIMEOUT_MAX, ADAPTIVE_TIMEOUT_FACTOR,
+    ADAPTIVE_TIMEOUT_SAMPLES, ADAPTIVE_TIMEOUT_MIN_SAMPLES, SEARCH_RESULTS_LIMIT, HAR_MODE,
+    REQUESTS_MAX_TIMEOUT
+)
+from websourcemonitor.fields import CompressedTextField
+from websourcemonitor.services import engine, fetch_cache, tracing
+from websourcemonitor.services.results import VerificationResult, STATUS_NOT_TRANSFERRED
 
 
 class SourceType(models.Model):
@@ -30,6 +44,74 @@ class APIException(BaseException):
     pass
 
 
+class ContentQuerySet(models.QuerySet):
+
+    def due(self, min_age=CLAIM_MIN_AGE):
+        """Contents to be verified: enabled, not verified in the last `min_age` seconds, and not leased"""
+        now = timezone.now()
+        return self.filter(
+            models.Q(verified_at__isnull=True) | models.Q(verified_at__lt=now - datetime.timedelta(seconds=min_age)),
+            models.Q(claimed_until__isnull=True) | models.Q(claimed_until__lt=now),
+            is_verification_enabled=True,
+        )
+
+    def claim(self, worker, batch_size=CLAIM_BATCH_SIZE, lease_time=CLAIM_LEASE_TIME, min_age=CLAIM_MIN_AGE):
+        """Lease a batch of due contents to the worker, for `lease_time` seconds,
+        in the queryset's order, or the least recently verified first.
+
+        Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, where the db supports it,
+        so that concurrent workers claim different rows without waiting for each other;
+        elsewhere, the conditional update lets only one of them take each row.
+        Leases of crashed workers expire, and their contents are claimed again.
+
+        :return: the list of claimed contents
+        """
+        claimed_until = timezone.now() + datetime.timedelta(seconds=lease_time)
+        contents = self
+        if not self.query.order_by:
+            contents = self.order_by(models.F('verified_at').asc(nulls_first=True), 'id')
+        with transaction.atomic(using=self.db):
+            due = contents.due(min_age)
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            ids = list(due.values_list('id', flat=True)[:batch_size])
+            self.model.objects.using(self.db).filter(id__in=ids).due(min_age).update(
+                claimed_by=worker, claimed_until=claimed_until
+            )
+        return list(contents.filter(id__in=ids, claimed_by=worker, claimed_until=claimed_until))
+
+    def renew(self, worker, lease_time=CLAIM_LEASE_TIME):
+        """Extend the leases of the worker on the contents, for `lease_time` seconds from now;
+        leases expired and taken by other workers are left to them"""
+        return self.filter(claimed_by=worker).update(
+            claimed_until=timezone.now() + datetime.timedelta(seconds=lease_time)
+        )
+
+    def release(self, worker):
+        """Release the leases of the worker on the contents, leaving those taken by other workers"""
+        return self.filter(claimed_by=worker).update(claimed_by=None, claimed_until=None)
+
+    def by_priority(self, overdue_age=SCHEDULER_PERIOD):
+        """Order the contents by priority: changed at the last verification first, then those with an `op_url`,
+        then the overdue ones (not verified in the last `overdue_age` seconds); the least recently verified first
+        """
+        overdue = timezone.now() - datetime.timedelta(seconds=overdue_age)
+        return self.annotate(
+            priority=models.Case(
+                models.When(verification_status=self.model.STATUS_CHANGED, then=4), default=0
+            ) + models.Case(
+                models.When(models.Q(op_url__isnull=False) & ~models.Q(op_url=''), then=2), default=0
+            ) + models.Case(
+                models.When(models.Q(verified_at__isnull=True) | models.Q(verified_at__lt=overdue), then=1), default=0
+            )
+        ).order_by('-priority', models.F('verified_at').asc(nulls_first=True), 'id')
+
+    def search(self, query):
+        """Contents matching all the words of the query, in their full-text search documents
+        (see `websourcemonitor.search`)"""
+        return search.matching(self, query)
+
+
 class Content(models.Model):
     """a content on the web, identified by the URL and the XPATH expression"""
 
@@ -38,13 +120,22 @@ class Content(models.Model):
     STATUS_ERROR = 2
     STATUS_UPDATED = 3
     STATUS_SIGNALED = 4
+    STATUS_SKIPPED = 5
     STATUS_CHOICES = (
         (STATUS_NOT_CHANGED, 'Immutato'),
         (STATUS_CHANGED, 'Cambiato'),
         (STATUS_ERROR, 'Errore rilevato'),
         (STATUS_UPDATED, 'Aggiornato alla destinazione'),
         (STATUS_SIGNALED, 'Errore segnalato'),
+        (STATUS_SKIPPED, 'Saltato (host non raggiungibile)'),
+    )
+    # the fields written by verifications
+    VERIFICATION_FIELDS = (
+        'next_content', 'fingerprint', 'verified_at', 'verification_status', 'verification_error',
+        'trace_next_verification', 'status_code', 'response_time', 'final_url', 'load_times', 'modified_at',
     )
+    # the fields written when a verification is skipped, or fails
+    SKIP_FIELDS = ('verified_at', 'verification_status', 'verification_error', 'modified_at')
     CHROME = 'chrome'
     FIREFOX = 'firefox'
     BROWSER_CHOICES = (
@@ -69,19 +160,32 @@ class Content(models.Model):
     )
     selector = models.CharField(blank=True, max_length=512)
 
-    content = models.TextField(
+    content = CompressedTextField(
         blank=True, null=True,
         verbose_name=_("Contenuto significativo")
     )
 
-    next_content = models.TextField(
+    # only stored when different from content
+    next_content = CompressedTextField(
         blank=True, null=True,
         verbose_name=_("Contenuto significativo nuovo")
     )
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True, null=True,
+        verbose_name=_("Impronta del contenuto"),
+        help_text=_("Calcolata nella pagina, evita di trasferire i contenuti non cambiati")
+    )
 
     timeout = models.PositiveSmallIntegerField(
         blank=True, null=True,
     )
+    load_times = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Tempi di caricamento recenti (s)"),
+        help_text=_("Load times of the latest successful verifications, for the adaptive timeout")
+    )
     notes = models.TextField(
         blank=True, null=True,
         verbose_name=_("Note")
@@ -93,8 +197,14 @@ class Content(models.Model):
     )
     verified_at = models.DateTimeField(
         blank=True, null=True,
+        db_index=True,
         verbose_name=_("Last verification")
     )
+    modified_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name=_("Ultima modifica")
+    )
     verification_status = models.IntegerField(
         null=True,
         choices=STATUS_CHOICES,
@@ -104,6 +214,26 @@ class Content(models.Model):
         blank=True, null=True,
         verbose_name=_("Errore")
     )
+    trace_next_verification = models.BooleanField(
+        default=False,
+        verbose_name=_("Traccia la prossima verifica"),
+        help_text=_("Registra una traccia playwright (rete, DOM) alla prossima verifica")
+    )
+    status_code = models.PositiveSmallIntegerField(
+        blank=True, null=True,
+        verbose_name=_("Codice di stato"),
+        help_text=_("HTTP status of the last verification, or 900 (selector not found), 990 (connection error)")
+    )
+    response_time = models.FloatField(
+        blank=True, null=True,
+        verbose_name=_("Tempo di risposta (s)")
+    )
+    final_url = models.URLField(
+        max_length=1024,
+        blank=True, null=True,
+        verbose_name=_("URL finale"),
+        help_text=_("URL reached after redirects, in the last verification")
+    )
     use_cleaner = models.BooleanField(
         default=True,
         verbose_name=_("Utilizza cleaner")
@@ -128,6 +258,21 @@ class Content(models.Model):
         null=True,
     )
 
+    claimed_by = models.CharField(
+        max_length=255,
+        blank=True, null=True,
+        verbose_name=_("In verifica da"),
+        help_text=_("Worker holding the lease on the content, while verifying it")
+    )
+    claimed_until = models.DateTimeField(
+        blank=True, null=True,
+        db_index=True,
+        verbose_name=_("In verifica fino a"),
+        help_text=_("Expiry of the lease; afterwards the content can be claimed by other workers")
+    )
+
+    objects = ContentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'contenuto'
         verbose_name_plural = 'contenuti'
@@ -135,34 +280,213 @@ class Content(models.Model):
     def __str__(self):
         return self.title
 
-    def get_live_content(self, playwright_wrapper=None, output_format='text', browser='chrome', proxy=None,
-                         use_proxy=False):
-
-        if playwright_wrapper is None:
-            pw = PlaywrightWrapper(browser_set=browser, use_proxy=use_proxy)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the status counter the content is counted in, to move it when the status changes
+        if 'source_type_id' in field_names and 'verification_status' in field_names:
+            instance._counted = instance.counter_key
         else:
-            pw = playwright_wrapper
-
-        try:
-            (resp_code, resp_content) = pw.get_live_content(self.url, self.selector, output_format)
-            if playwright_wrapper is None:
+            instance._counted = StatusCounter.UNTRACKED
+        return instance
+
+    @property
+    def counter_key(self):
+        return self.source_type_id, self.verification_status
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(search.DOCUMENT_FIELDS):
+            ContentSearch.objects.index([self])
+        StatusCounter.objects.record([self])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        StatusCounter.objects.record([self], deleted=True)
+        return result
+
+    def get_live_content(self, playwright_wrapper=None, output_format='text', browser=None, proxy=None,
+                         use_proxy=None, trace_path=None, fingerprint=None, capture_html=False, har_mode=None,
+                         wrapper_pool=None, timeout=None, raw=False):
+        """Fetch the live content of the source, with its own browser and proxy settings, by default.
+
+        The playwright wrapper is taken from `wrapper_pool` (a WrapperPool), when given,
+        through a proxy of its pool, if the content uses proxies; otherwise a new one is launched, and stopped.
+
+        When `fingerprint` is passed, and the live section still has that fingerprint,
+        the section is not transferred from the browser, and the last fetched content is returned.
+
+        `har_mode` ('record' or 'replay') overrides the HAR_MODE setting,
+        when the playwright wrapper is not passed.
+
+        `timeout` (in seconds) overrides the request timeout of the wrapper.
+
+        With `raw`, the extracted fragments are returned instead of the content, still to be processed
+        (see `websourcemonitor.services.processing`).
+
+        Successful fetches are cached for FETCH_CACHE_TTL seconds, and reused within that time,
+        unless a trace, the html of the page or the raw fragments are requested,
+        or the wrapper records or replays HAR archives.
+
+        :return: the VerificationResult of the fetch, also available as `live_result`, afterwards;
+          it can be unpacked as a (status, content) 2-tuple
+        """
+        if browser is None:
+            browser = self.browser
+        if use_proxy is None:
+            use_proxy = self.use_proxy
+
+        key = fetch_cache.cache_key(
+            self.url, self.selector, output_format, browser, proxy if proxy else use_proxy, self.use_cleaner
+        )
+        if playwright_wrapper is not None:
+            active_har_mode = getattr(playwright_wrapper, 'har_mode', None)
+        elif wrapper_pool is not None:
+            active_har_mode = wrapper_pool.wrapper_kwargs.get('har_mode', HAR_MODE)
+        else:
+            active_har_mode = har_mode or HAR_MODE
+        # recordings need the live traffic, and replays are not live contents
+        use_cache = not trace_path and not capture_html and not raw and not active_har_mode
+        cached = fetch_cache.get(key) if use_cache else None
+        if cached is not None:
+            self.live_result = cached
+            return cached
+
+        def fetch(pw):
+            result = pw.get_live_content(
+                self.url, self.selector, output_format, use_cleaner=self.use_cleaner, trace_path=trace_path,
+                fingerprint=fingerprint, capture_html=capture_html, timeout=timeout, raw=raw,
+                by_pass_with_google=(self.dati_specifici or {}).get('by_pass_with_google', False)
+            )
+            if result.status == STATUS_NOT_TRANSFERRED:
+                result.status = 200
+                result.content = self.next_content if self.next_content is not None else self.content
+            return result
+
+        if playwright_wrapper is None and wrapper_pool is not None:
+            with wrapper_pool.lease(browser, use_proxy, proxy) as (pw, report):
+                result = fetch(pw)
+                report(result)
+        elif playwright_wrapper is None:
+            wrapper_kwargs = {'har_mode': har_mode} if har_mode else {}
+            pw = engine.new_engine(browser_set=browser, use_proxy=use_proxy, proxy=proxy, **wrapper_kwargs)
+            try:
+                result = fetch(pw)
+            finally:
                 pw.stop()
-            return resp_code, resp_content
-        except Exception as e:
-            pw.stop()
-            raise e
+        else:
+            result = fetch(playwright_wrapper)
+
+        if not raw and not active_har_mode:
+            fetch_cache.set(key, result)
+        self.live_result = result
+        return result
+
+    def verify(self, playwright_wrapper=None, capture_html=None, har_mode=None):
+        """fetch the live content, compare it with the stored one and save the verification status
+
+        the rendered page is stored as a RawCapture when `capture_html` is set,
+        or when it is None and the RAW_HTML_CAPTURE setting is set
+        """
+        result = self.fetch_verification(playwright_wrapper=playwright_wrapper, capture_html=capture_html,
+                                         har_mode=har_mode)
+        return self.apply_verification(result)
+
+    def fetch_verification(self, playwright_wrapper=None, capture_html=None, har_mode=None, wrapper_pool=None,
+                           timeout=None, raw=False):
+        """fetch the live content for a verification, recording a trace if requested, without saving
+
+        the request times out after `timeout` seconds, or the content's own timeout (see `get_timeout`)
+
+        :return: the VerificationResult, to be passed to `apply_verification`
+        """
+        if capture_html is None:
+            capture_html = RAW_HTML_CAPTURE
+        if timeout is None:
+            timeout = self.get_timeout()
+
+        trace_path = None
+        if self.trace_next_verification:
+            trace_path = tracing.new_trace_path(self)
+
+        result = self.get_live_content(playwright_wrapper=playwright_wrapper,
+                                       browser=self.browser,
+                                       use_proxy=self.use_proxy,
+                                       trace_path=trace_path,
+                                       fingerprint=self.fingerprint,
+                                       capture_html=capture_html,
+                                       har_mode=har_mode,
+                                       wrapper_pool=wrapper_pool,
+                                       timeout=timeout,
+                                       raw=raw)
+
+        if trace_path:
+            self.trace_next_verification = False
+            tracing.prune_traces()
+
+        return result
+
+    def apply_verification(self, result, commit=True):
+        """compare the fetched content with the stored one, and save the verification status
+
+        only the verification fields are written: the lease columns belong to the claiming worker;
+        nothing is written to the db (nor the rendered page stored), unless `commit` is set
+        """
+        self.set_verification(result)
+        if not commit:
+            return self.verification_status
+
+        self.save(update_fields=self.VERIFICATION_FIELDS if self.pk else None)
+        if result.page_html:
+            RawCapture.objects.store(self, result.page_html)
 
-    def verify(self, playwright_wrapper=None):
+        return self.verification_status
+
+    def skip_verification(self, commit=True):
+        """mark the verification as skipped, as the host is not reachable; stored contents are kept"""
+        self.verification_status = self.STATUS_SKIPPED
+        self.verification_error = None
+        self.verified_at = timezone.now()
+        if commit:
+            self.save(update_fields=self.SKIP_FIELDS if self.pk else None)
+        return self.verification_status
 
-        (resp_code, resp_content) = self.get_live_content(playwright_wrapper=playwright_wrapper,
-                                                          browser=self.browser,
-                                                          use_proxy=self.use_proxy,)
+    def get_timeout(self):
+        """the timeout of the content's requests, in seconds: its `timeout`, when set,
+        or the 95th percentile of its recent load times, with ADAPTIVE_TIMEOUT_FACTOR headroom,
+        clamped between ADAPTIVE_TIMEOUT_MIN and ADAPTIVE_TIMEOUT_MAX, and never longer than REQUESTS_MAX_TIMEOUT;
+        None (the REQUESTS_MAX_TIMEOUT default) until ADAPTIVE_TIMEOUT_MIN_SAMPLES loads are known
+        """
+        if self.timeout:
+            return self.timeout
+        samples = sorted(self.load_times or [])
+        if len(samples) < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        p95 = samples[math.ceil(len(samples) * 0.95) - 1]
+        return min(max(p95 * ADAPTIVE_TIMEOUT_FACTOR, ADAPTIVE_TIMEOUT_MIN), ADAPTIVE_TIMEOUT_MAX, REQUESTS_MAX_TIMEOUT)
+
+    def set_verification(self, result):
+        """compare the fetched content with the stored one and set the verification fields, without saving
+
+        the status code is always stored, timing and final url only for fetched (not re-extracted) pages
+        """
+        resp_code, resp_content = result
+        self.status_code = resp_code
+        if result.final_url is not None:
+            self.final_url = result.final_url
+            self.response_time = result.response_time
+            if result.ok and result.response_time is not None and not result.from_cache:
+                self.load_times = ((self.load_times or []) + [round(result.response_time, 3)])[
+                    -ADAPTIVE_TIMEOUT_SAMPLES:
+                ]
 
         if resp_code not in (200, 202):
             self.verification_status = Content.STATUS_ERROR
             self.verification_error = "ERRORE {0} ({1})".format(
                 resp_code, resp_content
             )
+            self.fingerprint = None
         else:
             if resp_content != self.content:
                 self.verification_status = self.STATUS_CHANGED
@@ -170,9 +494,49 @@ class Content(models.Model):
                 self.verification_status = self.STATUS_NOT_CHANGED
 
             self.verification_error = None
-        self.next_content =resp_content
+            self.fingerprint = result.fingerprint
+
+        if resp_content == self.content:
+            self.next_content = None
+        else:
+            self.next_content = resp_content
         self.verified_at = timezone.now()
-        self.save()
+
+    def reextract(self, capture=None, rebaseline=False, commit=True, playwright_wrapper=None):
+        """extract the content again from a raw capture of its page (the latest one, by default),
+        with the current selector and cleaners, without fetching the page
+
+        the capture is rendered again by `playwright_wrapper`, when given, as verifications do;
+        otherwise the content is extracted with lxml (see `websourcemonitor.extraction`),
+        which only approximates the browser's text: the comparison is reported,
+        but nothing is written to the db, and the stored content is never replaced
+
+        with `rebaseline`, the extracted content replaces the stored one,
+        instead of being compared with it
+
+        the fingerprint is replaced, as it may have been computed with another selector;
+        nothing is written to the db, unless `commit` is set
+        """
+        if capture is None:
+            capture = self.raw_captures.order_by('-captured_at', '-id').first()
+            if capture is None:
+                return None
+
+        if playwright_wrapper is None:
+            result = VerificationResult(*extraction.extract(
+                capture.html, self.selector, url=self.url, use_cleaner=self.use_cleaner
+            ))
+            rebaseline = commit = False
+        else:
+            result = playwright_wrapper.extract_from_html(
+                capture.html, self.url, self.selector, use_cleaner=self.use_cleaner
+            )
+        if rebaseline and result.status == 200:
+            self.content = result.content
+        self.set_verification(result)
+        self.verified_at = capture.captured_at
+        if commit:
+            self.save()
 
         return self.verification_status
 
@@ -186,7 +550,8 @@ class Content(models.Model):
                 resp_code, resp_content
             )
         else:
-            self.content = self.next_content
+            if self.next_content is not None:
+                self.content = self.next_content
             self.next_content = None
             self.verification_status = self.STATUS_UPDATED
             self.verification_error = None
@@ -194,12 +559,16 @@ class Content(models.Model):
         self.verified_at = timezone.now()
         self.save()
 
+        if self.verification_status == self.STATUS_UPDATED and self.content is not None:
+            ContentSnapshot.objects.record(self, self.content)
+
         return self.verification_status
 
     def reset(self):
         """resets content and status, restart from scratch"""
         self.content = None
         self.next_content = None
+        self.fingerprint = None
         self.verification_status = None
         self.verification_error = None
         self.verified_at = None
@@ -209,3 +578,337 @@ class Content(models.Model):
         """change the status of the is_verification_enabled flag"""
         self.is_verification_enabled = not self.is_verification_enabled
         self.save()
+
+
+class ContentSnapshotManager(models.Manager):
+
+    def record(self, content, text):
+        """Store a new version of the content's text, unless equal to the last one.
+
+        Every `SNAPSHOTS_KEYFRAME_INTERVAL` versions, the whole text is stored (keyframe);
+        all versions store the delta from the previous one.
+
+        :return: the new snapshot, or None if the text did not change
+        """
+        last = self.filter(content=content).order_by('-version').first()
+        if last is None:
+            return self.create(content=content, version=1, text=text)
+
+        previous_lines = self.get_lines(content, last.version)
+        lines = text.splitlines(keepends=True)
+        if lines == previous_lines:
+            return None
+
+        version = last.version + 1
+        return self.create(
+            content=content,
+            version=version,
+            text=text if (version - 1) % SNAPSHOTS_KEYFRAME_INTERVAL == 0 else None,
+            delta=snapshots.dumps(snapshots.make_delta(previous_lines, lines)),
+        )
+
+    def get_lines(self, content, version):
+        """Reconstruct the lines of a version of the content's text,
+        applying to the closest previous keyframe the deltas of the following versions
+        """
+        keyframe = self.filter(
+            content=content, version__lte=version, text__isnull=False
+        ).order_by('-version').first()
+        if keyframe is None:
+            raise self.model.DoesNotExist(f"No snapshot of {content} before version {version}")
+
+        lines = keyframe.text.splitlines(keepends=True)
+        for snapshot in self.filter(
+            content=content, version__gt=keyframe.version, version__lte=version
+        ).order_by('version'):
+            lines = snapshots.apply_delta(lines, snapshots.loads(snapshot.delta))
+        return lines
+
+    def get_text(self, content, version):
+        return "".join(self.get_lines(content, version))
+
+    def timeline(self, content, from_version=1):
+        """Yield the content's snapshots, starting from `from_version`,
+        each with the list of changes from the previous version, as stored in the deltas
+        (see `websourcemonitor.snapshots.delta_changes`)
+        """
+        # start from a keyframe preceding from_version, so that the changes of from_version can be listed
+        keyframe = self.filter(
+            content=content, version__lte=max(from_version - 1, 1), text__isnull=False
+        ).order_by('-version').first()
+        start = keyframe.version if keyframe else 1
+
+        lines = None
+        for snapshot in self.filter(content=content, version__gte=start).order_by('version'):
+            if lines is None:
+                lines = snapshot.text.splitlines(keepends=True)
+                changes = [(1, [], lines)]
+            else:
+                delta = snapshots.loads(snapshot.delta)
+                changes = snapshots.delta_changes(lines, delta)
+                lines = snapshots.apply_delta(lines, delta)
+            if snapshot.version >= from_version:
+                yield snapshot, changes
+
+
+class ContentSnapshot(models.Model):
+    """a version of the content's text, stored when the content is updated"""
+
+    content = models.ForeignKey(
+        Content,
+        related_name='snapshots',
+        verbose_name=_("Contenuto"),
+        on_delete=models.CASCADE
+    )
+    version = models.PositiveIntegerField(
+        verbose_name=_("Versione")
+    )
+    text = CompressedTextField(
+        blank=True, null=True,
+        verbose_name=_("Testo completo"),
+        help_text=_("Memorizzato solo per le versioni chiave")
+    )
+    delta = CompressedTextField(
+        blank=True, null=True,
+        verbose_name=_("Differenze dalla versione precedente")
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Data")
+    )
+
+    objects = ContentSnapshotManager()
+
+    class Meta:
+        verbose_name = 'istantanea'
+        verbose_name_plural = 'istantanee'
+        unique_together = ('content', 'version')
+
+    def __str__(self):
+        return f"{self.content} v{self.version}"
+
+    @property
+    def is_keyframe(self):
+        return self.text is not None
+
+
+class RawCaptureManager(models.Manager):
+
+    def store(self, content, html):
+        """Store the rendered page of the content, then remove its captures
+        exceeding RAW_HTML_RETENTION, or older than RAW_HTML_MAX_AGE_DAYS
+        """
+        capture = self.create(
+            content=content, url=content.url, selector=content.selector, html=html
+        )
+        stale_ids = list(
+            self.filter(content=content).order_by('-captured_at', '-id').values_list('id', flat=True)[
+                RAW_HTML_RETENTION:
+            ]
+        )
+        self.filter(
+            models.Q(id__in=stale_ids) |
+            models.Q(captured_at__lt=timezone.now() - datetime.timedelta(days=RAW_HTML_MAX_AGE_DAYS)),
+            content=content
+        ).delete()
+        return capture
+
+    def latest_for(self, contents):
+        """Map the ids of the contents to their latest captures, with one query"""
+        latest_id = self.filter(content=models.OuterRef('content')).order_by('-captured_at', '-id').values('id')[:1]
+        return {
+            capture.content_id: capture
+            for capture in self.filter(content__in=contents, id=models.Subquery(latest_id))
+        }
+
+
+class RawCapture(models.Model):
+    """the rendered html page of a content, captured during a verification,
+    to extract the content again, offline"""
+
+    content = models.ForeignKey(
+        Content,
+        related_name='raw_captures',
+        verbose_name=_("Contenuto"),
+        on_delete=models.CASCADE
+    )
+    url = models.URLField(max_length=1024)
+    selector = models.CharField(blank=True, max_length=512)
+    html = CompressedTextField(
+        verbose_name=_("Pagina html")
+    )
+    captured_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name=_("Data")
+    )
+
+    objects = RawCaptureManager()
+
+    class Meta:
+        verbose_name = 'pagina catturata'
+        verbose_name_plural = 'pagine catturate'
+
+    def __str__(self):
+        return f"{self.content} ({self.captured_at})"
+
+
+class ContentSearchManager(models.Manager):
+
+    def index(self, contents):
+        """Store the full-text search vectors of the contents whose text changed, on Postgres;
+        SQLite indexes the contents by itself, with triggers, and other dbs scan them"""
+        if connections[self.db].vendor != 'postgresql':
+            return
+        documents = {content.pk: search.document(content) for content in contents if content.pk is not None}
+        stored = dict(self.filter(content_id__in=documents).values_list('content_id', 'checksum'))
+        changed = {
+            content_id: document for content_id, document in documents.items()
+            if stored.get(content_id) != search.checksum(document)
+        }
+        if changed:
+            search.store_vectors(changed, using=self.db)
+
+    def ranked(self, query, limit=SEARCH_RESULTS_LIMIT):
+        """Return the ids of the contents best matching the query, best first"""
+        return search.ranked(Content.objects.using(self.db), query, limit)
+
+
+class ContentSearch(models.Model):
+    """the full-text search vector of a content, on Postgres (see `websourcemonitor.search`)"""
+
+    content = models.OneToOneField(
+        Content,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name=_("Contenuto"),
+        on_delete=models.CASCADE
+    )
+    checksum = models.CharField(
+        max_length=40,
+        default='',
+        verbose_name=_("Impronta del testo indicizzato")
+    )
+
+    objects = ContentSearchManager()
+
+    class Meta:
+        verbose_name = 'documento di ricerca'
+        verbose_name_plural = 'documenti di ricerca'
+
+    def __str__(self):
+        return str(self.content)
+
+
+class StatusCounterManager(models.Manager):
+
+    def record(self, contents, deleted=False):
+        """Move the contents to the counters of their current source type and status,
+        from the counters they were counted in when read from the db (none, for new contents)
+
+        Called when contents are saved, created or deleted; contents changed with bulk queries
+        (`QuerySet.update`, `QuerySet.delete`) are not counted until the next `reconcile`.
+        """
+        deltas = collections.Counter()
+        for content in contents:
+            counted = getattr(content, '_counted', None)
+            if counted is StatusCounter.UNTRACKED:
+                continue
+            current = None if deleted else content.counter_key
+            if counted == current:
+                continue
+            if counted is not None:
+                deltas[counted] -= 1
+            if current is not None:
+                deltas[current] += 1
+            content._counted = current
+        self.add(deltas)
+
+    def add(self, deltas):
+        """Add the deltas to the counters, with `{(source_type_id, verification_status): delta}` deltas"""
+        for (source_type_id, status), delta in deltas.items():
+            if not delta:
+                continue
+            counter = self.filter(source_type_id=source_type_id, verification_status=StatusCounter.key(status))
+            if counter.update(count=models.F('count') + delta):
+                continue
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(
+                        source_type_id=source_type_id, verification_status=StatusCounter.key(status), count=delta
+                    )
+            except IntegrityError:
+                # created meanwhile by another process
+                counter.update(count=models.F('count') + delta)
+
+    def reconcile(self):
+        """Recount the contents by source type and status, with a GROUP BY over the contents,
+        and correct the counters that drifted
+
+        :return: the number of corrected counters
+        """
+        with transaction.atomic(using=self.db):
+            counters = {
+                (counter.source_type_id, counter.verification_status): counter
+                for counter in self.select_for_update()
+            }
+            actual = {
+                (source_type_id, StatusCounter.key(status)): count
+                for source_type_id, status, count in Content.objects.using(self.db).order_by().values(
+                    'source_type_id', 'verification_status'
+                ).annotate(count=models.Count('id')).values_list('source_type_id', 'verification_status', 'count')
+            }
+            corrected = [
+                counter for key, counter in counters.items() if key in actual and counter.count != actual[key]
+            ]
+            for counter in corrected:
+                counter.count = actual[counter.source_type_id, counter.verification_status]
+            self.bulk_update(corrected, ['count'])
+            missing = [
+                self.model(source_type_id=source_type_id, verification_status=status, count=count)
+                for (source_type_id, status), count in actual.items() if (source_type_id, status) not in counters
+            ]
+            self.bulk_create(missing)
+            stale = [counter.id for key, counter in counters.items() if key not in actual]
+            self.filter(id__in=stale).delete()
+        return len(corrected) + len(missing) + len(stale)
+
+
+class StatusCounter(models.Model):
+    """the number of contents of a source type in a verification status,
+    maintained incrementally as contents change status, and reconciled periodically"""
+
+    # contents never verified, with no status, are counted in their own counter
+    NOT_VERIFIED = -1
+    # contents read from the db without their status are not counted, until the next reconcile
+    UNTRACKED = object()
+
+    source_type = models.ForeignKey(
+        SourceType,
+        related_name='status_counters',
+        verbose_name=_("Tipo di fonte"),
+        on_delete=models.CASCADE
+    )
+    verification_status = models.IntegerField(
+        choices=((NOT_VERIFIED, 'Non verificato'), ) + Content.STATUS_CHOICES,
+        verbose_name=_("Stato")
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name=_("Contenuti")
+    )
+
+    objects = StatusCounterManager()
+
+    class Meta:
+        verbose_name = 'contatore di stato'
+        verbose_name_plural = 'contatori di stato'
+        unique_together = ('source_type', 'verification_status')
+
+    def __str__(self):
+        return f"{self.source_type} - {self.get_verification_status_display()}: {self.count}"
+
+    @classmethod
+    def key(cls, status):
+        """The counter's status of contents with the `status` verification status"""
+        return cls.NOT_VERIFIED if status is None else status
@@ -0,0 +1,232 @@
+"""Full-text search over the contents.
+
+The text of each content (title, url, notes, error and the captured contents) is indexed by the db,
+with no plain copy of it, as the captured contents are stored compressed:
+
+- SQLite: an FTS5 table with external content, read from a view of the contents table,
+  where the contents are decompressed by the `websourcemonitor_decompress` function,
+  registered on each connection; triggers on the contents table update the index,
+  only when the indexed fields change;
+- Postgres: the `tsvector` of each content's text, stored in its `ContentSearch` row with the text's checksum,
+  and computed again only when the checksum changes; a GIN index is built over them;
+- elsewhere (or SQLite without FTS5): no index, the contents are scanned.
+
+Queries are lists of words: the matching contents contain all of them.
+"""
+import hashlib
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .fields import CompressedTextField
+
+# text search configuration of the Postgres index (no stemming, as SQLite's unicode61 tokenizer)
+POSTGRES_CONFIG = 'simple'
+POSTGRES_INDEX = 'websourcemonitor_search_vector_gin'
+
+CONTENTS_TABLE = 'websourcemonitor_content'
+DOCUMENTS_TABLE = 'websourcemonitor_contentsearch'
+VIEW = 'websourcemonitor_contentsearch_view'
+FTS_TABLE = 'websourcemonitor_contentsearch_fts'
+DECOMPRESS_FUNCTION = 'websourcemonitor_decompress'
+
+# the fields of the content making up its document, in order
+DOCUMENT_FIELDS = ('title', 'url', 'notes', 'verification_error', 'content', 'next_content')
+COMPRESSED_FIELDS = ('content', 'next_content')
+
+_WORD = re.compile(r'\w+')
+
+
+def _document_sql(row: str) -> str:
+    """The SQLite expression of the document of the `row` ('new', 'old', or a table) of the contents table."""
+    values = [
+        f"{DECOMPRESS_FUNCTION}({row}.{field})" if field in COMPRESSED_FIELDS else f"{row}.{field}"
+        for field in DOCUMENT_FIELDS
+    ]
+    return " || char(10) || ".join(f"coalesce({value}, '')" for value in values)
+
+
+def _changed_sql() -> str:
+    return " OR ".join(f"old.{field} IS NOT new.{field}" for field in DOCUMENT_FIELDS)
+
+
+FTS_SQL = (
+    f"CREATE VIEW IF NOT EXISTS {VIEW} AS SELECT id AS content_id, {_document_sql(CONTENTS_TABLE)} AS document "
+    f"FROM {CONTENTS_TABLE}",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"document, content='{VIEW}', content_rowid='content_id', tokenize='unicode61 remove_diacritics 2')",
+)
+TRIGGERS_SQL = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {CONTENTS_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, {_document_sql('new')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {CONTENTS_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, {_document_sql('old')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {CONTENTS_TABLE} WHEN {_changed_sql()} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, {_document_sql('old')}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, {_document_sql('new')}); END",
+)
+TRIGGERS = tuple(f"{FTS_TABLE}_{suffix}" for suffix in ('insert', 'delete', 'update'))
+
+
+def document(content) -> str:
+    """Return the searchable text of the content, one field per line."""
+    return '\n'.join(str(value) for value in (getattr(content, f) for f in DOCUMENT_FIELDS) if value)
+
+
+def checksum(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def words(query: str) -> list:
+    """Split the query into the words searched, lowercase."""
+    return _WORD.findall(query.lower())
+
+
+def backend(using='default') -> str:
+    """Return the search backend of the db: 'postgresql', 'fts5', or 'scan' when there is no index."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return 'fts5'
+    return 'scan'
+
+
+def fts_match(query: str) -> str:
+    """Turn the query into an FTS5 match expression, quoting each word,
+    so that the user's input is never parsed as FTS5 syntax.
+    """
+    return ' '.join(f'"{word}"' for word in words(query))
+
+
+def _decompress(value):
+    return None if value is None else CompressedTextField.decompress(value)
+
+
+def register_functions(sender, connection, **kwargs):
+    """Register the functions of the SQLite index on a new connection (a `connection_created` receiver)."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(DECOMPRESS_FUNCTION, 1, _decompress, deterministic=True)
+
+
+def matching(contents, query: str):
+    """Filter the contents queryset, keeping those matching the query;
+    queries with no words (e.g. only punctuation) match nothing."""
+    if not words(query):
+        return contents.none()
+    kind = backend(contents.db)
+    if kind == 'postgresql':
+        return contents.filter(id__in=RawSQL(
+            f"SELECT content_id FROM {DOCUMENTS_TABLE} WHERE vector @@ websearch_to_tsquery(%s::regconfig, %s)",
+            (POSTGRES_CONFIG, query)
+        ))
+    if kind == 'fts5':
+        return contents.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (fts_match(query), ))
+        )
+    searched = words(query)
+    ids = [
+        content.pk for content in contents.only(*DOCUMENT_FIELDS).iterator()
+        if all(word in document(content).lower() for word in searched)
+    ]
+    return contents.filter(id__in=ids)
+
+
+def ranked(contents, query: str, limit: int) -> list:
+    """Return the ids of the best `limit` contents matching the query, best first."""
+    if not words(query):
+        return []
+    kind = backend(contents.db)
+    if kind == 'postgresql':
+        sql = (
+            f"SELECT content_id FROM {DOCUMENTS_TABLE}, websearch_to_tsquery(%s::regconfig, %s) query "
+            f"WHERE vector @@ query ORDER BY ts_rank(vector, query) DESC, content_id LIMIT %s"
+        )
+        params = (POSTGRES_CONFIG, query, limit)
+    elif kind == 'fts5':
+        # FTS5 ranks by bm25, the best matches first
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s"
+        params = (fts_match(query), limit)
+    else:
+        return list(matching(contents, query).order_by('id').values_list('id', flat=True)[:limit])
+    with connections[contents.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [content_id for content_id, in cursor.fetchall()]
+
+
+def store_vectors(documents: dict, using='default'):
+    """Store the Postgres tsvectors of the documents (by content id), with their checksums."""
+    rows = [(content_id, checksum(text), POSTGRES_CONFIG, text) for content_id, text in documents.items()]
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {DOCUMENTS_TABLE} (content_id, checksum, vector) "
+            f"VALUES (%s, %s, to_tsvector(%s::regconfig, %s)) "
+            f"ON CONFLICT (content_id) DO UPDATE SET checksum = EXCLUDED.checksum, vector = EXCLUDED.vector",
+            rows
+        )
+
+
+def snippet(text: str, query: str, length: int = 200) -> str:
+    """Return the first line of the text containing one of the query's words, shortened to `length` characters."""
+    searched = words(query)
+    for line in (text or '').splitlines():
+        lowered = line.lower()
+        position = min((lowered.find(word) for word in searched if word in lowered), default=-1)
+        if position >= 0:
+            start = max(position - length // 4, 0)
+            return ('…' if start else '') + line[start:start + length].strip()
+    return ''
+
+
+def create_index(schema_editor):
+    """Create the full-text index of the contents, for the db of the schema editor;
+    on Postgres, the documents are then stored by `ContentSearch.objects.index`."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"ALTER TABLE {DOCUMENTS_TABLE} ADD COLUMN vector tsvector")
+        schema_editor.execute(f"CREATE INDEX {POSTGRES_INDEX} ON {DOCUMENTS_TABLE} USING gin (vector)")
+    elif vendor == 'sqlite' and _has_fts5(schema_editor.connection):
+        # the connection may predate the app's `connection_created` receiver
+        register_functions(None, schema_editor.connection)
+        for sql in FTS_SQL + TRIGGERS_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_index(schema_editor):
+    """Drop the full-text index created by `create_index`."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
+        schema_editor.execute(f"ALTER TABLE {DOCUMENTS_TABLE} DROP COLUMN IF EXISTS vector")
+    elif vendor == 'sqlite':
+        for trigger in TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        schema_editor.execute(f"DROP VIEW IF EXISTS {VIEW}")
+
+
+def restore_triggers(sender, using='default', **kwargs):
+    """Create the triggers of the SQLite index again, if missing, and rebuild the index (a `post_migrate` receiver).
+
+    SQLite migrations altering the contents table copy it to a new one, dropping its triggers.
+    """
+    connection = connections[using]
+    if backend(using) != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {name for name, in cursor.fetchall()}
+        if existing.issuperset(TRIGGERS):
+            return
+        register_functions(None, connection)
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _has_fts5(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
@@ -0,0 +1,228 @@
+"""On-disk cache of the static assets requested by the browser.
+
+Stylesheets, scripts, fonts and images of the pages (often the same bundles,
+shared by all the sources built on the same CMS) are served from a local cache,
+shared by all browser contexts, and across runs, instead of being downloaded
+at each verification; they never affect the extracted content.
+
+Entries are keyed by url, and store the response's validators (`ETag`, `Last-Modified`):
+fresh entries are served with no request at all, stale ones are revalidated with
+a conditional request, and served again if the server answers 304.
+The cache is capped in size: least recently used entries are evicted first.
+"""
+import email.utils
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Optional
+
+from ..conf import ASSET_CACHE_PATH, ASSET_CACHE_MAX_SIZE, ASSET_CACHE_TTL
+
+CACHEABLE_RESOURCE_TYPES = frozenset(('stylesheet', 'script', 'font', 'image'))
+
+# headers not replayed from the cache: bodies are stored decoded, and cookies are never cached
+EXCLUDED_HEADERS = frozenset((
+    'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive', 'set-cookie',
+))
+
+_max_age_re = re.compile(r"(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def freshness_lifetime(headers: dict, default_ttl: int) -> Optional[int]:
+    """Return how many seconds a response can be served from the cache without revalidation,
+    according to its headers (lowercase names), or None if it must not be stored.
+    """
+    cache_control = headers.get('cache-control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    vary = {v.strip() for v in headers.get('vary', '').lower().split(',') if v.strip()}
+    if vary - {'accept-encoding'}:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+
+    match = _max_age_re.search(cache_control)
+    if match:
+        return int(match.group(1))
+    if 'expires' in headers:
+        try:
+            expires = email.utils.parsedate_to_datetime(headers['expires']).timestamp()
+        except (TypeError, ValueError):
+            return 0
+        return max(int(expires - time.time()), 0)
+    return default_ttl
+
+
+class AssetCache:
+    """A size-capped, LRU, on-disk cache of static assets, to be used as a playwright route handler
+
+    simple usage:
+
+        cache = AssetCache()
+        context.route("**/*", cache.handle)
+
+    Each entry is made of two files, named after the hash of the url:
+    the response's metadata (`.json`) and body (`.body`).
+    Recency is tracked with the files' modification times, so that the cache can be shared
+    by concurrent processes, and survive them.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = ASSET_CACHE_MAX_SIZE,
+                 default_ttl: int = ASSET_CACHE_TTL):
+        self.path = path or ASSET_CACHE_PATH
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+        self.size = self._disk_size()
+
+    def _disk_size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+
+    def _files(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, f"{key}.json"), os.path.join(self.path, f"{key}.body")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the entry of the url (metadata and `body`), or None if it is not cached."""
+        meta_file, body_file = self._files(url)
+        try:
+            with open(meta_file, 'r') as f:
+                entry = json.load(f)
+            with open(body_file, 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        now = time.time()
+        for file in (meta_file, body_file):
+            try:
+                os.utime(file, (now, now))
+            except OSError:
+                pass
+        return entry
+
+    @staticmethod
+    def _file_size(file):
+        try:
+            return os.path.getsize(file)
+        except OSError:
+            return 0
+
+    def _write(self, file, data):
+        """Replace the file with the data, keeping track of the size of the cache."""
+        replaced = self._file_size(file)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, file)
+        self.size += len(data) - replaced
+
+    def put(self, url: str, status: int, headers: dict, body: bytes) -> bool:
+        """Store the response to a request of the url, if its headers allow it.
+
+        :return: whether the response was stored
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        if status != 200 or lifetime is None:
+            return False
+
+        meta = json.dumps({
+            'url': url,
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k not in EXCLUDED_HEADERS},
+            'expires_at': time.time() + lifetime,
+        }).encode('utf-8')
+        meta_file, body_file = self._files(url)
+        self._write(body_file, body)
+        self._write(meta_file, meta)
+        if self.size > self.max_size:
+            self.evict()
+        return True
+
+    def refresh(self, url: str, entry: dict, headers: dict):
+        """Extend the freshness of an entry, after a successful revalidation."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        lifetime = freshness_lifetime({**entry['headers'], **headers}, self.default_ttl)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        meta['expires_at'] = time.time() + (lifetime or 0)
+        self._write(self._files(url)[0], json.dumps(meta).encode('utf-8'))
+
+    def evict(self):
+        """Remove the least recently used entries, until the cache is 10% below its size cap."""
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        self.size = sum(size for _, size, _ in files)
+        target = self.max_size * 0.9
+        for _, size, file in files:
+            if self.size <= target:
+                break
+            try:
+                os.remove(file)
+            except OSError:
+                continue
+            self.size -= size
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        return entry['expires_at'] > time.time()
+
+    @staticmethod
+    def _fulfill(route, entry):
+        route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['body'])
+
+    def handle(self, route, request):
+        """Playwright route handler: serve static assets from the cache, or fetch and store them."""
+        if request.method != 'GET' or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            route.fallback()
+            return
+
+        url = request.url
+        entry = self.get(url)
+        if entry and self.is_fresh(entry):
+            self.hits += 1
+            self._fulfill(route, entry)
+            return
+
+        headers = dict(request.headers)
+        if entry:
+            etag = entry['headers'].get('etag')
+            last_modified = entry['headers'].get('last-modified')
+            if etag:
+                headers['if-none-match'] = etag
+            if last_modified:
+                headers['if-modified-since'] = last_modified
+
+        try:
+            response = route.fetch(headers=headers)
+        except Exception:
+            if entry:
+                # a stale asset is better than a broken page
+                self.hits += 1
+                self._fulfill(route, entry)
+            else:
+                route.fallback()
+            return
+
+        if response.status == 304 and entry:
+            self.revalidations += 1
+            self.refresh(url, entry, response.headers)
+            self._fulfill(route, entry)
+            return
+
+        self.misses += 1
+        body = response.body()
+        self.put(url, response.status, response.headers, body)
+        route.fulfill(response=response, body=body)
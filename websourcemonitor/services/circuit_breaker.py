@@ -0,0 +1,95 @@
+"""Per-host circuit breaker for verification runs.
+
+When a host stops answering, each of its contents would wait the full request timeout, and fail.
+After `CIRCUIT_BREAKER_THRESHOLD` consecutive connection errors or timeouts (`CIRCUIT_BREAKER_STATUSES`)
+the host's circuit opens, and its remaining contents are skipped; after `CIRCUIT_BREAKER_COOLDOWN` seconds
+a single content is let through, as a probe: the circuit closes if it succeeds, and opens again if not.
+Breakers are thread-safe, so that the workers of a run can share them.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable
+from urllib.parse import urlsplit
+
+from ..conf import CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN, CIRCUIT_BREAKER_STATUSES
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower()
+
+
+class HostCircuitBreaker:
+    """Circuits of the hosts visited in a run
+
+    simple usage:
+
+        breaker = HostCircuitBreaker()
+        if breaker.allow(url):
+            result = fetch(url)
+            breaker.record(url, result.status)
+        else:
+            breaker.skip(url)
+    """
+
+    def __init__(self, threshold: int = CIRCUIT_BREAKER_THRESHOLD, cooldown: float = CIRCUIT_BREAKER_COOLDOWN,
+                 statuses: Iterable[int] = CIRCUIT_BREAKER_STATUSES, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.statuses = frozenset(statuses)
+        self.clock = clock
+        self.failures: Dict[str, int] = Counter()
+        self.states: Dict[str, str] = {}
+        self.opened_at: Dict[str, float] = {}
+        # number of contents skipped, by host
+        self.skipped: Dict[str, int] = Counter()
+        self._lock = threading.Lock()
+
+    def state(self, host: str) -> str:
+        return self.states.get(host, CLOSED)
+
+    def allow(self, url: str) -> bool:
+        """Tell whether the url can be requested."""
+        host = host_of(url)
+        with self._lock:
+            state = self.state(host)
+            if state == OPEN and self.clock() - self.opened_at[host] >= self.cooldown:
+                self.states[host] = HALF_OPEN
+                return True
+            if state == CLOSED:
+                return True
+            # open, or half-open with a probe already running
+            return False
+
+    def skip(self, url: str):
+        """Count a content of the url's host as skipped."""
+        with self._lock:
+            self.skipped[host_of(url)] += 1
+
+    def record(self, url: str, status: int):
+        """Record the outcome of a request to the url."""
+        if status in self.statuses:
+            self.record_failure(url)
+            return
+        host = host_of(url)
+        with self._lock:
+            self.failures[host] = 0
+            self.states.pop(host, None)
+
+    def record_failure(self, url: str):
+        """Record a failed request to the url, i.e. one raising an exception instead of returning a status."""
+        host = host_of(url)
+        with self._lock:
+            self.failures[host] += 1
+            if self.state(host) == HALF_OPEN or self.failures[host] >= self.threshold:
+                self.states[host] = OPEN
+                self.opened_at[host] = self.clock()
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of skipped contents, by host, for the hosts with skipped contents."""
+        with self._lock:
+            return {host: n for host, n in sorted(self.skipped.items()) if n}
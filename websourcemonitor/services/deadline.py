@@ -0,0 +1,51 @@
+"""Time budget of a verification run.
+
+With a deadline, contents are verified by priority, and each request times out at the latest
+when the budget does; once the budget runs out, the remaining contents are left for the next run,
+and reported as skipped.
+Less than `MIN_TIMEOUT` seconds are not enough for a request: the budget is run out by then.
+"""
+import time
+from typing import Callable, List, Optional
+
+MIN_TIMEOUT = 1.0
+
+
+class RunDeadline:
+    """The time left to a run
+
+    simple usage:
+
+        deadline = RunDeadline(3600)
+        for content in contents:
+            if deadline.expired():
+                deadline.skip(content)
+                continue
+            content.verify(timeout=deadline.cap(content.get_timeout(), REQUESTS_MAX_TIMEOUT))
+    """
+
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic, min_timeout: float = MIN_TIMEOUT):
+        self.clock = clock
+        self.expires_at = clock() + budget
+        self.min_timeout = min_timeout
+        self.skipped: List = []
+
+    def remaining(self) -> float:
+        return max(self.expires_at - self.clock(), 0.0)
+
+    def expired(self) -> bool:
+        """Tell whether the time left is too short for a request."""
+        return self.remaining() < self.min_timeout
+
+    def expires_before(self, instant: float) -> bool:
+        """Tell whether the deadline comes before the given instant (of the same clock)."""
+        return self.expires_at - self.min_timeout <= instant
+
+    def cap(self, timeout: Optional[float], default: float) -> float:
+        """Return the timeout (`default`, if None), shortened to the time left, but never below `min_timeout`:
+        a zero timeout would disable the request's timeout altogether."""
+        return max(min(timeout or default, self.remaining()), self.min_timeout)
+
+    def skip(self, item):
+        """Record the item as skipped, as the budget ran out."""
+        self.skipped.append(item)
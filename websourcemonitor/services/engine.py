@@ -0,0 +1,31 @@
+"""Lazy loading of the fetch engine.
+
+Live contents are fetched by the engine class of the `FETCH_ENGINE` setting
+(`PlaywrightWrapper`, by default), imported only when the first content is actually fetched:
+processes only using the models (the web server, the admin, the workers of other queues)
+do not load playwright, nor its browser drivers.
+
+An engine is built with the `browser_set`, `use_proxy` and `proxy` keyword arguments (plus its own ones),
+and exposes:
+
+- `get_live_content(url, selector, output_format, **kwargs)`, returning a `VerificationResult`;
+- `extract_from_html(html, url, selector, output_format, use_cleaner)`, returning a `VerificationResult`
+  extracted from a captured page, rendered again with no network traffic (see `content_reextract`);
+- `stop()`, releasing the browser.
+"""
+import functools
+
+from django.utils.module_loading import import_string
+
+from ..conf import FETCH_ENGINE
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine_class(path: str = FETCH_ENGINE):
+    """Import and return the engine class, by its dotted path."""
+    return import_string(path)
+
+
+def new_engine(**kwargs):
+    """Return a new instance of the engine, launching its browser."""
+    return get_engine_class()(**kwargs)
@@ -0,0 +1,46 @@
+"""Short-lived cache of the fetched contents.
+
+The results of live fetches are kept in Django's cache framework (the `FETCH_CACHE_ALIAS` cache)
+for `FETCH_CACHE_TTL` seconds, so that the checks following a verification
+(the admin's "Verifica contenuto" button, `content_verify --content` and `--diff`)
+reuse its result, instead of launching a browser and fetching the page again.
+
+Only successful fetches are cached; `FETCH_CACHE_TTL = 0` disables the cache.
+"""
+import hashlib
+import json
+from typing import Optional
+
+from django.core.cache import caches
+
+from ..conf import FETCH_CACHE_TTL, FETCH_CACHE_ALIAS
+from .results import VerificationResult
+
+KEY_PREFIX = "websourcemonitor:fetch:"
+
+
+def cache_key(url, selector, output_format, browser, proxy, use_cleaner) -> str:
+    """Return the cache key of a fetch: all the arguments affecting the fetched content."""
+    identity = json.dumps(
+        [url, selector or "", output_format, browser, proxy, bool(use_cleaner)], sort_keys=True, default=str
+    )
+    return KEY_PREFIX + hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def get(key: str) -> Optional[VerificationResult]:
+    """Return the cached result, or None."""
+    if not FETCH_CACHE_TTL:
+        return None
+    data = caches[FETCH_CACHE_ALIAS].get(key)
+    return VerificationResult.from_dict(dict(data, from_cache=True)) if data is not None else None
+
+
+def set(key: str, result: VerificationResult):
+    """Cache a successful result; the html of the page is never cached."""
+    if not FETCH_CACHE_TTL or result.status not in (200, 202):
+        return
+    caches[FETCH_CACHE_ALIAS].set(key, result.as_dict(), FETCH_CACHE_TTL)
+
+
+def delete(key: str):
+    caches[FETCH_CACHE_ALIAS].delete(key)
@@ -0,0 +1,30 @@
+"""HAR archives of the sources.
+
+In `record` mode, `PlaywrightWrapper` saves all the traffic of each request (the page,
+its scripts, styles, images and XHRs) in a HAR archive of the source;
+in `replay` mode, every request is served from those archives, and nothing reaches the network,
+so that a whole verification run can be reproduced on another machine, exactly.
+"""
+import hashlib
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+from ..conf import HARS_PATH
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+
+def har_path(url: str, path: Optional[str] = None) -> str:
+    """Return the path of the HAR archive of the source at `url`.
+
+    Archives are zip files (the HAR and the bodies of the responses),
+    named after the host and a hash of the url, so that each source has its own,
+    and they can be copied around selectively.
+    """
+    path = path or HARS_PATH
+    host = urlsplit(url).hostname or 'localhost'
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(path, f"{host}_{digest}.zip")
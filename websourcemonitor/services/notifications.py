@@ -0,0 +1,267 @@
+"""Digests of the verifications, notified by email and on Slack.
+
+A digest lists the contents changed, or in error, since a given time, grouped by source type;
+it is capped to `NOTIFY_MAX_ITEMS` contents, the others are only counted.
+Digests are sent once per run, instead of one message per change:
+
+- by email, to each of the recipients, over a single SMTP connection;
+- on Slack, in chunks of at most `SLACK_MESSAGE_MAX_LENGTH` characters, at most one message
+  every `SLACK_MIN_INTERVAL` seconds; rate limited requests (429) are retried after `Retry-After` seconds.
+"""
+import datetime
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+
+from ..conf import (
+    SLACK_TOKEN, SLACK_CHANNEL, SLACK_API_URL, SLACK_MESSAGE_MAX_LENGTH, SLACK_MIN_INTERVAL,
+    SMTP_HOST, SMTP_PORT, SMTP_USE_TLS, SMTP_USERNAME, SMTP_PASSWORD,
+    EMAIL_SUBJECT_PREFIX, EMAIL_FROM, NOTIFY_MAX_ITEMS, NOTIFY_BASE_URL
+)
+from ..models import Content
+
+logger = logging.getLogger(__name__)
+
+NOTIFIED_STATUSES = (Content.STATUS_CHANGED, Content.STATUS_ERROR)
+
+
+@dataclass
+class DigestSection:
+    """The notified contents of a source type"""
+    source_type: str
+    changed: int = 0
+    errors: int = 0
+    items: List[Content] = field(default_factory=list)
+
+    @property
+    def omitted(self) -> int:
+        return self.changed + self.errors - len(self.items)
+
+
+@dataclass
+class Digest:
+    sections: List[DigestSection]
+
+    @property
+    def changed(self) -> int:
+        return sum(section.changed for section in self.sections)
+
+    @property
+    def errors(self) -> int:
+        return sum(section.errors for section in self.sections)
+
+    @property
+    def subject(self) -> str:
+        return f"{self.changed} contenuti cambiati, {self.errors} errori"
+
+    def __bool__(self):
+        return bool(self.sections)
+
+
+def parse_since(value: str) -> datetime.datetime:
+    """Parse an ISO date or time; times with no offset are in the current time zone."""
+    since = datetime.datetime.fromisoformat(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _shares(totals: List[int], max_items: int) -> List[int]:
+    """Split `max_items` among sections with the given totals, one item at a time, in turn:
+    each section gets its fair share, and the shares of the smaller sections go to the others."""
+    shares = [0] * len(totals)
+    left = max_items
+    while left > 0 and any(share < total for share, total in zip(shares, totals)):
+        for n, total in enumerate(totals):
+            if left > 0 and shares[n] < total:
+                shares[n] += 1
+                left -= 1
+    return shares
+
+
+def build_digest(since, max_items: int = NOTIFY_MAX_ITEMS, contents: Optional[models.QuerySet] = None) -> Digest:
+    """Collect the contents changed, or in error, verified since `since`, grouped by source type.
+
+    The `max_items` listed contents are split among the source types, so that each of them lists some;
+    one query counts the contents by source type and status, then one per source type lists them.
+    """
+    if contents is None:
+        contents = Content.objects.all()
+    contents = contents.filter(verification_status__in=NOTIFIED_STATUSES, verified_at__gte=since)
+
+    sections = {}
+    fields = ('source_type', 'source_type__name', 'verification_status')
+    counts = contents.order_by().values(*fields).annotate(count=models.Count('id')).values_list(*fields, 'count')
+    for source_type, name, status, count in counts:
+        section = sections.setdefault(source_type, DigestSection(name))
+        if status == Content.STATUS_CHANGED:
+            section.changed += count
+        else:
+            section.errors += count
+
+    ordered = sorted(sections.items(), key=lambda item: (item[1].source_type, item[0]))
+    shares = _shares([section.changed + section.errors for _, section in ordered], max_items)
+    for (source_type, section), share in zip(ordered, shares):
+        if share:
+            section.items = list(contents.filter(source_type=source_type).only(
+                'id', 'title', 'url', 'verification_status', 'verification_error'
+            ).order_by('verification_status', 'title', 'id')[:share])
+
+    return Digest([section for _, section in ordered])
+
+
+def _link(content) -> str:
+    if NOTIFY_BASE_URL and content.verification_status == Content.STATUS_CHANGED:
+        return f"{NOTIFY_BASE_URL.rstrip('/')}{reverse('diff', args=[content.id])}"
+    return content.url
+
+
+def render_text(digest: Digest) -> List[str]:
+    """Return the lines of the digest, as plain text."""
+    lines = []
+    for section in digest.sections:
+        lines.append(f"{section.source_type}: {section.changed} cambiati, {section.errors} errori")
+        for content in section.items:
+            if content.verification_status == Content.STATUS_CHANGED:
+                lines.append(f"  - [cambiato] {content.title} - {_link(content)}")
+            else:
+                lines.append(f"  - [errore] {content.title} - {content.url} - {content.verification_error or ''}")
+        if section.omitted:
+            lines.append(f"  ... e altri {section.omitted}")
+        lines.append("")
+    return lines
+
+
+def _escape(text: str) -> str:
+    """Escape the characters with a meaning in Slack's mrkdwn"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def render_slack(digest: Digest) -> List[str]:
+    """Return the lines of the digest, in Slack's mrkdwn."""
+    lines = []
+    for section in digest.sections:
+        lines.append(f"*{_escape(section.source_type)}*: {section.changed} cambiati, {section.errors} errori")
+        for content in section.items:
+            title = _escape(content.title).replace('|', '-')
+            if content.verification_status == Content.STATUS_CHANGED:
+                lines.append(f"• <{_link(content)}|{title}>")
+            else:
+                lines.append(f"• :warning: <{content.url}|{title}> {_escape(content.verification_error or '')}")
+        if section.omitted:
+            lines.append(f"_... e altri {section.omitted}_")
+    return lines
+
+
+def chunk_lines(lines: Sequence[str], max_length: int) -> List[str]:
+    """Join the lines into chunks of at most `max_length` characters, splitting between lines;
+    lines longer than `max_length` are truncated."""
+    chunks, current = [], ''
+    for line in lines:
+        line = line[:max_length]
+        if current and len(current) + 1 + len(line) > max_length:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def send_email(digest: Digest, recipients: Sequence[str], connection=None) -> int:
+    """Send the digest to each recipient, over a single SMTP connection.
+
+    :return: the number of messages sent
+    """
+    if connection is None:
+        if not SMTP_HOST:
+            raise ValueError("SMTP_HOST is not set")
+        connection = get_connection(
+            'django.core.mail.backends.smtp.EmailBackend', host=SMTP_HOST, port=SMTP_PORT,
+            username=SMTP_USERNAME, password=SMTP_PASSWORD, use_tls=SMTP_USE_TLS
+        )
+    body = "\n".join(render_text(digest))
+    messages = [
+        EmailMessage(f"{EMAIL_SUBJECT_PREFIX}{digest.subject}", body, EMAIL_FROM, [recipient])
+        for recipient in recipients
+    ]
+    # the connection is opened once, and closed after the last message
+    return connection.send_messages(messages) or 0
+
+
+class SlackClient:
+    """Posts messages on a Slack channel, within the rate limits
+
+    simple usage:
+
+        SlackClient().post_lines(lines)
+    """
+
+    def __init__(self, token: str = SLACK_TOKEN, channel: str = SLACK_CHANNEL, api_url: str = SLACK_API_URL,
+                 min_interval: float = SLACK_MIN_INTERVAL, max_retries: int = 3,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        if not token or not channel:
+            raise ValueError("SLACK_TOKEN and SLACK_CHANNEL must be set")
+        self.token = token
+        self.channel = channel
+        self.api_url = api_url
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.clock = clock
+        self._last_post = None
+
+    def post(self, text: str):
+        """Post a message, waiting for the rate limits"""
+        data = json.dumps({'channel': self.channel, 'text': text}).encode()
+        for attempt in range(self.max_retries + 1):
+            if self._last_post is not None:
+                wait = self._last_post + self.min_interval - self.clock()
+                if wait > 0:
+                    self.sleep(wait)
+            self._last_post = self.clock()
+            request = urllib.request.Request(self.api_url, data=data, headers={
+                'Content-Type': 'application/json; charset=utf-8', 'Authorization': f"Bearer {self.token}",
+            })
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    result = json.loads(response.read().decode())
+            except urllib.error.HTTPError as e:
+                if e.code != 429 or attempt == self.max_retries:
+                    raise
+                retry_after = float(e.headers.get('Retry-After') or 1)
+                logger.warning(f"slack rate limit hit, retrying in {retry_after}s")
+                self.sleep(retry_after)
+                continue
+            if not result.get('ok'):
+                raise RuntimeError(f"slack error: {result.get('error')}")
+            return result
+
+    def post_lines(self, lines: Sequence[str], max_length: int = SLACK_MESSAGE_MAX_LENGTH) -> int:
+        """Post the lines, in as few messages as the length limit allows
+
+        :return: the number of messages posted
+        """
+        chunks = chunk_lines(lines, max_length)
+        for chunk in chunks:
+            self.post(chunk)
+        return len(chunks)
+
+
+def send_slack(digest: Digest, client: Optional[SlackClient] = None) -> int:
+    """Post the digest on Slack, after a title line
+
+    :return: the number of messages posted
+    """
+    client = client or SlackClient()
+    return client.post_lines([f"*{EMAIL_SUBJECT_PREFIX.strip()}* {digest.subject}"] + render_slack(digest))
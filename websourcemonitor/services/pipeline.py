@@ -0,0 +1,242 @@
+"""Pipelined verifications, in three overlapping stages.
+
+1. fetch: the browser fetches the contents one after the other, in a thread of its own,
+   handing the fragments extracted from each page over to
+2. process: a pool of `PIPELINE_PROCESSES` processes, turning the fragments into the contents
+   (cleaners, absolute links) and comparing them with the stored ones (see `websourcemonitor.services.processing`);
+3. persist: the verifications are saved in batches of `PIPELINE_BATCH_SIZE` contents, in the calling thread.
+
+So the browser fetches the next pages while the previous ones are processed and saved.
+At most `PIPELINE_QUEUE_SIZE` contents wait between two stages: when the later stages fall behind,
+the earlier ones wait, and memory stays bounded.
+"""
+import collections
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+import django
+from django.db import transaction
+from django.utils import timezone
+
+from ..conf import PIPELINE_PROCESSES, PIPELINE_QUEUE_SIZE, PIPELINE_BATCH_SIZE
+from ..models import Content, ContentSearch, RawCapture, StatusCounter
+from . import processing
+from .circuit_breaker import HostCircuitBreaker
+from .deadline import RunDeadline
+from .retry import RetryQueue, fetch_with_retries
+
+# marks the end of the fetched contents
+_DONE = object()
+
+
+class InlineExecutor:
+    """Runs the submitted tasks at once, in the calling thread, as a pool with no processes would."""
+
+    @staticmethod
+    def submit(fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+class VerificationPipeline:
+    """Fetch, process and persist verifications, in overlapping stages
+
+    simple usage:
+
+        pipeline = VerificationPipeline(wrapper_pool=WrapperPool())
+        for content, error in pipeline.run(contents):
+            ...
+
+    Retries, circuit breaker and deadline work as in `verify_with_retries`, in the fetch stage;
+    the remaining keyword arguments are passed to `Content.fetch_verification`.
+    Unless `commit` is set (in dry runs), the verifications are set on the contents, but not saved.
+    The wrappers of the `wrapper_pool`, if any, are launched and stopped in the fetch thread,
+    at each run (playwright's sync API is bound to its thread).
+    """
+
+    def __init__(self, processes: int = PIPELINE_PROCESSES, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 batch_size: int = PIPELINE_BATCH_SIZE, retry_queue: Optional[RetryQueue] = None,
+                 circuit_breaker: Optional[HostCircuitBreaker] = None, deadline: Optional[RunDeadline] = None,
+                 drain_retries: bool = True, commit: bool = True, **verify_kwargs):
+        self.processes = processes
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.retry_queue = retry_queue
+        self.circuit_breaker = circuit_breaker
+        self.deadline = deadline
+        self.drain_retries = drain_retries
+        self.commit = commit
+        self.verify_kwargs = verify_kwargs
+        self._stopping = threading.Event()
+
+    def run(self, contents: Iterable[Content]) -> Iterator[Tuple[Content, Optional[Exception]]]:
+        """Verify the contents.
+
+        :return: an iterator of `(content, exception)` tuples, as `verify_with_retries`
+        """
+        # the contents are read from the db here, the fetch thread does not use the db
+        contents = list(contents)
+        processed = queue.Queue(maxsize=self.queue_size)
+        if self.processes:
+            executor = ProcessPoolExecutor(self.processes, initializer=django.setup)
+        else:
+            executor = InlineExecutor()
+        self._stopping.clear()
+        fetcher = threading.Thread(target=self._fetch, args=(contents, executor, processed), name='fetch', daemon=True)
+        fetcher.start()
+        try:
+            yield from self._persist(processed)
+        finally:
+            # stop the fetch thread, if the caller stopped early
+            self._stopping.set()
+            fetcher.join()
+            executor.shutdown()
+
+    def _put(self, out, item):
+        """Put the item in the queue, waiting for room, unless the pipeline is stopping."""
+        while not self._stopping.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch(self, contents, executor, out):
+        """Fetch stage: fetch the contents, and submit their fragments to the process stage
+        (only successful fetches, errors have nothing to process).
+
+        Processed contents are put in the `out` queue, in the order they were fetched.
+        """
+        # contents being processed, in order
+        pending = collections.deque()
+        try:
+            for content, outcome in fetch_with_retries(
+                contents, self.retry_queue, self.circuit_breaker, self.deadline, self.drain_retries, raw=True,
+                **self.verify_kwargs
+            ):
+                if self._stopping.is_set():
+                    return
+                future = None
+                if outcome is not None and not isinstance(outcome, Exception) and outcome.ok:
+                    future = executor.submit(
+                        processing.process, outcome.fragments, 'text', content.url, content.use_cleaner,
+                        outcome.content, content.content
+                    )
+                pending.append((content, outcome, future))
+                # backpressure: wait for the oldest content, when too many are being processed
+                while len(pending) >= self.queue_size:
+                    if not self._put(out, self._processed(*pending.popleft())):
+                        return
+            while pending:
+                if not self._put(out, self._processed(*pending.popleft())):
+                    return
+        except Exception as e:
+            self._put(out, e)
+        finally:
+            # contents left when stopping early are not processed (the executor's cancel_futures needs python 3.9)
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            self._put(out, _DONE)
+            wrapper_pool = self.verify_kwargs.get('wrapper_pool')
+            if wrapper_pool is not None:
+                wrapper_pool.stop()
+
+    @staticmethod
+    def _processed(content, outcome, future):
+        """Wait for the processing of the content, and return it, with the processed result."""
+        if future is not None:
+            try:
+                data = future.result()
+            except Exception as e:
+                return content, e
+            outcome.content = data['content']
+            outcome.fragments = None
+            content.diff_stats = data['diff_stats']
+            content.live_result = outcome
+        return content, outcome
+
+    def _persist(self, processed):
+        """Persist stage: save the verifications in batches."""
+        batch = []
+        while True:
+            item = processed.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                # the fetch stage crashed
+                raise item
+            batch.append(item)
+            if len(batch) >= self.batch_size or processed.empty():
+                yield from self._save(batch, self.commit)
+                batch = []
+        yield from self._save(batch, self.commit)
+
+    @staticmethod
+    def _save(batch, commit=True):
+        """Save the verifications of a batch of contents, with a single query, if possible;
+        unless `commit` is set, they are only set on the contents.
+
+        :return: an iterator of `(content, exception)` tuples, for the contents of the batch
+        """
+        errors = {}
+        contents = []
+        for content, outcome in batch:
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                if outcome is None:
+                    content.skip_verification(commit=False)
+                else:
+                    content.set_verification(outcome)
+            except Exception as e:
+                errors[id(content)] = e
+            else:
+                contents.append(content)
+
+        if not commit:
+            for content, _ in batch:
+                yield content, errors.get(id(content))
+            return
+
+        if contents:
+            # bulk_update skips auto_now fields
+            modified_at = timezone.now()
+            for content in contents:
+                content.modified_at = modified_at
+            # the counters the contents are counted in, moved by `record` even if the transaction rolls back
+            counted = [getattr(content, '_counted', None) for content in contents]
+            try:
+                with transaction.atomic():
+                    Content.objects.bulk_update(contents, Content.VERIFICATION_FIELDS)
+                    ContentSearch.objects.index(contents)
+                    StatusCounter.objects.record(contents)
+            except Exception:
+                # find the offending contents, saving them one by one
+                for content, content_counted in zip(contents, counted):
+                    content._counted = content_counted
+                for content in contents:
+                    try:
+                        with transaction.atomic():
+                            content.save(update_fields=Content.VERIFICATION_FIELDS)
+                    except Exception as e:
+                        errors[id(content)] = e
+
+        for content, outcome in batch:
+            error = errors.get(id(content))
+            if error is None and outcome is not None and outcome.page_html:
+                try:
+                    RawCapture.objects.store(content, outcome.page_html)
+                except Exception as e:
+                    error = e
+            yield content, error
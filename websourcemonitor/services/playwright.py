@@ -1,13 +1,44 @@
-import re
+import contextlib
+import hashlib
+import os
 import time
-from typing import Optional
-from bs4 import BeautifulSoup
+from typing import Optional, Union
 from playwright.sync_api import Browser
 from playwright.sync_api import sync_playwright, Error as PlaywrightError, Playwright
+from ..cleaners import get_pipeline
 from ..conf import *
-from urllib.parse import urljoin
+from ..links import make_links_absolute
+from . import har, processing
+from .asset_cache import AssetCache
+from .results import (
+    VerificationResult, STATUS_CONNECTION_ERROR, STATUS_NOT_TRANSFERRED, STATUS_SELECTOR_ERROR
+)
+from .storage_state import StorageStateStore, domain_of, is_empty, local_storage_script
 import logging
 
+# Extracts the selected elements' text (or html) and computes its fingerprint, inside the page;
+# the fragments are returned only when the fingerprint differs from the known one,
+# so that unchanged sections do not need to be transferred.
+# The hash is a 64 bits variant of cyrb53 (https://github.com/bryc/code/blob/master/jshash/experimental/cyrb53.js)
+EXTRACT_SCRIPT = """
+(elements, [outputFormat, knownFingerprint]) => {
+    const fragments = elements.map(e => outputFormat === 'html' ? e.innerHTML : e.innerText);
+    const text = fragments.join('\\u0000');
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < text.length; i++) {
+        const ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    const fingerprint = text.length.toString(16) + ':' +
+        (h2 >>> 0).toString(16).padStart(8, '0') + (h1 >>> 0).toString(16).padStart(8, '0');
+    return {fingerprint: fingerprint, fragments: fingerprint === knownFingerprint ? null : fragments};
+}
+"""
+
+
 class PlaywrightWrapper:
     """Pooled playwright (https://playwright.dev) wrapper, that allows users to
     get live textual content and status from URLs, and selectors
@@ -19,12 +50,30 @@ class PlaywrightWrapper:
 
     Resources (Playwright instance, Browser, Context and Page are pooled.
     This drastically reduces the time it takes, avoiding the need to create Browser and/or Pages anew.
+
+    With `har_mode='record'` the traffic of each request is saved in a HAR archive of the source,
+    in `har_path`; with `har_mode='replay'` requests are served from those archives,
+    and requests not found there are aborted (see `websourcemonitor.services.har`).
+    A new context is used for each request, in both modes.
+
+    With `asset_cache` (an `AssetCache`, or True for the default one), static assets
+    (stylesheets, scripts, fonts, images) are served from a shared on-disk cache;
+    it is not used when replaying HAR archives.
+
+    With `storage_states` (a `StorageStateStore`, or True for the default one), the cookies and localStorage
+    of each domain are saved after the first successful visit, and loaded in the context before the next ones,
+    until they expire; sources needing `by_pass_with_google` take the detour only when no state is stored,
+    or when the stored one does not let the page through anymore.
     """
     p: Playwright
     browser: Browser
     proxy: Optional[dict]
     request_timeout: int
     request_ua: str
+    har_mode: Optional[str]
+    har_path: str
+    asset_cache: Optional[AssetCache]
+    storage_states: Optional[StorageStateStore]
 
     def __init__(
             self,
@@ -33,8 +82,14 @@ class PlaywrightWrapper:
             request_ua: str = REQUESTS_UA,
             request_timeout_sec: int = REQUESTS_MAX_TIMEOUT,
             browser_set: Optional[str] = 'chrome',
-            logger: Optional[logging.Logger] = None
+            logger: Optional[logging.Logger] = None,
+            har_mode: Optional[str] = HAR_MODE,
+            har_path: str = HARS_PATH,
+            asset_cache: Union[AssetCache, bool, None] = ASSET_CACHE,
+            storage_states: Union[StorageStateStore, bool, None] = STORAGE_STATE
     ):
+        if har_mode not in (None, ) + har.MODES:
+            raise ValueError(f"Invalid HAR mode: {har_mode}")
         if not logger:
             self.logger = logging.getLogger(f"project.{__name__}")
             self.logger.setLevel(logging.INFO)
@@ -54,11 +109,17 @@ class PlaywrightWrapper:
 
         self.request_ua = request_ua
         self.request_timeout = request_timeout_sec * 1000
+        self.har_mode = har_mode
+        self.har_path = har_path
+        self.asset_cache = AssetCache() if asset_cache is True else (asset_cache or None)
+        self.storage_states = StorageStateStore() if storage_states is True else (storage_states or None)
+        # domains whose storage state is already in the current context
+        self.context_domains = set()
         if browser_set == 'chrome':
             self.browser = self.p.chromium.launch(**self.get_browser_args())
         elif browser_set == 'firefox':
             self.browser = self.p.firefox.launch(**self.get_browser_args())
-        self.context = self.browser.new_context(**self.get_browser_context_args())
+        self.context = self.new_context()
         self.page = self.context.new_page()
 
     def get_browser_args(self):
@@ -81,6 +142,13 @@ class PlaywrightWrapper:
             )
         return browser_args
 
+    def new_context(self, **kwargs):
+        """Create a browser context, routing static assets through the asset cache, if any."""
+        context = self.browser.new_context(**self.get_browser_context_args(), **kwargs)
+        if self.asset_cache and self.har_mode != har.REPLAY:
+            context.route("**/*", self.asset_cache.handle)
+        return context
+
     def get_browser_context_args(self):
         """Prepare browser context args."""
         browser_args = {"ignore_https_errors": True}
@@ -96,11 +164,7 @@ class PlaywrightWrapper:
 
     @staticmethod
     def convert_relative_links_to_absolute(html, base_url):
-        soup = BeautifulSoup(html, 'html.parser')
-        for tag in soup.find_all('a', href=True):
-            tag['href'] = urljoin(base_url, tag['href'])
-            tag['target'] = '_blank'
-        return str(soup)
+        return make_links_absolute([html], base_url)[0]
 
     def by_pass_with_google(self, url):
         self.page.goto(
@@ -113,90 +177,286 @@ class PlaywrightWrapper:
         response = response_info.value
         return response
 
-    def get_live_content(self, url, selector, output_format, **kwargs):
+    def load_storage_state(self, url) -> bool:
+        """Load the stored state of the url's domain in the current context, if not already there.
+
+        :return: whether the context has a state for the domain
+        """
+        if not self.storage_states:
+            return False
+        domain = domain_of(url)
+        if domain in self.context_domains:
+            return True
+        state = self.storage_states.load(domain)
+        if state is None or is_empty(state):
+            return False
+        if state['cookies']:
+            self.context.add_cookies(state['cookies'])
+        if state['origins']:
+            self.context.add_init_script(local_storage_script(state))
+        self.context_domains.add(domain)
+        return True
+
+    def open(self, url, by_pass_with_google=False):
+        """Navigate to the url, with the stored state of its domain;
+        the google detour is taken only when there is no state for the domain,
+        or when the state does not let the page through anymore (it is then discarded),
+        and the state is then saved, if the visit succeeds.
+        """
+        domain = domain_of(url)
+        has_state = self.load_storage_state(url)
+        if by_pass_with_google and not has_state:
+            response = self.by_pass_with_google(url)
+        else:
+            response = self.page.goto(url, wait_until="load", timeout=self.request_timeout)
+            if by_pass_with_google and has_state and (response is None or response.status not in (200, 202)):
+                self.discard_storage_state(domain)
+                has_state = False
+                response = self.by_pass_with_google(url)
+
+        if self.storage_states and not has_state and response is not None and response.status in (200, 202):
+            if self.storage_states.save(domain, self.context.storage_state(), domain_of(response.url)) is not None:
+                self.context_domains.add(domain)
+        return response
+
+    def discard_storage_state(self, domain):
+        """Delete the stored state of the domain, and clear the cookies of the current context;
+        the states of the other domains are loaded again at their next visit.
+        """
+        self.storage_states.delete(domain)
+        self.context.clear_cookies()
+        self.context_domains.clear()
+
+    def get_live_content(self, url, selector, output_format, use_cleaner=True, trace_path=None,
+                         fingerprint=None, capture_html=False, timeout=None, raw=False, **kwargs):
         """
         Requests content from URI, using playwright (https://playwright.dev/python/)
 
         Finds the content using the object's selector attribute
         (an XPATH or a CSS or some other _locators_, as specified in https://playwright.dev/python/docs/locators).
 
-        :return: 2-tuple
-          the cleanest possible textual content, or a comprehensible error message,
-          along with the response status code
+        Textual content is normalised by the cleaners pipeline (see `websourcemonitor.cleaners`);
+        volatile tokens are masked only if `use_cleaner` is set.
+
+        The fingerprint of the selected section is computed inside the page, and returned
+        in the result; when it is equal to the `fingerprint` argument,
+        the section is not transferred, and the 930 status is returned, with no content.
+
+        When `capture_html` is set, the html of the whole rendered page is returned in the result.
+
+        When `by_pass_with_google` is set, the page is reached through a google search,
+        unless a storage state of its domain is available.
+
+        When `trace_path` is given, a playwright trace of the request
+        (network timings, screenshots and DOM snapshots) is recorded and saved there;
+        it can be inspected with `playwright show-trace <trace_path>`.
+
+        `timeout` (in seconds) overrides the wrapper's request timeout, for this request only.
+
+        When `raw` is set, the extracted fragments are returned in the result as they are, with no content,
+        to be processed elsewhere (see `websourcemonitor.services.processing`).
+
+        :return: a VerificationResult, with
+          the response status code and the cleanest possible textual content, or a comprehensible error message,
+          along with the response's timing, final url, redirect chain and size, and the selector's match count;
+          it can be unpacked as a (status, content) 2-tuple
+        """
+        if self.har_mode == har.REPLAY and not os.path.exists(har.har_path(url, self.har_path)):
+            return VerificationResult(
+                STATUS_CONNECTION_ERROR, f"Archivio HAR non trovato: {har.har_path(url, self.har_path)}"
+            )
+
+        request_timeout = self.request_timeout
+        if timeout is not None:
+            # playwright reads a zero timeout as no timeout at all
+            self.request_timeout = max(int(timeout * 1000), 1)
+        try:
+            with self.har_context(url):
+                if not trace_path:
+                    return self._get_live_content(
+                        url, selector, output_format, use_cleaner, fingerprint, capture_html, raw, **kwargs
+                    )
+
+                self.context.tracing.start(screenshots=True, snapshots=True)
+                try:
+                    return self._get_live_content(
+                        url, selector, output_format, use_cleaner, fingerprint, capture_html, raw, **kwargs
+                    )
+                finally:
+                    self.context.tracing.stop(path=trace_path)
+        finally:
+            self.request_timeout = request_timeout
+
+    @contextlib.contextmanager
+    def har_context(self, url):
+        """In HAR modes, replace the pooled context and page with new ones, while requesting the url,
+        recording its traffic in the source's HAR archive, or serving it from there.
+
+        Archives are written when the context is closed.
         """
+        if not self.har_mode:
+            yield
+            return
+
+        har_file = har.har_path(url, self.har_path)
+        context_args = {}
+        if self.har_mode == har.RECORD:
+            os.makedirs(os.path.dirname(har_file) or '.', exist_ok=True)
+            context_args.update({"record_har_path": har_file, "record_har_content": "attach"})
+        context = self.new_context(**context_args)
+        if self.har_mode == har.REPLAY:
+            context.route_from_har(har_file, not_found='abort')
+
+        pooled = self.context, self.page, self.context_domains
+        self.context, self.page, self.context_domains = context, context.new_page(), set()
+        try:
+            yield
+        finally:
+            self.context, self.page, self.context_domains = pooled
+            context.close()
+
+    @staticmethod
+    def get_fingerprint_prefix(url, output_format, use_cleaner):
+        """Identify how the section's content is produced from the extracted fragments,
+        so that fingerprints of contents produced differently never match
+        """
+        if output_format == 'text':
+            production = f"text|{get_pipeline(use_cleaner).signature}"
+        elif output_format == 'html':
+            production = f"html|{url}"
+        else:
+            raise Exception("Invalid output format")
+        return hashlib.sha1(production.encode('utf-8')).hexdigest()[:8]
+
+    def _get_live_content(self, url, selector, output_format, use_cleaner, fingerprint, capture_html, raw,
+                          **kwargs):
         selector = selector or "body"
         time_response_took = None
+        result = VerificationResult(STATUS_CONNECTION_ERROR, None)
+
+        prefix = self.get_fingerprint_prefix(url, output_format, use_cleaner)
+        known_fingerprint = None
+        if fingerprint and fingerprint.startswith(f"{prefix}-"):
+            known_fingerprint = fingerprint[len(prefix) + 1:]
 
         try:
             time_response_start = time.time()
-            response = self.page.goto(url, wait_until="load", timeout=self.request_timeout)
+            response = self.open(url, kwargs.get('by_pass_with_google', False))
             time_response_took = time.time() - time_response_start
         except PlaywrightError as e:
-            status = 990
-            content = str(e)
+            result.content = str(e)
         else:
-            status = response.status
-            if status in (200, 202):
-                regex = r"(?:\n|\t|\xa0)+(?:\s+(?:\n|\t|\xa0)+)?"
-                locator = self.page.locator(selector)
-
-                try:
-                    count = locator.count()
-                except PlaywrightError as e:
-                    status = 900
-                    content = f"{e}"
-                else:
-                    if not count:
-                        status = 900
-                        content = "Selettore non trovato"
-
-                    elif count > 1:
-                        if output_format == 'text':
-                            content = locator.all_inner_texts()
-                            content = "\n".join(
-                                re.sub(regex, "\n", x.strip("- \n\t")) for x in content
-                            )
-                        elif output_format == 'html':
-                            base_url = url
-                            elements_html = [self.convert_relative_links_to_absolute(element.inner_html(), base_url) for
-                                             element in locator.element_handles()]
-
-                            content = ' '.join(elements_html)
-                    else:
-                        if output_format == 'text':
-                            content = locator.inner_text()
-                            content = re.sub(regex, "\n", content.strip("- \n\t"))
-                        elif output_format == 'html':
-                            inner_html = locator.inner_html()
-                            base_url = url
-                            html_with_absolute_links = self.convert_relative_links_to_absolute(inner_html, base_url)
-                            content = html_with_absolute_links
-
-                        else:
-                            raise Exception("Invalid output format")
-
+            result.status = response.status
+            result.response_time = time_response_took
+            result.final_url = response.url
+            result.redirect_chain = self.get_redirect_chain(response)
+            result.response_size = self.get_response_size(response)
+            if result.status in (200, 202):
+                if capture_html:
+                    result.page_html = self.page.content()
+                self._extract(result, url, selector, output_format, use_cleaner, prefix, known_fingerprint, raw)
 
             else:
-                if status == 404:
-                    content = "Pagina non trovata"
+                if result.status == 404:
+                    result.content = "Pagina non trovata"
                 else:
-                    content = response.status_text
+                    result.content = response.status_text
 
         if time_response_took:
             trt = f"{time_response_took:.03}s"
         else:
             trt = f"-"
 
-        if status in [200, 202]:
+        if result.ok:
             error_msg = "-"
         else:
-            error_msg = content
+            error_msg = result.content
+
+        self.logger.debug(f"{url} - {selector} - {result.status} - {error_msg} - {trt}")
+
+        return result
+
+    def _extract(self, result, url, selector, output_format, use_cleaner, prefix, known_fingerprint, raw):
+        """Extract the selected section of the current page into the result, with its fingerprint."""
+        locator = self.page.locator(selector)
+
+        try:
+            result.match_count = locator.count()
+        except PlaywrightError as e:
+            result.status = STATUS_SELECTOR_ERROR
+            result.content = f"{e}"
+            return
+        if not result.match_count:
+            result.status = STATUS_SELECTOR_ERROR
+            result.content = "Selettore non trovato"
+            return
+
+        extracted = locator.evaluate_all(EXTRACT_SCRIPT, [output_format, known_fingerprint])
+        result.fingerprint = f"{prefix}-{extracted['fingerprint']}"
+        if extracted['fragments'] is None:
+            result.status = STATUS_NOT_TRANSFERRED
+        elif raw:
+            result.fragments = extracted['fragments']
+        else:
+            result.content = processing.render_fragments(extracted['fragments'], output_format, url, use_cleaner)
+
+    def extract_from_html(self, html, url, selector, output_format='text', use_cleaner=True):
+        """Extract the content from a captured page of the url, rendered again in the browser,
+        as `get_live_content` extracts it from the live page.
+
+        The page's scripts are not run, as the capture is already rendered,
+        and all its requests are aborted, so that nothing is fetched from the network.
+
+        :return: a VerificationResult, with the status (200, 900 if the selector is invalid or matches nothing,
+          or 990 if the page cannot be rendered), the content, or a comprehensible error message,
+          the fingerprint and the selector's match count
+        """
+        selector = selector or "body"
+        result = VerificationResult(200, None)
+        context = self.browser.new_context(**self.get_browser_context_args(), java_script_enabled=False)
+        try:
+            context.route("**/*", lambda route: route.abort())
+            page = context.new_page()
+            page.set_content(html, timeout=self.request_timeout)
+            pooled, self.page = self.page, page
+            try:
+                self._extract(
+                    result, url, selector, output_format, use_cleaner,
+                    self.get_fingerprint_prefix(url, output_format, use_cleaner), None, False
+                )
+            finally:
+                self.page = pooled
+        except PlaywrightError as e:
+            result.status, result.content = STATUS_CONNECTION_ERROR, f"{e}"
+        finally:
+            context.close()
+        return result
 
-        self.logger.debug(f"{url} - {selector} - {status} - {error_msg} - {trt}")
+    @staticmethod
+    def get_redirect_chain(response) -> tuple:
+        """Return the urls redirecting to the response's one, in order."""
+        chain = []
+        request = response.request.redirected_from
+        while request is not None:
+            chain.insert(0, request.url)
+            request = request.redirected_from
+        return tuple(chain)
 
-        return status, content
+    @staticmethod
+    def get_response_size(response) -> Optional[int]:
+        """Return the size of the response's body, as transferred, without reading it."""
+        try:
+            size = response.request.sizes()['responseBodySize']
+        except (PlaywrightError, KeyError):
+            return None
+        return size if size >= 0 else None
 
     def stop(self):
+        if self.asset_cache:
+            self.logger.debug(
+                f"asset cache - {self.asset_cache.hits} hits - {self.asset_cache.revalidations} revalidations - "
+                f"{self.asset_cache.misses} misses"
+            )
         self.page.close()
         self.browser.close()
         self.p.stop()
@@ -0,0 +1,42 @@
+"""Processing of the fragments extracted from the pages.
+
+The fragments selected in a page are turned into the content to be stored: text fragments
+are normalised by the cleaners pipeline, html fragments have their links made absolute.
+Processing is CPU-bound, and independent from the browser and the db:
+`process` can run in a separate process, taking and returning plain data.
+"""
+import difflib
+from typing import Dict, Iterable, Optional
+
+from ..cleaners import get_pipeline
+from ..links import make_links_absolute
+
+
+def render_fragments(fragments: Iterable[str], output_format: str, url: str, use_cleaner: bool = True) -> str:
+    """Return the content made of the fragments, in the output format ('text' or 'html')."""
+    if output_format == 'text':
+        return get_pipeline(use_cleaner).clean(fragments)
+    return ' '.join(make_links_absolute(fragments, url))
+
+
+def diff_stats(stored: Optional[str], content: Optional[str]) -> Dict[str, int]:
+    """Return the number of lines added to, and removed from, the stored content."""
+    added = removed = 0
+    for line in difflib.ndiff((stored or '').splitlines(), (content or '').splitlines()):
+        if line.startswith('+ '):
+            added += 1
+        elif line.startswith('- '):
+            removed += 1
+    return {'added': added, 'removed': removed}
+
+
+def process(fragments: Optional[Iterable[str]], output_format: str, url: str, use_cleaner: bool,
+            content: Optional[str], stored: Optional[str]) -> dict:
+    """Render the fragments of a fetched page (if any, otherwise keep `content`),
+    and compare the result with the stored content.
+
+    :return: a dict with the `content`, and its `diff_stats`
+    """
+    if fragments is not None:
+        content = render_fragments(fragments, output_format, url, use_cleaner)
+    return {'content': content, 'diff_stats': diff_stats(stored, content)}
@@ -0,0 +1,142 @@
+"""Pool of proxies, with health tracking and load distribution.
+
+Proxied contents are spread over the proxies of the `PROXY_POOL` setting, a list of dicts like:
+
+    PROXY_POOL = [
+        {'url': 'http://proxy1.example.com:3128', 'username': 'user', 'password': 'secret', 'max_concurrency': 2},
+        {'url': 'http://proxy2.example.com:3128', 'username': 'user', 'password': 'secret'},
+    ]
+
+(`max_concurrency` defaults to `PROXY_MAX_CONCURRENCY`); when the pool is not configured,
+the single proxy of the `PROXY_URL`, `PROXY_USERNAME` and `PROXY_PASSWORD` settings is used.
+
+Each proxy keeps a rolling (exponentially weighted) success rate and latency;
+requests go to the healthiest proxy with free slots, and proxies whose success rate
+falls below `PROXY_EVICTION_THRESHOLD` are evicted for `PROXY_EVICTION_TIME` seconds.
+Scaling out is just adding proxies to the pool.
+"""
+import threading
+import time
+from typing import Callable, List, Optional
+
+from ..conf import (
+    PROXY_POOL, PROXY_URL, PROXY_USERNAME, PROXY_PASSWORD,
+    PROXY_MAX_CONCURRENCY, PROXY_EVICTION_THRESHOLD, PROXY_EVICTION_TIME
+)
+
+# statuses telling that the proxy, rather than the source, failed
+FAILURE_STATUSES = frozenset((407, 429, 990))
+
+# weight of the latest request in the rolling scores
+SMOOTHING = 0.2
+
+# requests needed before a proxy can be evicted
+MIN_SAMPLES = 5
+
+
+class Proxy:
+    """A proxy of the pool, with its health scores"""
+    __slots__ = (
+        'url', 'username', 'password', 'max_concurrency',
+        'in_flight', 'samples', 'success_rate', 'latency', 'evicted_until',
+    )
+
+    def __init__(self, url: str, username: str = '', password: str = '', max_concurrency: int = PROXY_MAX_CONCURRENCY):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.samples = 0
+        self.success_rate = 1.0
+        self.latency = 0.0
+        self.evicted_until = 0.0
+
+    def __repr__(self):
+        return f"<Proxy {self.url} {self.success_rate:.2f} {self.latency:.2f}s>"
+
+    @property
+    def config(self) -> dict:
+        """The proxy, as expected by `PlaywrightWrapper`."""
+        return {'url': self.url, 'username': self.username, 'password': self.password}
+
+    @property
+    def score(self) -> float:
+        """Higher for proxies succeeding more often, and faster."""
+        return self.success_rate / (1.0 + self.latency)
+
+
+class ProxyPool:
+    """Thread-safe pool of proxies
+
+    simple usage:
+
+        pool = ProxyPool.from_settings()
+        proxy = pool.acquire()
+        try:
+            result = fetch(url, proxy.config)
+        finally:
+            pool.release(proxy, result.status, result.response_time)
+    """
+
+    def __init__(self, proxies: List[Proxy], eviction_threshold: float = PROXY_EVICTION_THRESHOLD,
+                 eviction_time: float = PROXY_EVICTION_TIME, clock: Callable[[], float] = time.monotonic):
+        self.proxies = proxies
+        self.eviction_threshold = eviction_threshold
+        self.eviction_time = eviction_time
+        self.clock = clock
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_settings(cls) -> Optional['ProxyPool']:
+        """Return the pool of the `PROXY_POOL` setting, or of the single `PROXY_URL`, or None."""
+        if PROXY_POOL:
+            return cls([Proxy(**proxy) for proxy in PROXY_POOL])
+        if PROXY_URL:
+            return cls([Proxy(PROXY_URL, PROXY_USERNAME, PROXY_PASSWORD)])
+        return None
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def _candidates(self):
+        now = self.clock()
+        free = [p for p in self.proxies if p.in_flight < p.max_concurrency]
+        healthy = [p for p in free if p.evicted_until <= now]
+        if healthy:
+            return healthy
+        if free and all(p.evicted_until > now for p in self.proxies):
+            # all proxies are evicted: the one coming back first is better than none
+            return [min(free, key=lambda p: p.evicted_until)]
+        return []
+
+    def acquire(self, timeout: Optional[float] = None) -> Proxy:
+        """Return the healthiest proxy with a free slot, waiting for one, if all are busy.
+
+        :raise TimeoutError: if no proxy is free within `timeout` seconds
+        """
+        with self._condition:
+            if not self._condition.wait_for(self._candidates, timeout=timeout):
+                raise TimeoutError("Nessun proxy disponibile")
+            proxy = max(self._candidates(), key=lambda p: (p.score, -p.in_flight))
+            proxy.in_flight += 1
+            return proxy
+
+    def release(self, proxy: Proxy, status: Optional[int] = None, response_time: Optional[float] = None):
+        """Free the proxy's slot, and update its scores with the outcome of the request;
+        requests with no status (aborted by exceptions) count as failures.
+        """
+        with self._condition:
+            proxy.in_flight -= 1
+            success = status is not None and status not in FAILURE_STATUSES
+            proxy.samples += 1
+            proxy.success_rate += SMOOTHING * ((1.0 if success else 0.0) - proxy.success_rate)
+            if response_time is not None:
+                proxy.latency += SMOOTHING * (response_time - proxy.latency)
+
+            if proxy.samples >= MIN_SAMPLES and proxy.success_rate < self.eviction_threshold:
+                proxy.evicted_until = self.clock() + self.eviction_time
+                # back on probation, when the eviction ends
+                proxy.samples = 0
+                proxy.success_rate = 1.0
+            self._condition.notify_all()
@@ -0,0 +1,84 @@
+"""Results of the fetches of live contents."""
+from typing import List, Optional, Tuple
+
+# status codes, besides the HTTP ones
+STATUS_SELECTOR_ERROR = 900
+STATUS_NOT_TRANSFERRED = 930
+STATUS_CONNECTION_ERROR = 990
+
+SUCCESS_STATUSES = (200, 202, STATUS_NOT_TRANSFERRED)
+
+
+class VerificationResult:
+    """The outcome of a single fetch of a live content
+
+    Produced by `PlaywrightWrapper.get_live_content`, once per fetch;
+    it can still be unpacked as the `(status, content)` tuple returned before:
+
+        status, content = pw.get_live_content(url, selector, 'text')
+
+    `status` is the HTTP status of the page, or one of:
+    - 900, when the selector is invalid, or matches nothing;
+    - 930, when the section still has the known fingerprint, and was not transferred (`content` is None);
+    - 990, when the page could not be reached (timeouts, dns or tls errors, ...).
+    `content` is the extracted content, or a comprehensible error message;
+    raw results carry the `fragments` extracted from the page instead, still to be processed
+    into the content (see `websourcemonitor.services.processing`).
+    `from_cache` is set on the results reused from the fetch cache, which fetched nothing.
+    """
+    __slots__ = (
+        'status', 'content', 'fingerprint', 'page_html',
+        'final_url', 'redirect_chain', 'response_time', 'response_size', 'match_count', 'fragments',
+        'from_cache',
+    )
+
+    def __init__(self, status: int, content: Optional[str], fingerprint: Optional[str] = None,
+                 page_html: Optional[str] = None, final_url: Optional[str] = None,
+                 redirect_chain: Tuple[str, ...] = (), response_time: Optional[float] = None,
+                 response_size: Optional[int] = None, match_count: Optional[int] = None,
+                 fragments: Optional[List[str]] = None, from_cache: bool = False):
+        self.status = status
+        self.content = content
+        self.fingerprint = fingerprint
+        self.page_html = page_html
+        self.final_url = final_url
+        self.redirect_chain = tuple(redirect_chain)
+        self.response_time = response_time
+        self.response_size = response_size
+        self.match_count = match_count
+        self.fragments = fragments
+        self.from_cache = from_cache
+
+    def __iter__(self):
+        yield self.status
+        yield self.content
+
+    def __eq__(self, other):
+        if isinstance(other, tuple):
+            return (self.status, self.content) == other
+        if isinstance(other, VerificationResult):
+            return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<VerificationResult {self.status} {self.final_url or ''} {self.response_time or '-'}s>"
+
+    @property
+    def ok(self) -> bool:
+        return self.status in SUCCESS_STATUSES
+
+    @property
+    def redirected(self) -> bool:
+        return bool(self.redirect_chain)
+
+    def as_dict(self, include_html: bool = False) -> dict:
+        """Return the fields of the result, as a dict of plain values, i.e. to be cached."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['redirect_chain'] = list(self.redirect_chain)
+        if not include_html:
+            data['page_html'] = None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'VerificationResult':
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
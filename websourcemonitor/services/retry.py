@@ -0,0 +1,182 @@
+"""Deferred retries of transient verification failures.
+
+Fetches failing with a transient status (timeouts, rate limits, server errors, connection errors:
+the `RETRY_STATUSES` setting) are not saved as errors at once: the contents are put in a queue,
+and fetched again after the main pass over all the contents, with exponential backoff,
+up to `RETRY_MAX_ATTEMPTS` attempts overall.
+Only the contents still failing after the last attempt are saved as errors.
+
+With a `RunDeadline`, retries due after the deadline are not attempted: the last failures are final.
+"""
+import heapq
+import itertools
+import time
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Union
+
+from ..conf import RETRY_STATUSES, RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, REQUESTS_MAX_TIMEOUT
+from .circuit_breaker import HostCircuitBreaker
+from .deadline import RunDeadline
+from .results import VerificationResult
+
+
+class RetryQueue:
+    """A queue of contents to be verified again, ordered by the time their retry is due
+
+    simple usage:
+
+        queue = RetryQueue()
+        if queue.is_retriable(result.status) and queue.push(content, attempt=1):
+            ...
+        while queue:
+            content, attempt = queue.pop()  # waits until the retry is due
+    """
+
+    def __init__(self, statuses: Iterable[int] = RETRY_STATUSES, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 backoff_base: float = RETRY_BACKOFF_BASE, backoff_max: float = RETRY_BACKOFF_MAX,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.statuses = frozenset(statuses)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        """Iterate over the queued items, in no particular order."""
+        return (item for _, _, item, _ in self._heap)
+
+    @property
+    def next_due(self) -> Optional[float]:
+        """The time the first retry is due, or None, if the queue is empty."""
+        return self._heap[0][0] if self._heap else None
+
+    def is_retriable(self, status: int) -> bool:
+        return status in self.statuses
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay before the retry following the given (failed) attempt."""
+        return min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+
+    def push(self, item, attempt: int) -> bool:
+        """Schedule a retry of the item, that failed its `attempt`-th attempt.
+
+        :return: False if the item has no attempts left, and was not queued
+        """
+        if attempt >= self.max_attempts:
+            return False
+        due = self.clock() + self.backoff(attempt)
+        heapq.heappush(self._heap, (due, next(self._counter), item, attempt + 1))
+        return True
+
+    def pop(self, wait: bool = True) -> Tuple[object, int]:
+        """Return the item whose retry is due first, and the number of its next attempt,
+        waiting until it is due, if `wait` is set.
+        """
+        due, _, item, attempt = heapq.heappop(self._heap)
+        delay = due - self.clock()
+        if wait and delay > 0:
+            self.sleep(delay)
+        return item, attempt
+
+
+def fetch_with_retries(contents: Iterable, retry_queue: Optional[RetryQueue] = None,
+                       circuit_breaker: Optional[HostCircuitBreaker] = None,
+                       deadline: Optional[RunDeadline] = None, drain_retries: bool = True,
+                       **verify_kwargs) -> Iterator[Tuple[object, Union[VerificationResult, Exception, None]]]:
+    """Fetch the contents for their verifications, deferring the retries of transient failures after the main pass,
+    without saving anything (see `verify_with_retries`).
+
+    Unless `drain_retries` is set, the retries are left in the `retry_queue`, to be fetched by a later call
+    (with no contents, or with other ones), so that a run going through several batches retries them at its end.
+
+    :return: an iterator of `(content, outcome)` tuples, one for each content, when its fetch is final;
+      `outcome` is the VerificationResult to be applied, None if the content is to be skipped, as its host is
+      not reachable, or the exception raised while fetching it
+    """
+    queue = retry_queue if retry_queue is not None else RetryQueue()
+    for content in contents:
+        yield from _attempt(content, 1, queue, circuit_breaker, deadline, verify_kwargs)
+    while drain_retries and queue:
+        # retries due after the deadline are not waited for: the last failures are final
+        late = deadline is not None and deadline.expires_before(queue.next_due)
+        content, attempt = queue.pop(wait=not late)
+        yield from _attempt(content, attempt, queue, circuit_breaker, deadline, verify_kwargs, late=late)
+
+
+def verify_with_retries(contents: Iterable, retry_queue: Optional[RetryQueue] = None,
+                        circuit_breaker: Optional[HostCircuitBreaker] = None,
+                        deadline: Optional[RunDeadline] = None, drain_retries: bool = True, commit: bool = True,
+                        **verify_kwargs) -> Iterator[Tuple[object, Optional[Exception]]]:
+    """Verify the contents, deferring the retries of transient failures after the main pass
+    (or to a later call, unless `drain_retries` is set, see `fetch_with_retries`).
+
+    Verifications are saved only when final: successful, failed with a non transient status,
+    or failed after the last attempt.
+    With a `circuit_breaker`, contents of hosts whose circuit is open are skipped.
+    With a `deadline`, requests time out at the latest when the deadline expires; afterwards,
+    contents are not verified, but recorded as skipped by the deadline, and left as they are.
+    Unless `commit` is set (in dry runs), the verifications are set on the contents, but not saved.
+
+    :return: an iterator of `(content, exception)` tuples, one for each verified content, when its verification
+      is final; `exception` is the exception raised while verifying it, if any
+    """
+    for content, outcome in fetch_with_retries(
+            contents, retry_queue, circuit_breaker, deadline, drain_retries, **verify_kwargs
+    ):
+        if isinstance(outcome, Exception):
+            yield content, outcome
+            continue
+        try:
+            if outcome is None:
+                content.skip_verification(commit=commit)
+            else:
+                content.apply_verification(outcome, commit=commit)
+        except Exception as e:
+            yield content, e
+        else:
+            yield content, None
+
+
+def _attempt(content, attempt, queue, circuit_breaker, deadline, verify_kwargs, late=False):
+    late = late or (deadline is not None and deadline.expired())
+    if late and attempt == 1:
+        deadline.skip(content)
+        return
+    try:
+        if late:
+            # the last failure is final, there is no time left for retries
+            content.retry_attempts = attempt - 1
+            outcome = content.live_result
+        elif circuit_breaker is not None and not circuit_breaker.allow(content.url):
+            if attempt > 1:
+                # retries are not skipped: the failure of the last attempt is final
+                content.retry_attempts = attempt - 1
+                outcome = content.live_result
+            else:
+                circuit_breaker.skip(content.url)
+                outcome = None
+        else:
+            kwargs = verify_kwargs
+            if deadline is not None:
+                kwargs = dict(verify_kwargs, timeout=deadline.cap(content.get_timeout(), REQUESTS_MAX_TIMEOUT))
+            try:
+                outcome = content.fetch_verification(**kwargs)
+            except Exception:
+                # a probe raising must not leave the host half-open for the rest of the run
+                if circuit_breaker is not None:
+                    circuit_breaker.record_failure(content.url)
+                raise
+            if circuit_breaker is not None:
+                circuit_breaker.record(content.url, outcome.status)
+            if queue.is_retriable(outcome.status) and queue.push(content, attempt):
+                return
+            content.retry_attempts = attempt
+    except Exception as e:
+        yield content, e
+    else:
+        yield content, outcome
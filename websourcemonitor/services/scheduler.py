@@ -0,0 +1,96 @@
+"""Continuous scheduling of verifications, spread evenly over a period.
+
+Each content has its own slot in the `SCHEDULER_PERIOD` (a day, by default), at an offset
+derived from the hash of its id: the slots are deterministic (a content is checked at the same time
+every period, on every node, across restarts), and uniformly spread, so that the load is steady
+instead of coming in bursts. Due contents are fed to a bounded pool of worker threads.
+"""
+import hashlib
+import logging
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# marks the end of the work, for the worker threads
+_STOP = object()
+
+
+def slot_offset(content_id: int, period: float) -> float:
+    """Return the offset of the content's slot in the period, in seconds."""
+    digest = hashlib.sha1(str(content_id).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * period
+
+
+def due_between(content_ids: Iterable[int], start: float, end: float, period: float) -> List[int]:
+    """Return the ids of the contents whose slot falls in the (start, end] time interval (unix timestamps)."""
+    if end - start >= period:
+        return list(content_ids)
+    # the interval, shifted into the current period; it can span into the next one
+    start_offset = start % period
+    end_offset = start_offset + (end - start)
+    due = []
+    for content_id in content_ids:
+        offset = slot_offset(content_id, period)
+        if start_offset < offset <= end_offset or start_offset < offset + period <= end_offset:
+            due.append(content_id)
+    return due
+
+
+class WorkerPool:
+    """A fixed number of worker threads, processing the submitted items with `handler`
+
+    At most `concurrency` items are processed at once, and at most `backlog` wait in the queue:
+    `submit` blocks when the queue is full, so that the producer slows down to the workers' pace.
+    `on_exit` is called by each thread before exiting, i.e. to release its browsers and db connections.
+
+    simple usage:
+
+        pool = WorkerPool(verify, concurrency=4)
+        for content in contents:
+            pool.submit(content)
+        pool.stop()
+    """
+
+    def __init__(self, handler: Callable, concurrency: int, backlog: Optional[int] = None,
+                 on_exit: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.on_exit = on_exit
+        self.queue = queue.Queue(maxsize=backlog if backlog is not None else concurrency * 2)
+        self.threads = [
+            threading.Thread(target=self._work, name=f"worker-{n}", daemon=True) for n in range(concurrency)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        try:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is _STOP:
+                        return
+                    self.handler(item)
+                except Exception:
+                    logger.exception(f"error while processing {item}")
+                finally:
+                    self.queue.task_done()
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def submit(self, item):
+        """Queue the item, waiting for room in the queue, if it is full."""
+        self.queue.put(item)
+
+    def join(self):
+        """Wait until all the queued items are processed."""
+        self.queue.join()
+
+    def stop(self):
+        """Process the queued items, then stop the threads."""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
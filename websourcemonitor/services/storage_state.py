@@ -0,0 +1,103 @@
+"""Browser storage state (cookies and localStorage), persisted per domain.
+
+Once a domain has been visited successfully, its cookies (consent choices, anti-bot tokens, ...)
+and localStorage are saved, and loaded in the browser contexts visiting it again,
+so that repeated visits land directly on the content page, with no consent walls,
+or detours through a search engine.
+States expire after a TTL, and are then saved again at the next visit.
+"""
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from ..conf import STORAGE_STATE_PATH, STORAGE_STATE_TTL
+
+
+def domain_of(url: str) -> str:
+    """Return the domain whose state is used when visiting the url."""
+    return (urlsplit(url).hostname or '').lower()
+
+
+def filter_state(state: dict, *domains: str) -> dict:
+    """Keep only the cookies sent to the domains, and the localStorage of their origins."""
+    cookies = []
+    for cookie in state.get('cookies', []):
+        cookie_domain = cookie.get('domain', '').lstrip('.').lower()
+        if any(domain == cookie_domain or domain.endswith(f".{cookie_domain}") for domain in domains):
+            cookies.append(cookie)
+    origins = [origin for origin in state.get('origins', []) if domain_of(origin.get('origin', '')) in domains]
+    return {'cookies': cookies, 'origins': origins}
+
+
+def is_empty(state: dict) -> bool:
+    """Whether the state has neither cookies, nor localStorage."""
+    return not (state.get('cookies') or state.get('origins'))
+
+
+def local_storage_script(state: dict) -> str:
+    """Return a script restoring the localStorage of the state's origins, to be added to the context."""
+    items = {
+        origin['origin']: [[item['name'], item['value']] for item in origin.get('localStorage', [])]
+        for origin in state.get('origins', [])
+    }
+    return (
+        f"(() => {{ const items = {json.dumps(items)}[window.location.origin] || [];"
+        f" for (const [name, value] of items) {{ try {{ window.localStorage.setItem(name, value); }} catch (e) {{}} }}"
+        f" }})();"
+    )
+
+
+class StorageStateStore:
+    """Storage states of the visited domains, one json file each
+
+    simple usage:
+
+        store = StorageStateStore()
+        state = store.load(domain_of(url))
+        ...
+        store.save(domain_of(url), context.storage_state())
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: int = STORAGE_STATE_TTL):
+        self.path = path or STORAGE_STATE_PATH
+        self.ttl = ttl
+
+    def path_for(self, domain: str) -> str:
+        return os.path.join(self.path, f"{domain}.json")
+
+    def load(self, domain: str) -> Optional[dict]:
+        """Return the stored state of the domain, or None if missing or expired."""
+        file = self.path_for(domain)
+        try:
+            if os.path.getmtime(file) < time.time() - self.ttl:
+                os.remove(file)
+                return None
+            with open(file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, domain: str, state: dict, final_domain: Optional[str] = None) -> Optional[dict]:
+        """Store the part of a context's state relevant to the domain, and to the `final_domain`
+        the visit was redirected to, if any, and return it.
+
+        Empty states are not stored, so that they do not stand for a successful visit: None is returned.
+        """
+        state = filter_state(state, domain, final_domain or domain)
+        if is_empty(state):
+            return None
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path_for(domain))
+        return state
+
+    def delete(self, domain: str):
+        try:
+            os.remove(self.path_for(domain))
+        except OSError:
+            pass
@@ -0,0 +1,53 @@
+import os
+import time
+from typing import Optional
+
+from django.utils import timezone
+
+from ..conf import TRACES_PATH, TRACES_MAX_SIZE, TRACES_RETENTION_DAYS
+
+
+def new_trace_path(content, path: Optional[str] = None) -> str:
+    """Return the path of the zip file where the next trace of the content will be written.
+
+    Traces are named after the content id and the time of the verification,
+    so that multiple traces of the same content can coexist, until pruned.
+    """
+    path = path or TRACES_PATH
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(
+        path, f"content_{content.id}_{timezone.now():%Y%m%d%H%M%S}.zip"
+    )
+
+
+def prune_traces(
+        path: Optional[str] = None,
+        max_size: int = TRACES_MAX_SIZE,
+        retention_days: int = TRACES_RETENTION_DAYS
+) -> list:
+    """Remove traces older than `retention_days`, then the oldest ones,
+    until the total size of the traces directory is below `max_size` bytes.
+
+    :return: the list of removed files
+    """
+    path = path or TRACES_PATH
+    if not os.path.isdir(path):
+        return []
+
+    traces = []
+    for entry in os.scandir(path):
+        if entry.is_file() and entry.name.endswith('.zip'):
+            stat = entry.stat()
+            traces.append((stat.st_mtime, stat.st_size, entry.path))
+    traces.sort()
+
+    removed = []
+    oldest_allowed = time.time() - retention_days * 86400
+    total_size = sum(size for _, size, _ in traces)
+    for mtime, size, trace in traces:
+        if mtime >= oldest_allowed and total_size <= max_size:
+            break
+        os.remove(trace)
+        total_size -= size
+        removed.append(trace)
+    return removed
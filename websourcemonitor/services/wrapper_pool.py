@@ -0,0 +1,80 @@
+"""Pool of playwright wrappers, one for each thread, browser and proxy.
+
+Contents are fetched with the browser they require, through the proxy assigned by the proxy pool;
+browsers are launched once per (browser, proxy) pair, and reused by all the contents
+going through that pair, in the same thread (playwright's sync API is bound to its thread).
+"""
+import contextlib
+import threading
+from typing import Optional
+
+from . import engine
+from .proxy_pool import ProxyPool
+
+
+class WrapperPool:
+    """Playwright wrappers, launched on demand, and stopped all together
+
+    Wrappers are instances of `wrapper_class`, or of the `FETCH_ENGINE` class, by default,
+    imported when the first one is launched.
+
+    simple usage:
+
+        wrappers = WrapperPool()
+        with wrappers.lease(browser='chrome', use_proxy=True) as (pw, report):
+            result = pw.get_live_content(url, selector, 'text')
+            report(result)
+        wrappers.stop()
+    """
+
+    def __init__(self, proxy_pool: Optional[ProxyPool] = None, wrapper_class=None, **wrapper_kwargs):
+        self.proxy_pool = proxy_pool if proxy_pool is not None else ProxyPool.from_settings()
+        self.wrapper_class = wrapper_class
+        self.wrapper_kwargs = wrapper_kwargs
+        self.wrappers = {}
+        self._lock = threading.Lock()
+
+    def get(self, browser: str = 'chrome', proxy: Optional[dict] = None):
+        """Return the wrapper of the current thread for the browser and proxy, launching it if needed."""
+        key = (threading.get_ident(), browser, proxy['url'] if proxy else None)
+        with self._lock:
+            wrapper = self.wrappers.get(key)
+        if wrapper is None:
+            wrapper_class = self.wrapper_class or engine.get_engine_class()
+            wrapper = wrapper_class(
+                browser_set=browser, use_proxy=proxy is not None, proxy=proxy, **self.wrapper_kwargs
+            )
+            with self._lock:
+                self.wrappers[key] = wrapper
+        return wrapper
+
+    @contextlib.contextmanager
+    def lease(self, browser: str = 'chrome', use_proxy: bool = False, proxy: Optional[dict] = None):
+        """Yield a wrapper for the browser, through a proxy of the pool if `use_proxy` is set
+        (unless a `proxy` is given), and a function to report the result of the fetch,
+        updating the health of the proxy.
+        """
+        pooled_proxy = None
+        if use_proxy and proxy is None and self.proxy_pool:
+            pooled_proxy = self.proxy_pool.acquire()
+            proxy = pooled_proxy.config
+        outcome = {}
+
+        def report(result):
+            outcome['status'] = result.status
+            outcome['response_time'] = result.response_time
+
+        try:
+            yield self.get(browser, proxy if use_proxy else None), report
+        finally:
+            if pooled_proxy is not None:
+                self.proxy_pool.release(pooled_proxy, outcome.get('status'), outcome.get('response_time'))
+
+    def stop(self):
+        """Stop the wrappers of the current thread."""
+        ident = threading.get_ident()
+        with self._lock:
+            keys = [key for key in self.wrappers if key[0] == ident]
+            wrappers = [self.wrappers.pop(key) for key in keys]
+        for wrapper in wrappers:
+            wrapper.stop()
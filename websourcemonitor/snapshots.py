@@ -0,0 +1,65 @@
+"""Line-level deltas between versions of a content.
+
+A delta is a list of operations, transforming the lines of a version into those of the next one:
+- `["e", i1, i2]`: lines `i1:i2` of the old version are kept;
+- `["d", i1, i2]`: lines `i1:i2` of the old version are removed;
+- `["r", i1, i2, lines]`: lines `i1:i2` of the old version are replaced by `lines`;
+- `["i", i1, lines]`: `lines` are inserted before line `i1` of the old version.
+
+Removed lines are referred to by position, so deltas are compact,
+and still describe the change well enough to be displayed, without computing it again.
+"""
+import difflib
+import json
+from typing import List
+
+OPCODES = {'equal': 'e', 'delete': 'd', 'replace': 'r', 'insert': 'i'}
+
+
+def make_delta(old_lines: List[str], new_lines: List[str]) -> list:
+    """Compute the delta transforming `old_lines` into `new_lines`."""
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        op = OPCODES[tag]
+        if op in ('e', 'd'):
+            delta.append([op, i1, i2])
+        elif op == 'r':
+            delta.append([op, i1, i2, new_lines[j1:j2]])
+        else:
+            delta.append([op, i1, new_lines[j1:j2]])
+    return delta
+
+
+def apply_delta(old_lines: List[str], delta: list) -> List[str]:
+    """Apply the delta to `old_lines`, returning the lines of the new version."""
+    new_lines = []
+    for op in delta:
+        if op[0] == 'e':
+            new_lines.extend(old_lines[op[1]:op[2]])
+        elif op[0] == 'r':
+            new_lines.extend(op[3])
+        elif op[0] == 'i':
+            new_lines.extend(op[2])
+    return new_lines
+
+
+def delta_changes(old_lines: List[str], delta: list) -> List[tuple]:
+    """List the changes described by the delta, as `(old line number, removed lines, added lines)` tuples."""
+    changes = []
+    for op in delta:
+        if op[0] == 'd':
+            changes.append((op[1] + 1, old_lines[op[1]:op[2]], []))
+        elif op[0] == 'r':
+            changes.append((op[1] + 1, old_lines[op[1]:op[2]], op[3]))
+        elif op[0] == 'i':
+            changes.append((op[1] + 1, [], op[2]))
+    return changes
+
+
+def dumps(delta: list) -> str:
+    return json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(data: str) -> list:
+    return json.loads(data)
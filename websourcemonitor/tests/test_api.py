@@ -0,0 +1,107 @@
+"""Status api tests."""
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from websourcemonitor.models import Content, SourceType
+
+
+class StatusApiTests(TestCase):
+    """Status api test class."""
+
+    def setUp(self):
+        self.comuni = SourceType.objects.create(name='Comuni')
+        self.regioni = SourceType.objects.create(name='Regioni')
+        self.verified_at = timezone.now().replace(microsecond=0) - datetime.timedelta(hours=1)
+        self.contents = [
+            Content.objects.create(
+                title=f'Fonte {n}', source_type=self.comuni if n % 2 else self.regioni,
+                url=f'http://www.comune{n}.it', content='Sindaco Mario Rossi', fingerprint=f'f{n}',
+                verification_status=n % 3, verified_at=self.verified_at, status_code=404 if n % 3 == 2 else 200,
+            )
+            for n in range(10)
+        ]
+        self.url = reverse('status_api')
+
+    def test_page(self):
+        """Pages list the status of the contents, and link to the next one."""
+        response = self.client.get(self.url, {'limit': 4})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['results']], [c.id for c in self.contents[:4]])
+        self.assertEqual(data['results'][2], {
+            'id': self.contents[2].id, 'title': 'Fonte 2', 'url': 'http://www.comune2.it',
+            'source_type': self.regioni.id, 'verification_status': Content.STATUS_ERROR,
+            'verified_at': self.verified_at.isoformat().replace('+00:00', 'Z'), 'fingerprint': 'f2',
+            'error_code': 404,
+        })
+        self.assertEqual({frozenset(row) for row in data['results']}, {frozenset(data['results'][2])})
+        self.assertIsNone(data['results'][1]['error_code'])
+        self.assertIn(f"after={self.contents[3].id}", data['next'])
+
+    def test_keyset_pagination(self):
+        """Following the next links visits each content once, then stops."""
+        ids, url = [], self.url + '?limit=3'
+        while url:
+            data = self.client.get(url).json()
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+
+        self.assertEqual(ids, [c.id for c in self.contents])
+
+    def test_filters(self):
+        """Contents are filtered by status and source type, and the filters are kept in the next links."""
+        data = self.client.get(self.url, {'status': [1, 2], 'source_type': self.comuni.id, 'limit': 2}).json()
+
+        self.assertEqual([row['id'] for row in data['results']], [self.contents[1].id, self.contents[5].id])
+        self.assertIn('status=1&status=2', data['next'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.contents[7].id])
+        self.assertIsNone(data['next'])
+
+    def test_invalid_parameters(self):
+        """Invalid parameters are rejected."""
+        for params in ({'status': 'changed'}, {'limit': 0}, {'after': 'x'}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_etag(self):
+        """Requests with the ETag of an unchanged page get a 304 response."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.contents[0].title = 'Fonte zero'
+        self.contents[0].save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified(self):
+        """Last-Modified is the last modification of any content."""
+        self.contents[3].title = 'Fonte tre'
+        self.contents[3].save()
+
+        response = self.client.get(self.url)
+        self.contents[3].refresh_from_db()
+        self.assertEqual(response['Last-Modified'], http_date(self.contents[3].modified_at.timestamp()))
+
+    def test_changes_invalidate_the_page(self):
+        """Resets, renames and deletions get a new page, whatever the conditional headers."""
+        changes = (
+            lambda: self.contents[0].reset(),
+            lambda: Content.objects.filter(pk=self.contents[1].pk).update(title='Fonte uno'),
+            lambda: self.contents[2].delete(),
+        )
+        for change in changes:
+            response = self.client.get(self.url)
+            change()
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,124 @@
+"""Asset cache tests."""
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.asset_cache import AssetCache, freshness_lifetime
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type='stylesheet', method='GET'):
+        self.url = url
+        self.resource_type = resource_type
+        self.method = method
+        self.headers = {'user-agent': 'test'}
+
+
+class FakeResponse:
+    def __init__(self, status=200, headers=None, body=b''):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+
+    def body(self):
+        return self._body
+
+
+class FakeRoute:
+    """Stands in for playwright's Route, recording how the request was handled."""
+
+    def __init__(self, response=None):
+        self.response = response
+        self.fetched_headers = None
+        self.fulfilled = None
+        self.fell_back = False
+
+    def fetch(self, headers=None):
+        self.fetched_headers = headers
+        return self.response
+
+    def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    def fallback(self):
+        self.fell_back = True
+
+
+class AssetCacheTests(SimpleTestCase):
+    """AssetCache test class."""
+
+    url = 'https://cdn.cms.test/bundle.css'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = AssetCache(self.tmp_dir.name, max_size=10000, default_ttl=3600)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_freshness_lifetime(self):
+        """Freshness comes from cache-control, or the default ttl; no-store and vary prevent caching."""
+        self.assertEqual(freshness_lifetime({'cache-control': 'public, max-age=600'}, 3600), 600)
+        self.assertEqual(freshness_lifetime({}, 3600), 3600)
+        self.assertEqual(freshness_lifetime({'cache-control': 'no-cache'}, 3600), 0)
+        self.assertIsNone(freshness_lifetime({'cache-control': 'no-store'}, 3600))
+        self.assertIsNone(freshness_lifetime({'vary': 'Cookie'}, 3600))
+
+    def test_miss_then_hit(self):
+        """An asset is fetched once, then served from the cache."""
+        route = FakeRoute(FakeResponse(headers={'content-type': 'text/css'}, body=b'body{}'))
+        self.cache.handle(route, FakeRequest(self.url))
+        self.assertIsNotNone(route.fetched_headers)
+
+        route = FakeRoute()
+        self.cache.handle(route, FakeRequest(self.url))
+
+        self.assertIsNone(route.fetched_headers)
+        self.assertEqual(route.fulfilled['body'], b'body{}')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_stale_entry_is_revalidated(self):
+        """Stale entries are revalidated with their validators, and served on 304."""
+        self.cache.put(self.url, 200, {'ETag': '"v1"', 'Cache-Control': 'no-cache'}, b'body{}')
+
+        route = FakeRoute(FakeResponse(status=304))
+        self.cache.handle(route, FakeRequest(self.url))
+
+        self.assertEqual(route.fetched_headers['if-none-match'], '"v1"')
+        self.assertEqual(route.fulfilled['body'], b'body{}')
+        self.assertEqual(self.cache.revalidations, 1)
+
+    def test_documents_are_not_cached(self):
+        """Documents and XHRs, that may affect the content, are never served from the cache."""
+        route = FakeRoute()
+        self.cache.handle(route, FakeRequest('https://www.comune.test.it/', resource_type='document'))
+
+        self.assertTrue(route.fell_back)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """When the size cap is exceeded, the least recently used entries are removed."""
+        for i in range(4):
+            self.cache.put(f'{self.url}?v={i}', 200, {}, b'x' * 2000)
+            past = time.time() - 100 + i
+            for file in self.cache._files(f'{self.url}?v={i}'):
+                os.utime(file, (past, past))
+        self.cache.get(f'{self.url}?v=0')
+
+        self.cache.put(f'{self.url}?v=4', 200, {}, b'x' * 2000)
+
+        self.assertIsNotNone(self.cache.get(f'{self.url}?v=0'))
+        self.assertIsNone(self.cache.get(f'{self.url}?v=1'))
+        self.assertIsNotNone(self.cache.get(f'{self.url}?v=4'))
+        self.assertLessEqual(self.cache.size, 10000)
+
+    def test_overwritten_entries_are_counted_once(self):
+        """Storing a url again replaces its entry in the size of the cache, with no eviction."""
+        other = f'{self.url}?v=other'
+        self.cache.put(other, 200, {}, b'x' * 2000)
+        for _ in range(10):
+            self.cache.put(self.url, 200, {}, b'x' * 3000)
+
+        self.assertEqual(self.cache.size, self.cache._disk_size())
+        self.assertIsNotNone(self.cache.get(other))
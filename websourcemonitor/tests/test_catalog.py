@@ -0,0 +1,183 @@
+"""Catalog import and export tests."""
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from websourcemonitor import catalog
+from websourcemonitor.models import Content, SourceType
+
+
+def import_lines(lines, input_format='jsonl', **kwargs):
+    errors = []
+    stats = catalog.import_rows(
+        catalog.read(lines, input_format), on_error=lambda number, message: errors.append(number), **kwargs
+    )
+    return stats, errors
+
+
+def jsonl(*rows):
+    return [json.dumps(row) + '\n' for row in rows]
+
+
+class CatalogTests(TestCase):
+    """Catalog import and export test class."""
+
+    def setUp(self):
+        self.comuni = SourceType.objects.create(name='Comuni')
+        self.roma = Content.objects.create(
+            title='Giunta di Roma', source_type=self.comuni, url='http://www.comune.roma.it/giunta',
+            selector='#giunta', content='Sindaco Mario Rossi', use_proxy=False, dati_specifici={'a': 1}
+        )
+
+    def test_export_jsonl(self):
+        """Contents are exported with their configuration, and no verification state."""
+        rows = [json.loads(line) for line in catalog.dump(catalog.export_rows(Content.objects.all()), 'jsonl')]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(set(rows[0]), set(catalog.FIELDS))
+        self.assertEqual(rows[0]['source_type'], 'Comuni')
+        self.assertEqual(rows[0]['selector'], '#giunta')
+        self.assertEqual(rows[0]['dati_specifici'], {'a': 1})
+
+    def test_round_trips(self):
+        """Exported catalogs are imported back unchanged, in both formats."""
+        for output_format in catalog.FORMATS:
+            with self.subTest(output_format):
+                lines = io.StringIO(''.join(catalog.dump(catalog.export_rows(Content.objects.all()), output_format)))
+                stats, errors = import_lines(lines, output_format)
+
+                self.assertEqual(errors, [])
+                self.assertEqual((stats['created'], stats['updated'], stats['unchanged']), (0, 0, 1))
+
+    def test_upsert_by_url_and_selector(self):
+        """Rows matching a content by url and selector update it, the others create new contents."""
+        stats, errors = import_lines(jsonl(
+            {'title': 'Giunta di Roma Capitale', 'source_type': 'Comuni', 'url': self.roma.url, 'selector': '#giunta'},
+            {'title': 'Consiglio di Roma', 'source_type': 'Comuni', 'url': self.roma.url, 'selector': '#consiglio'},
+            {'title': 'Giunta Lazio', 'source_type': 'Regioni', 'url': 'http://www.regione.lazio.it/giunta'},
+        ))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(stats, {'created': 2, 'updated': 1, 'unchanged': 0, 'source_types': 1, 'errors': 0})
+        self.roma.refresh_from_db()
+        self.assertEqual(self.roma.title, 'Giunta di Roma Capitale')
+        self.assertEqual(self.roma.content, 'Sindaco Mario Rossi')
+        lazio = Content.objects.get(url='http://www.regione.lazio.it/giunta')
+        self.assertEqual(lazio.source_type.name, 'Regioni')
+        self.assertEqual(lazio.selector, '')
+        self.assertTrue(lazio.use_proxy)
+        self.assertEqual(list(Content.objects.search('lazio')), [lazio])
+
+    def test_csv_values(self):
+        """CSV values are converted to the fields' types."""
+        lines = io.StringIO(
+            'title,source_type,url,use_proxy,timeout,op_url,dati_specifici\n'
+            'Giunta Lazio,Regioni,http://www.regione.lazio.it/giunta,no,20,,"{""b"": 2}"\n'
+        )
+        stats, errors = import_lines(lines, 'csv')
+
+        self.assertEqual(errors, [])
+        lazio = Content.objects.get(url='http://www.regione.lazio.it/giunta')
+        self.assertEqual((lazio.use_proxy, lazio.timeout, lazio.op_url), (False, 20, None))
+        self.assertEqual(lazio.dati_specifici, {'b': 2})
+
+    def test_invalid_rows_are_skipped(self):
+        """Invalid rows are reported with their line number, and skipped."""
+        lines = jsonl(
+            {'title': 'Senza url', 'source_type': 'Comuni'},
+            {'title': 'Url errata', 'source_type': 'Comuni', 'url': 'non una url'},
+        ) + ['{non json\n', '\n'] + jsonl(
+            {'title': 'Giunta Lazio', 'source_type': 'Regioni', 'url': 'http://www.regione.lazio.it/giunta'},
+        )
+        stats, errors = import_lines(lines)
+
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertEqual((stats['created'], stats['errors']), (1, 3))
+
+    def test_queries_do_not_grow_with_batch(self):
+        """Each batch is written with a constant number of queries (one per source type, for the counters)."""
+        def rows(n):
+            return jsonl(*(
+                {'title': f'Comune {i}', 'source_type': f'Tipo {i % 3}', 'url': f'http://www.comune{i}.it'}
+                for i in range(n)
+            ))
+
+        import_lines(rows(5))
+        with self.assertNumQueries(8):
+            import_lines(rows(10))
+        with self.assertNumQueries(8):
+            import_lines(rows(30))
+
+    def test_databases_returning_no_primary_keys(self):
+        """Created contents and source types are read back, on dbs where bulk_create returns no primary keys."""
+        with patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            stats, errors = import_lines(jsonl(
+                {'title': 'Giunta Lazio', 'source_type': 'Regioni', 'url': 'http://www.regione.lazio.it/giunta'},
+                {'title': 'Consiglio Lazio', 'source_type': 'Regioni', 'url': 'http://www.regione.lazio.it/giunta',
+                 'selector': '#consiglio'},
+            ))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(stats['created'], 2)
+        lazio = Content.objects.get(title='Giunta Lazio')
+        self.assertEqual(lazio.source_type.name, 'Regioni')
+        self.assertEqual(list(Content.objects.search('consiglio')), [Content.objects.get(title='Consiglio Lazio')])
+
+    def test_export_command(self):
+        """The export command writes to its stdout."""
+        stdout = io.StringIO()
+
+        call_command('content_export', format='csv', stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().splitlines()[0], ','.join(catalog.FIELDS))
+
+    def test_batches(self):
+        """Rows are written in batches of `batch_size`."""
+        stats, _ = import_lines(jsonl(*(
+            {'title': f'Comune {i}', 'source_type': 'Comuni', 'url': f'http://www.comune{i}.it'} for i in range(7)
+        )), batch_size=3)
+
+        self.assertEqual(stats['created'], 7)
+        self.assertEqual(SourceType.objects.count(), 1)
+
+
+class CatalogAdminTests(TestCase):
+    """Catalog admin endpoints test class."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        Content.objects.create(
+            title='Giunta di Roma', source_type=SourceType.objects.create(name='Comuni'),
+            url='http://www.comune.roma.it/giunta'
+        )
+
+    def test_export(self):
+        """The export tool streams the catalog."""
+        response = self.client.get(reverse('admin:websourcemonitor_content_actions', kwargs={'tool': 'export_csv'}))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(catalog.FIELDS))
+        self.assertTrue(lines[1].startswith('Giunta di Roma,Comuni,'))
+
+    def test_import(self):
+        """Uploaded catalogs are imported."""
+        upload = SimpleUploadedFile('catalogo.jsonl', ''.join(jsonl(
+            {'title': 'Giunta Lazio', 'source_type': 'Regioni', 'url': 'http://www.regione.lazio.it/giunta'},
+            {'title': 'Senza url', 'source_type': 'Regioni'},
+        )).encode())
+
+        response = self.client.post(reverse('admin:websourcemonitor_content_import'), {'file': upload})
+
+        self.assertRedirects(
+            response, reverse('admin:websourcemonitor_content_changelist'), fetch_redirect_response=False
+        )
+        self.assertTrue(Content.objects.filter(title='Giunta Lazio').exists())
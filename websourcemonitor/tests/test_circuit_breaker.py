@@ -0,0 +1,86 @@
+"""Circuit breaker tests."""
+import threading
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, HostCircuitBreaker
+
+
+class HostCircuitBreakerTests(SimpleTestCase):
+    """HostCircuitBreaker test class."""
+
+    url = 'https://www.regione.test.it/giunta'
+
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = HostCircuitBreaker(threshold=2, cooldown=60, statuses=(990,), clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        """The circuit opens after the threshold of consecutive failures, and skips the host's urls."""
+        self.breaker.record(self.url, 990)
+        self.assertTrue(self.breaker.allow(self.url))
+        self.breaker.record(self.url, 990)
+
+        self.assertEqual(self.breaker.state('www.regione.test.it'), OPEN)
+        self.assertFalse(self.breaker.allow('https://www.regione.test.it/consiglio'))
+        self.assertTrue(self.breaker.allow('https://www.comune.test.it/'))
+
+    def test_summary_counts_skipped_contents_by_host(self):
+        """The summary lists the hosts with skipped contents."""
+        self.breaker.skip(self.url)
+        self.breaker.skip('https://www.regione.test.it/consiglio')
+
+        self.assertEqual(self.breaker.summary(), {'www.regione.test.it': 2})
+
+    def test_successes_reset_failures(self):
+        """Failures must be consecutive, and other statuses do not count."""
+        self.breaker.record(self.url, 990)
+        self.breaker.record(self.url, 200)
+        self.breaker.record(self.url, 404)
+        self.breaker.record(self.url, 990)
+
+        self.assertEqual(self.breaker.state('www.regione.test.it'), CLOSED)
+
+    def test_probe_after_cooldown(self):
+        """After the cooldown a single probe is let through; its outcome closes or reopens the circuit."""
+        self.breaker.record(self.url, 990)
+        self.breaker.record(self.url, 990)
+        self.now = 61
+
+        self.assertTrue(self.breaker.allow(self.url))
+        self.assertEqual(self.breaker.state('www.regione.test.it'), HALF_OPEN)
+        self.assertFalse(self.breaker.allow(self.url))
+        self.breaker.record(self.url, 990)
+        self.assertEqual(self.breaker.state('www.regione.test.it'), OPEN)
+
+        self.now = 122
+        self.assertTrue(self.breaker.allow(self.url))
+        self.breaker.record(self.url, 200)
+        self.assertEqual(self.breaker.state('www.regione.test.it'), CLOSED)
+
+    def test_failed_probe_without_status(self):
+        """A probe raising instead of returning a status reopens the circuit."""
+        self.breaker.record(self.url, 990)
+        self.breaker.record(self.url, 990)
+        self.now = 61
+        self.assertTrue(self.breaker.allow(self.url))
+
+        self.breaker.record_failure(self.url)
+
+        self.assertEqual(self.breaker.state('www.regione.test.it'), OPEN)
+
+    def test_shared_by_threads(self):
+        """Breakers shared by threads count every failure."""
+        breaker = HostCircuitBreaker(threshold=10 ** 6, statuses=(990,))
+
+        def fail():
+            for _ in range(1000):
+                breaker.record(self.url, 990)
+
+        threads = [threading.Thread(target=fail) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(breaker.failures['www.regione.test.it'], 8000)
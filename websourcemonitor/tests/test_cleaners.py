@@ -0,0 +1,61 @@
+"""Cleaners tests."""
+import re
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.cleaners import CleanerPipeline, clean_text, register_cleaner, unregister_cleaner
+from websourcemonitor.tests import parsed_content
+
+
+class CleanerPipelineTests(SimpleTestCase):
+    """CleanerPipeline test class."""
+
+    @staticmethod
+    def _legacy_clean(fragments):
+        regex = r"(?:\n|\t|\xa0)+(?:\s+(?:\n|\t|\xa0)+)?"
+        return "\n".join(re.sub(regex, "\n", x.strip("- \n\t")) for x in fragments)
+
+    def test_whitespace_cleaner_matches_legacy_normalisation(self):
+        """The whitespace pipeline produces the same text as the per-fragment regex substitutions."""
+        fragments = [
+            "- \n\tTitolo\xa0\xa0\n  \n\tSindaco:\tMario Rossi \n-",
+            parsed_content.replace("\n", "\n \t\xa0\n"),
+            "\n\nAssessore\n\n \n",
+        ]
+        pipeline = CleanerPipeline(["whitespace"])
+
+        self.assertEqual(pipeline.clean(fragments), self._legacy_clean(fragments))
+        self.assertEqual(pipeline.clean(fragments[0]), self._legacy_clean(fragments[:1]))
+
+    def test_volatile_tokens_are_masked(self):
+        """Dates, times, counters and session ids are masked."""
+        pipeline = CleanerPipeline(["whitespace", "session_ids", "counters", "dates", "times"])
+        text = pipeline.clean(
+            "Aggiornato il 12/03/2024 alle 10:45\n\nVisite: 12.345\n"
+            "<a href='index.php?PHPSESSID=a1b2c3'>home</a> 2024-03-12T10:45:00"
+        )
+
+        self.assertEqual(
+            text,
+            "Aggiornato il [DATA] alle [ORA]\nVisite: [N]\n"
+            "<a href='index.php?PHPSESSID=[SESSIONE]'>home</a> [DATA]"
+        )
+
+    def test_clean_text_masks_only_when_cleaner_is_used(self):
+        """Contents not using the cleaner only get whitespaces normalised."""
+        text = "Contatore 1234\n\n\nfine"
+
+        self.assertEqual(clean_text(text, use_cleaner=False), "Contatore 1234\nfine")
+
+    def test_registered_cleaners_can_be_used_in_pipelines(self):
+        """Custom cleaners can be registered and used in pipelines."""
+        register_cleaner("test_tokens", r"tok-[0-9a-f]+", "[TOKEN]", re.IGNORECASE)
+        self.addCleanup(unregister_cleaner, "test_tokens")
+        pipeline = CleanerPipeline(["test_tokens"])
+
+        self.assertEqual(pipeline.clean(["TOK-ab12 x", "y tok-ff"]), "[TOKEN] x\ny [TOKEN]")
+
+    def test_unregistered_cleaners_raise_value_error(self):
+        """Unknown cleaner names are refused."""
+        with self.assertRaises(ValueError):
+            CleanerPipeline(["not_a_cleaner"])
@@ -0,0 +1,106 @@
+"""Status counters tests."""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from websourcemonitor.models import Content, SourceType, StatusCounter
+from websourcemonitor.services.results import VerificationResult
+
+
+def counts():
+    return {
+        (counter.source_type.name, counter.verification_status): counter.count
+        for counter in StatusCounter.objects.select_related('source_type') if counter.count
+    }
+
+
+class StatusCounterTests(TestCase):
+    """StatusCounter test class."""
+
+    def setUp(self):
+        self.comuni = SourceType.objects.create(name='Comuni')
+        self.regioni = SourceType.objects.create(name='Regioni')
+        self.roma = Content.objects.create(
+            title='Giunta di Roma', source_type=self.comuni, url='http://www.comune.roma.it/giunta', content='Sindaco'
+        )
+        self.lazio = Content.objects.create(
+            title='Giunta Lazio', source_type=self.regioni, url='http://www.regione.lazio.it/giunta'
+        )
+
+    def test_new_contents_are_counted(self):
+        """New contents are counted as not verified."""
+        self.assertEqual(counts(), {
+            ('Comuni', StatusCounter.NOT_VERIFIED): 1, ('Regioni', StatusCounter.NOT_VERIFIED): 1
+        })
+
+    def test_transitions(self):
+        """Verifications, updates, resets and deletions move the contents between the counters."""
+        self.roma.set_verification(VerificationResult(200, 'Sindaco Mario Rossi'))
+        self.roma.save()
+        self.assertEqual(counts()[('Comuni', Content.STATUS_CHANGED)], 1)
+
+        roma = Content.objects.get(pk=self.roma.pk)
+        roma.update()
+        self.assertEqual(counts()[('Comuni', Content.STATUS_UPDATED)], 1)
+        self.assertNotIn(('Comuni', Content.STATUS_CHANGED), counts())
+
+        roma.reset()
+        roma.source_type = self.regioni
+        roma.save()
+        self.lazio.delete()
+        self.assertEqual(counts(), {('Regioni', StatusCounter.NOT_VERIFIED): 1})
+
+    def test_unchanged_status_costs_no_query(self):
+        """Saving a content with the same status does not touch the counters."""
+        content = Content.objects.get(pk=self.lazio.pk)
+        with self.assertNumQueries(1):
+            content.save(update_fields=['claimed_by'])
+
+    def test_bulk_updates(self):
+        """Contents saved in bulk are moved with one query per counter."""
+        for source_type in (self.comuni, self.regioni):
+            StatusCounter.objects.create(source_type=source_type, verification_status=Content.STATUS_ERROR)
+        contents = list(Content.objects.all())
+        for content in contents:
+            content.verification_status = Content.STATUS_ERROR
+        Content.objects.bulk_update(contents, ['verification_status'])
+
+        with self.assertNumQueries(4):
+            StatusCounter.objects.record(contents)
+        self.assertEqual(counts(), {('Comuni', Content.STATUS_ERROR): 1, ('Regioni', Content.STATUS_ERROR): 1})
+
+    def test_reconcile(self):
+        """Reconciling corrects the counters drifted after queryset updates and deletions."""
+        Content.objects.filter(pk=self.roma.pk).update(verification_status=Content.STATUS_SIGNALED)
+        Content.objects.filter(pk=self.lazio.pk).delete()
+        StatusCounter.objects.create(source_type=self.regioni, verification_status=Content.STATUS_CHANGED, count=3)
+
+        self.assertEqual(StatusCounter.objects.reconcile(), 4)
+        self.assertEqual(counts(), {('Comuni', Content.STATUS_SIGNALED): 1})
+        self.assertEqual(StatusCounter.objects.reconcile(), 0)
+
+
+class DashboardTests(TestCase):
+    """Admin dashboard test class."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        comuni = SourceType.objects.create(name='Comuni')
+        for n in range(3):
+            Content.objects.create(
+                title=f'Fonte {n}', source_type=comuni, url=f'http://www.comune{n}.it',
+                verification_status=Content.STATUS_CHANGED if n else None
+            )
+
+    def test_dashboard(self):
+        """The dashboard shows the counters, reading no content."""
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin:websourcemonitor_content_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        source_type, cells, row_total = response.context['rows'][0]
+        self.assertEqual(source_type.name, 'Comuni')
+        self.assertEqual([count for count, _ in cells][:3], [1, 0, 2])
+        self.assertEqual(row_total, 3)
+        self.assertEqual(response.context['total'], 3)
+        self.assertIn('verification_status__exact=1', cells[2][1])
@@ -0,0 +1,100 @@
+"""Offline extraction tests."""
+import os
+import unittest
+
+from django.test import SimpleTestCase
+from playwright.sync_api import sync_playwright
+
+import websourcemonitor
+from websourcemonitor.extraction import extract
+from websourcemonitor.services.playwright import PlaywrightWrapper
+from websourcemonitor.tests import html_content, parsed_content
+
+
+def read_resource(name):
+    with open(f'{websourcemonitor.__path__[0]}/tests/resources/{name}', 'r') as src_f:
+        return src_f.read()
+
+
+class ExtractTests(SimpleTestCase):
+    """extract test class."""
+
+    page = (
+        "<html><head><title>Giunta</title><script>var x = 1;</script></head><body>"
+        "<div id='giunta'><h2>Sindaco</h2><p>Maria  Bianchi</p>"
+        "<table><tr><td>Assessore</td><td>Luca Verdi</td></tr></table>"
+        "<a href='/bilancio'>Bilancio</a></div>"
+        "</body></html>"
+    )
+
+    def test_text_with_xpath_selector(self):
+        """Text is extracted with line breaks inferred from the tags, and cleaned."""
+        status, content = extract(self.page, "//div[@id='giunta']")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content, "Sindaco\nMaria Bianchi\nAssessore\nLuca Verdi\nBilancio")
+
+    def test_html_has_absolute_links(self):
+        """Links in html contents are made absolute, as in live extractions."""
+        status, content = extract(self.page, "xpath=//div[@id='giunta']", output_format='html',
+                                  url='http://www.comune.test.it/giunta/')
+
+        self.assertEqual(status, 200)
+        self.assertIn('<a href="http://www.comune.test.it/bilancio" target="_blank">Bilancio</a>', content)
+
+    def test_default_selector_skips_scripts(self):
+        """Without selector the body is extracted, and scripts are skipped."""
+        status, content = extract(self.page, "")
+
+        self.assertEqual(status, 200)
+        self.assertNotIn("var x", content)
+
+    def test_selector_not_found(self):
+        """Selectors matching nothing are reported with status 900."""
+        self.assertEqual(extract(self.page, "//ul")[0], 900)
+
+    def test_invalid_xpath(self):
+        """Invalid XPath expressions are reported with status 900."""
+        self.assertEqual(extract(self.page, "//div[")[0], 900)
+
+    def test_captured_pages(self):
+        """Contents extracted from the captured pages are those parsed from them."""
+        status, content = extract(html_content.decode('utf8'), "//*[@id=\"wpsportletdx\"]/div[3]/div/div")
+        self.assertEqual((status, content), (200, parsed_content))
+
+        status, content = extract(read_resource('source_enna_original.html'), "//*[@class=\"contact-category\"]")
+        self.assertEqual((status, content), (200, read_resource('source_parsed_enna_content.txt').strip()))
+
+
+class ExtractFromHtmlTests(SimpleTestCase):
+    """PlaywrightWrapper.extract_from_html test class; needs the playwright browsers."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with sync_playwright() as p:
+            if not os.path.exists(p.chromium.executable_path):
+                raise unittest.SkipTest("playwright's chromium is not installed")
+
+    def setUp(self):
+        self.pw = PlaywrightWrapper(asset_cache=False, storage_states=False)
+        self.addCleanup(self.pw.stop)
+
+    def test_extracted_as_live_pages(self):
+        """Captured pages are extracted as the live ones, with a fingerprint, and with their scripts not run."""
+        result = self.pw.extract_from_html(
+            "<html><head><link rel='stylesheet' href='http://www.comune.test/style.css'></head><body>"
+            "<div id='giunta'><h2>Sindaco</h2><p>Mario Rossi</p></div>"
+            "<script>document.getElementById('giunta').innerHTML = 'Rimosso';</script></body></html>",
+            'http://www.comune.test/giunta', "//div[@id='giunta']"
+        )
+
+        self.assertEqual(result.status, 200)
+        self.assertEqual([line for line in result.content.splitlines() if line], ['Sindaco', 'Mario Rossi'])
+        self.assertTrue(result.fingerprint)
+
+    def test_selector_not_found(self):
+        """Selectors matching nothing in the captured page are reported with status 900."""
+        result = self.pw.extract_from_html("<html><body></body></html>", 'http://www.comune.test/giunta', "//ul")
+
+        self.assertEqual((result.status, result.content), (900, "Selettore non trovato"))
@@ -0,0 +1,35 @@
+"""Model fields tests."""
+from django.db import connection
+from django.test import TestCase
+
+from websourcemonitor.models import Content, SourceType
+from websourcemonitor.tests import parsed_content
+
+
+class CompressedTextFieldTests(TestCase):
+    """CompressedTextField test class."""
+
+    def setUp(self):
+        self.content = Content.objects.create(
+            title='Test',
+            source_type=SourceType.objects.create(name='Test'),
+            url='http://www.comune.test.it',
+            content=parsed_content * 10,
+        )
+
+    def test_values_are_read_back_as_text(self):
+        """Stored text is returned unchanged, and None stays None."""
+        content = Content.objects.get(pk=self.content.pk)
+
+        self.assertEqual(content.content, parsed_content * 10)
+        self.assertIsNone(content.next_content)
+
+    def test_values_are_stored_compressed(self):
+        """The column holds fewer bytes than the text."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT content FROM {Content._meta.db_table} WHERE id = %s", [self.content.pk]
+            )
+            stored = bytes(cursor.fetchone()[0])
+
+        self.assertLess(len(stored), len((parsed_content * 10).encode('utf-8')) / 5)
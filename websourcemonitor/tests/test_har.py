@@ -0,0 +1,102 @@
+"""HAR archives tests."""
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+from django.test import SimpleTestCase
+from playwright.sync_api import sync_playwright
+
+from websourcemonitor.services.har import har_path
+from websourcemonitor.services.playwright import PlaywrightWrapper
+
+
+class HarPathTests(SimpleTestCase):
+    """har_path test class."""
+
+    def test_archives_are_named_after_host(self):
+        """Archives are zip files in the given path, named after the source's host."""
+        path = har_path('https://www.comune.roma.it/giunta', 'hars')
+
+        self.assertRegex(path, r"^hars/www\.comune\.roma\.it_[0-9a-f]{16}\.zip$")
+
+    def test_each_source_has_its_own_archive(self):
+        """Different urls on the same host are archived separately, the same url in the same archive."""
+        self.assertNotEqual(har_path('https://www.comune.roma.it/giunta'), har_path('https://www.comune.roma.it/'))
+        self.assertEqual(har_path('https://www.comune.roma.it/giunta'), har_path('https://www.comune.roma.it/giunta'))
+
+
+class PlaywrightWrapperHarModeTests(SimpleTestCase):
+    """PlaywrightWrapper HAR modes test class."""
+
+    def test_invalid_mode(self):
+        """Unknown HAR modes are rejected before starting playwright."""
+        with self.assertRaises(ValueError):
+            PlaywrightWrapper(har_mode='rewind')
+
+
+def write_har(path, url, html):
+    """Write a HAR archive serving `html` at `url`, as playwright records them with record_har_content='attach'."""
+    entry = {
+        'startedDateTime': '2026-10-19T08:00:00.000Z', 'time': 10,
+        'request': {
+            'method': 'GET', 'url': url, 'httpVersion': 'HTTP/1.1', 'cookies': [], 'headers': [],
+            'queryString': [], 'headersSize': -1, 'bodySize': 0,
+        },
+        'response': {
+            'status': 200, 'statusText': 'OK', 'httpVersion': 'HTTP/1.1', 'cookies': [],
+            'headers': [{'name': 'Content-Type', 'value': 'text/html; charset=utf-8'}],
+            'content': {'size': len(html), 'mimeType': 'text/html; charset=utf-8', '_file': 'page.html'},
+            'redirectURL': '', 'headersSize': -1, 'bodySize': len(html),
+        },
+        'cache': {}, 'timings': {'send': 0, 'wait': 10, 'receive': 0},
+    }
+    har = {'log': {'version': '1.2', 'creator': {'name': 'Playwright', 'version': '1.41'}, 'pages': [],
+                   'entries': [entry]}}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('har.har', json.dumps(har))
+        archive.writestr('page.html', html)
+
+
+class PlaywrightWrapperReplayTests(SimpleTestCase):
+    """PlaywrightWrapper HAR replay test class; needs the playwright browsers."""
+
+    # .test domains never resolve: the page can only come from the archive
+    url = 'http://www.comune.test/giunta'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with sync_playwright() as p:
+            if not os.path.exists(p.chromium.executable_path):
+                raise unittest.SkipTest("playwright's chromium is not installed")
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.har_path = tmp_dir.name
+
+    def wrapper(self):
+        pw = PlaywrightWrapper(har_mode='replay', har_path=self.har_path, asset_cache=False, storage_states=False)
+        self.addCleanup(pw.stop)
+        return pw
+
+    def test_replay_serves_the_archive(self):
+        """Pages are served from the source's archive, with no network, and extracted as live ones."""
+        write_har(har_path(self.url, self.har_path), self.url, (
+            "<html><body><div id='giunta'><h2>Sindaco</h2><p>Mario Rossi</p></div></body></html>"
+        ))
+
+        status, content = self.wrapper().get_live_content(self.url, "//div[@id='giunta']", 'text')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([line.strip() for line in content.splitlines() if line.strip()], ['Sindaco', 'Mario Rossi'])
+
+    def test_replay_without_archive(self):
+        """Sources with no archive fail as connection errors, without reaching the network."""
+        status, content = self.wrapper().get_live_content(self.url, "//div[@id='giunta']", 'text')
+
+        self.assertEqual(status, 990)
+        self.assertIn('Archivio HAR non trovato', content)
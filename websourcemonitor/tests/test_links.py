@@ -0,0 +1,59 @@
+"""Links tests."""
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from django.test import SimpleTestCase
+
+import websourcemonitor
+from websourcemonitor.links import make_links_absolute
+
+
+def bs4_make_links_absolute(html, base_url):
+    """The BeautifulSoup implementation, whose output must be preserved."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all('a', href=True):
+        tag['href'] = urljoin(base_url, tag['href'])
+        tag['target'] = '_blank'
+    return str(soup)
+
+
+class MakeLinksAbsoluteTests(SimpleTestCase):
+    """make_links_absolute test class."""
+
+    base_url = 'http://www.comune.test.it/amministrazione/giunta.html'
+
+    def _fixture_fragments(self, name):
+        with open(f'{websourcemonitor.__path__[0]}/tests/resources/{name}', 'r') as src_f:
+            soup = BeautifulSoup(src_f.read(), 'html.parser')
+        return [element.decode_contents() for element in soup.find_all(['div', 'ul', 'table', 'li', 'p'])]
+
+    def test_output_is_identical_to_bs4_on_fixtures(self):
+        """Fragments from the resources are transformed as BeautifulSoup did."""
+        for name in ('source_original.html', 'source_enna_original.html'):
+            fragments = self._fixture_fragments(name)
+            self.assertEqual(
+                make_links_absolute(fragments, self.base_url),
+                [bs4_make_links_absolute(fragment, self.base_url) for fragment in fragments],
+                msg=name
+            )
+
+    def test_serialisation_details_are_identical_to_bs4(self):
+        """Attributes order and quoting, void elements, escaping and whitespaces match BeautifulSoup."""
+        fragments = [
+            '<p title=\'say "hi"\' class="  b   a ">t &amp; &lt; &nbsp; " </p>  \n  <br><img src="x.png">',
+            '<a href="../uffici/" class="x" rel="nofollow  noopener">Uffici</a><a name="top">top</a>',
+            '<pre>  \n  </pre><script>if (a < b && c) {}</script><!-- comment --><input disabled="">',
+            '<a href="mailto:info@comune.test.it" target="_self" title="Bob\'s &quot;bar&quot;">mail</a>',
+        ]
+        self.assertEqual(
+            make_links_absolute(fragments, self.base_url),
+            [bs4_make_links_absolute(fragment, self.base_url) for fragment in fragments],
+        )
+
+    def test_misnested_fragments_fall_back_to_bs4(self):
+        """Fragments that lxml would re-nest are transformed by BeautifulSoup."""
+        fragments = ['<p><div><a href="/x">x</a></div></p>']
+        self.assertEqual(
+            make_links_absolute(fragments, self.base_url),
+            ['<p><div><a href="http://www.comune.test.it/x" target="_blank">x</a></div></p>']
+        )
@@ -0,0 +1,424 @@
+"""Content model tests."""
+import datetime
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from websourcemonitor.admin import ContentAdmin
+from websourcemonitor.filters import ErrorCodeFilter
+from websourcemonitor.models import Content, RawCapture, SourceType
+from websourcemonitor.services.results import VerificationResult, STATUS_NOT_TRANSFERRED
+
+
+class FakePlaywrightWrapper:
+    """Stands in for PlaywrightWrapper, returning canned responses."""
+
+    def __init__(self, *responses, fingerprint=None, page_html=None):
+        self.responses = list(responses)
+        self.fingerprint = fingerprint
+        self.page_html = page_html
+        self.calls = []
+
+    def get_live_content(self, url, selector, output_format, **kwargs):
+        self.calls.append(kwargs)
+        status, content = self.responses.pop(0)
+        return VerificationResult(status, content, fingerprint=self.fingerprint, page_html=self.page_html)
+
+    def extract_from_html(self, html, url, selector, **kwargs):
+        self.calls.append(dict(kwargs, html=html))
+        status, content = self.responses.pop(0)
+        return VerificationResult(status, content, fingerprint=self.fingerprint)
+
+    def stop(self):
+        pass
+
+
+class ContentVerifyTests(TestCase):
+    """Content.verify test class."""
+
+    def setUp(self):
+        cache.clear()
+        self.content = Content.objects.create(
+            title='Giunta Comunale di Roma Capitale',
+            source_type=SourceType.objects.create(name='Test'),
+            url='http://www.comune.roma.it/giunta',
+            content='Sindaco\nMario Rossi',
+        )
+
+    def test_verify_stores_fingerprint_of_live_section(self):
+        """The fingerprint computed in the page is stored along with the verification."""
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi'), fingerprint='abcd1234-2a:0f')
+
+        status = self.content.verify(playwright_wrapper=pw)
+
+        self.assertEqual(status, Content.STATUS_NOT_CHANGED)
+        self.assertEqual(Content.objects.get(pk=self.content.pk).fingerprint, 'abcd1234-2a:0f')
+
+    def test_verify_does_not_store_unchanged_next_content(self):
+        """When the live content is equal to the stored one, next_content is not stored."""
+        self.content.verify(playwright_wrapper=FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi')))
+
+        self.assertIsNone(Content.objects.get(pk=self.content.pk).next_content)
+
+    def test_update_keeps_content_when_not_changed(self):
+        """Updating an unchanged content keeps the stored content."""
+        self.content.verify(playwright_wrapper=FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi')))
+
+        status = self.content.update()
+
+        self.assertEqual(status, Content.STATUS_UPDATED)
+        self.assertEqual(self.content.content, 'Sindaco\nMario Rossi')
+
+    def test_verify_reuses_last_fetched_content_when_fingerprint_matches(self):
+        """When the section is not transferred (930), the last fetched content is compared."""
+        self.content.next_content = 'Sindaco\nMaria Bianchi'
+        self.content.fingerprint = 'abcd1234-2a:0f'
+        self.content.save()
+        pw = FakePlaywrightWrapper((STATUS_NOT_TRANSFERRED, None), fingerprint='abcd1234-2a:0f')
+
+        status = self.content.verify(playwright_wrapper=pw)
+
+        self.assertEqual(pw.calls[0]['fingerprint'], 'abcd1234-2a:0f')
+        self.assertEqual(status, Content.STATUS_CHANGED)
+        self.assertEqual(self.content.next_content, 'Sindaco\nMaria Bianchi')
+
+    def test_verify_errors_forget_fingerprint(self):
+        """After an error, the next verification transfers the whole section."""
+        self.content.fingerprint = 'abcd1234-2a:0f'
+        self.content.save()
+
+        status = self.content.verify(playwright_wrapper=FakePlaywrightWrapper((404, 'Pagina non trovata')))
+
+        self.assertEqual(status, Content.STATUS_ERROR)
+        self.assertIsNone(self.content.fingerprint)
+
+    def test_verify_stores_status_code_and_timing(self):
+        """The status code, response time and final url of the fetch are stored."""
+        pw = FakePlaywrightWrapper()
+        pw.get_live_content = lambda *args, **kwargs: VerificationResult(
+            404, 'Pagina non trovata', final_url='https://www.comune.roma.it/giunta/', response_time=0.8
+        )
+
+        self.content.verify(playwright_wrapper=pw)
+
+        content = Content.objects.get(pk=self.content.pk)
+        self.assertEqual((content.status_code, content.response_time), (404, 0.8))
+        self.assertEqual(content.final_url, 'https://www.comune.roma.it/giunta/')
+        self.assertEqual(Content.objects.filter(status_code=404).count(), 1)
+
+    def test_verify_passes_by_pass_with_google_flag(self):
+        """The by_pass_with_google flag in dati_specifici is passed to the wrapper."""
+        self.content.dati_specifici = {'by_pass_with_google': True}
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi'))
+
+        self.content.verify(playwright_wrapper=pw)
+
+        self.assertTrue(pw.calls[0]['by_pass_with_google'])
+
+    def test_live_content_is_reused_from_fetch_cache(self):
+        """Fetching the same content again within the TTL reuses the cached result."""
+        self.content.verify(playwright_wrapper=FakePlaywrightWrapper((200, 'Sindaco\nMaria Bianchi')))
+
+        self.assertEqual(self.content.get_live_content(playwright_wrapper=FakePlaywrightWrapper()),
+                         (200, 'Sindaco\nMaria Bianchi'))
+
+    def test_har_modes_bypass_fetch_cache(self):
+        """Wrappers recording or replaying HAR archives always fetch, and their results are not cached."""
+        self.content.verify(playwright_wrapper=FakePlaywrightWrapper((200, 'Sindaco\nMaria Bianchi')))
+        for har_mode in ('record', 'replay'):
+            with self.subTest(har_mode):
+                pw = FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi'))
+                pw.har_mode = har_mode
+
+                self.assertEqual(self.content.get_live_content(playwright_wrapper=pw), (200, 'Sindaco\nMario Rossi'))
+                self.assertEqual(len(pw.calls), 1)
+
+        self.assertEqual(self.content.get_live_content(playwright_wrapper=FakePlaywrightWrapper()),
+                         (200, 'Sindaco\nMaria Bianchi'))
+
+    def test_errors_are_not_cached(self):
+        """Failed fetches are not cached."""
+        self.content.verify(playwright_wrapper=FakePlaywrightWrapper((990, 'Timeout')))
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi'))
+
+        self.assertEqual(self.content.get_live_content(playwright_wrapper=pw), (200, 'Sindaco\nMario Rossi'))
+        self.assertEqual(len(pw.calls), 1)
+
+
+class RawCaptureTests(TestCase):
+    """Raw html capture and offline re-extraction test class."""
+
+    PAGE = (
+        "<html><body><div id='giunta'><h2>Sindaco</h2><p>Maria Bianchi</p></div>"
+        "<div id='footer'>Visite: 1234</div></body></html>"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.content = Content.objects.create(
+            title='Giunta Comunale di Roma Capitale',
+            source_type=SourceType.objects.create(name='Test'),
+            url='http://www.comune.roma.it/giunta',
+            selector="//div[@id='giunta']",
+            content='Sindaco\nMario Rossi',
+        )
+
+    def test_verify_stores_captured_page(self):
+        """The rendered page is stored when capture_html is set."""
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMaria Bianchi'), page_html=self.PAGE)
+
+        self.content.verify(playwright_wrapper=pw, capture_html=True)
+
+        self.assertTrue(pw.calls[0]['capture_html'])
+        self.assertEqual(self.content.raw_captures.get().html, self.PAGE)
+
+    def test_store_keeps_only_latest_captures(self):
+        """Captures exceeding the retention limit are removed."""
+        for _ in range(5):
+            RawCapture.objects.store(self.content, self.PAGE)
+
+        self.assertEqual(self.content.raw_captures.count(), 3)
+
+    def test_reextract_compares_with_stored_content(self):
+        """The content extracted offline is compared with the stored one, and nothing is written."""
+        RawCapture.objects.store(self.content, self.PAGE)
+
+        status = self.content.reextract()
+
+        self.assertEqual(status, Content.STATUS_CHANGED)
+        self.assertEqual(self.content.next_content, 'Sindaco\nMaria Bianchi')
+        self.assertIsNone(Content.objects.get(pk=self.content.pk).verification_status)
+
+    def test_reextract_offline_never_rebaselines(self):
+        """Contents extracted offline never replace the stored ones."""
+        RawCapture.objects.store(self.content, self.PAGE)
+
+        self.content.reextract(rebaseline=True)
+
+        self.assertEqual(self.content.content, 'Sindaco\nMario Rossi')
+        self.assertEqual(Content.objects.get(pk=self.content.pk).content, 'Sindaco\nMario Rossi')
+
+    def test_reextract_renders_capture(self):
+        """With a playwright wrapper, the capture is rendered again, and the result is saved."""
+        RawCapture.objects.store(self.content, self.PAGE)
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMaria Bianchi'), fingerprint='abc-1')
+
+        status = self.content.reextract(playwright_wrapper=pw)
+
+        self.assertEqual(pw.calls[0]['html'], self.PAGE)
+        self.assertEqual(status, Content.STATUS_CHANGED)
+        stored = Content.objects.get(pk=self.content.pk)
+        self.assertEqual((stored.next_content, stored.fingerprint), ('Sindaco\nMaria Bianchi', 'abc-1'))
+
+    def test_reextract_rebaseline_replaces_stored_content(self):
+        """With rebaseline, the content rendered again replaces the stored one."""
+        RawCapture.objects.store(self.content, self.PAGE)
+        pw = FakePlaywrightWrapper((200, 'Visite: 1234'))
+
+        status = self.content.reextract(rebaseline=True, playwright_wrapper=pw)
+
+        self.assertEqual(status, Content.STATUS_NOT_CHANGED)
+        self.assertEqual(Content.objects.get(pk=self.content.pk).content, 'Visite: 1234')
+
+    def test_reextract_invalid_selector(self):
+        """Selectors matching nothing in the captured page are reported as errors."""
+        RawCapture.objects.store(self.content, self.PAGE)
+        self.content.selector = "//table"
+
+        self.assertEqual(self.content.reextract(), Content.STATUS_ERROR)
+
+    def test_latest_for(self):
+        """The latest capture of each content is returned."""
+        RawCapture.objects.store(self.content, "<p>old</p>")
+        latest = RawCapture.objects.store(self.content, self.PAGE)
+
+        self.assertEqual(RawCapture.objects.latest_for([self.content]), {self.content.id: latest})
+
+
+class ContentClaimTests(TestCase):
+    """Content lease-based claims test class."""
+
+    def setUp(self):
+        source_type = SourceType.objects.create(name='Test')
+        self.contents = [
+            Content.objects.create(title=f'Fonte {n}', source_type=source_type, url=f'http://example.com/{n}')
+            for n in range(5)
+        ]
+
+    def test_workers_claim_different_contents(self):
+        """Concurrent workers claim disjoint batches, until no content is left."""
+        first = Content.objects.claim('node-1', batch_size=3)
+        second = Content.objects.claim('node-2', batch_size=3)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({c.id for c in first} & {c.id for c in second})
+        self.assertEqual(Content.objects.claim('node-3'), [])
+        self.assertEqual(Content.objects.filter(claimed_by='node-1').count(), 3)
+
+    def test_least_recently_verified_first(self):
+        """Never verified contents come first, then the least recently verified ones."""
+        now = timezone.now()
+        for n, content in enumerate(self.contents):
+            content.verified_at = now - datetime.timedelta(days=10 - n)
+            content.save()
+        self.contents[3].verified_at = None
+        self.contents[3].save()
+
+        claimed = Content.objects.claim('node-1', batch_size=2)
+
+        self.assertEqual([c.id for c in claimed], [self.contents[3].id, self.contents[0].id])
+
+    def test_recently_verified_and_disabled_are_not_due(self):
+        """Contents verified within min_age, or with verification disabled, are not claimed."""
+        Content.objects.filter(id=self.contents[0].id).update(verified_at=timezone.now())
+        Content.objects.filter(id=self.contents[1].id).update(is_verification_enabled=False)
+
+        claimed = Content.objects.claim('node-1', min_age=3600)
+
+        self.assertEqual({c.id for c in claimed}, {c.id for c in self.contents[2:]})
+
+    def test_expired_leases_are_claimed_again(self):
+        """Contents leased by a crashed worker are claimed again when the lease expires."""
+        Content.objects.claim('node-1', lease_time=600)
+        Content.objects.update(claimed_until=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.assertEqual(len(Content.objects.claim('node-2')), 5)
+
+    def test_release(self):
+        """Released contents have no lease, and only the worker's leases are released."""
+        Content.objects.claim('node-1', batch_size=2)
+        Content.objects.claim('node-2', batch_size=2)
+
+        self.assertEqual(Content.objects.release('node-1'), 2)
+        self.assertEqual(Content.objects.filter(claimed_by__isnull=False).count(), 2)
+
+    def test_renew(self):
+        """Renewing extends the worker's leases only, so that long batches are not claimed again."""
+        Content.objects.claim('node-1', batch_size=2, lease_time=60)
+        Content.objects.claim('node-2', batch_size=2, lease_time=60)
+
+        self.assertEqual(Content.objects.renew('node-1', lease_time=3600), 2)
+        self.assertEqual(
+            Content.objects.filter(claimed_until__gt=timezone.now() + datetime.timedelta(seconds=60)).count(), 2
+        )
+
+    def test_verifications_keep_the_lease(self):
+        """Saving a verification does not overwrite the lease of the worker holding the content now."""
+        content = Content.objects.get(pk=self.contents[0].pk)
+        Content.objects.filter(pk=content.pk).update(claimed_by='node-2', claimed_until=timezone.now())
+
+        content.apply_verification(VerificationResult(200, 'Giunta'))
+        content.skip_verification()
+
+        self.assertEqual(Content.objects.get(pk=content.pk).claimed_by, 'node-2')
+
+
+class ContentTimeoutTests(TestCase):
+    """Content adaptive timeouts test class."""
+
+    def setUp(self):
+        cache.clear()
+        self.content = Content.objects.create(
+            title='Giunta', source_type=SourceType.objects.create(name='Test'),
+            url='http://www.comune.roma.it/giunta', content='Sindaco\nMario Rossi',
+        )
+
+    def test_no_timeout_with_few_samples(self):
+        """Until enough loads are known, the default request timeout is used."""
+        self.content.load_times = [1.0, 1.2]
+
+        self.assertIsNone(self.content.get_timeout())
+
+    def test_timeout_from_p95_clamped(self):
+        """The timeout is the p95 of the load times with some headroom, within the bounds."""
+        self.content.load_times = [1.0] * 19 + [2.5]
+        self.assertEqual(self.content.get_timeout(), 3)  # 1.0 * 2, raised to the minimum
+
+        self.content.load_times = [2.0] * 18 + [4.0, 40.0]
+        self.assertEqual(self.content.get_timeout(), 8.0)
+
+        self.content.load_times = [20.0] * 20
+        self.assertEqual(self.content.get_timeout(), 10)  # never longer than REQUESTS_MAX_TIMEOUT
+
+    def test_explicit_timeout_wins(self):
+        """The content's own timeout overrides the adaptive one."""
+        self.content.load_times = [1.0] * 20
+        self.content.timeout = 15
+
+        self.assertEqual(self.content.get_timeout(), 15)
+
+    def test_load_times_are_recorded_and_capped(self):
+        """Successful fetches record their load time, keeping the latest ones only."""
+        self.content.load_times = [1.0] * 20
+        self.content.set_verification(VerificationResult(
+            200, 'Sindaco\nMario Rossi', final_url=self.content.url, response_time=2.5
+        ))
+        self.content.set_verification(VerificationResult(990, 'Timeout', final_url=self.content.url, response_time=9))
+
+        self.assertEqual(len(self.content.load_times), 20)
+        self.assertEqual(self.content.load_times[-1], 2.5)
+
+    def test_cached_results_record_no_load_time(self):
+        """Results reused from the fetch cache fetched nothing, and record no load time."""
+        self.content.load_times = [1.0] * 5
+        self.content.set_verification(VerificationResult(
+            200, 'Sindaco\nMario Rossi', final_url=self.content.url, response_time=2.5, from_cache=True
+        ))
+
+        self.assertEqual(self.content.load_times, [1.0] * 5)
+
+    def test_timeout_passed_to_the_wrapper(self):
+        """Verifications fetch with the content's timeout."""
+        self.content.load_times = [2.0] * 20
+        pw = FakePlaywrightWrapper((200, 'Sindaco\nMario Rossi'))
+
+        self.content.verify(playwright_wrapper=pw)
+
+        self.assertEqual(pw.calls[0]['timeout'], 4.0)
+
+
+class ContentPriorityTests(TestCase):
+    """Content priority ordering test class."""
+
+    def test_by_priority(self):
+        """Changed contents come first, then those with an op_url, then overdue ones."""
+        source_type = SourceType.objects.create(name='Test')
+        now = timezone.now()
+
+        def create(title, **kwargs):
+            return Content.objects.create(title=title, source_type=source_type, url='http://example.com', **kwargs)
+
+        fresh = create('fresh', verified_at=now)
+        overdue = create('overdue', verified_at=now - datetime.timedelta(days=2))
+        with_op_url = create('op_url', verified_at=now, op_url='http://openpolis.it/1')
+        changed = create('changed', verified_at=now, verification_status=Content.STATUS_CHANGED)
+        never = create('never')
+
+        self.assertEqual(
+            list(Content.objects.by_priority()),
+            [changed, with_op_url, never, overdue, fresh]
+        )
+
+
+class ErrorCodeFilterTests(TestCase):
+    """Admin error code filter test class."""
+
+    def setUp(self):
+        source_type = SourceType.objects.create(name='Test')
+        self.not_found = Content.objects.create(
+            title='Non trovata', source_type=source_type, url='http://example.com/a',
+            status_code=404, verification_error='ERRORE 404 (Not Found)'
+        )
+        Content.objects.create(title='Ok', source_type=source_type, url='http://example.com/b', status_code=200)
+
+    def filtered(self, value):
+        error_code = ErrorCodeFilter(None, {'error_code': [value]}, Content, ContentAdmin(Content, admin.site))
+        return list(error_code.queryset(None, Content.objects.order_by('id')))
+
+    def test_filter(self):
+        """Contents are filtered by their stored status code; invalid values leave them unfiltered."""
+        self.assertEqual(self.filtered('404'), [self.not_found])
+        self.assertEqual(len(self.filtered('abc')), 2)
@@ -0,0 +1,237 @@
+"""Notification digests tests, against local SMTP and Slack stand-ins."""
+import datetime
+import json
+import socketserver
+import threading
+from email import message_from_bytes
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.core.mail import get_connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from websourcemonitor.models import Content, SourceType
+from websourcemonitor.services import notifications
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """A local SMTP server, recording the connections and the messages received."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost stand-in")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply("221 bye")
+                return
+            if command == 'EHLO':
+                self.reply("250 localhost")
+            elif command == 'RCPT':
+                recipients.append(line.split(':', 1)[1].strip('<> '))
+                self.reply("250 ok")
+            elif command == 'DATA':
+                self.reply("354 go ahead")
+                data = b''
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk == b'.\r\n':
+                        break
+                    data += chunk
+                self.server.messages.append((recipients, message_from_bytes(data)))
+                recipients = []
+                self.reply("250 queued")
+            else:
+                self.reply("250 ok")
+
+
+class SlackStandIn(HTTPServer):
+    """A local Slack api, recording the posted messages; the first `rate_limited` requests get a 429 response."""
+
+    def __init__(self, rate_limited=0):
+        super().__init__(('127.0.0.1', 0), SlackHandler)
+        self.rate_limited = rate_limited
+        self.posted = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/chat.postMessage"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class SlackHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):  # noqa
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.server.rate_limited:
+            self.server.rate_limited -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '7')
+            self.end_headers()
+            return
+        self.server.posted.append((self.headers['Authorization'], body))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'ok': True}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class DigestTests(TestCase):
+    """Digest test class."""
+
+    def setUp(self):
+        self.since = timezone.now() - datetime.timedelta(hours=1)
+        comuni, regioni = SourceType.objects.create(name='Comuni'), SourceType.objects.create(name='Regioni')
+        for n in range(5):
+            Content.objects.create(
+                title=f'Comune {n}', source_type=comuni, url=f'http://www.comune{n}.it',
+                verification_status=Content.STATUS_CHANGED if n % 2 else Content.STATUS_ERROR,
+                verification_error=None if n % 2 else 'Timeout', verified_at=timezone.now()
+            )
+        Content.objects.create(
+            title='Lazio', source_type=regioni, url='http://www.regione.lazio.it',
+            verification_status=Content.STATUS_CHANGED, verified_at=timezone.now()
+        )
+        # not notified: unchanged, or verified before
+        Content.objects.create(
+            title='Umbria', source_type=regioni, url='http://www.regione.umbria.it',
+            verification_status=Content.STATUS_NOT_CHANGED, verified_at=timezone.now()
+        )
+        Content.objects.create(
+            title='Marche', source_type=regioni, url='http://www.regione.marche.it',
+            verification_status=Content.STATUS_CHANGED, verified_at=self.since - datetime.timedelta(minutes=1)
+        )
+
+    def test_digest_groups_by_source_type(self):
+        """The digest counts the changes and errors of each source type, and lists them up to the cap."""
+        with self.assertNumQueries(3):
+            digest = notifications.build_digest(self.since, max_items=4)
+
+        self.assertEqual(digest.subject, "3 contenuti cambiati, 3 errori")
+        comuni, regioni = digest.sections
+        self.assertEqual((comuni.source_type, comuni.changed, comuni.errors), ('Comuni', 2, 3))
+        self.assertEqual(len(comuni.items), 3)
+        self.assertEqual(comuni.omitted, 2)
+        self.assertEqual((regioni.changed, [c.title for c in regioni.items], regioni.omitted), (1, ['Lazio'], 0))
+
+        lines = notifications.render_text(digest)
+        self.assertIn("Comuni: 2 cambiati, 3 errori", lines)
+        self.assertIn("  - [errore] Comune 0 - http://www.comune0.it - Timeout", lines)
+        self.assertIn("  ... e altri 2", lines)
+
+    def test_cap_is_shared(self):
+        """The cap is split among the source types, in turn; smaller sections leave their share to the others."""
+        self.assertEqual(notifications._shares([5, 1, 3], 6), [3, 1, 2])
+        self.assertEqual(notifications._shares([5, 1], 100), [5, 1])
+        self.assertEqual(notifications._shares([5, 1, 3], 2), [1, 1, 0])
+
+    def test_empty_digest(self):
+        """Digests with nothing to notify are false."""
+        self.assertFalse(notifications.build_digest(timezone.now()))
+
+    def test_email_over_a_single_connection(self):
+        """The digest is sent to each recipient, over a single SMTP connection."""
+        server = SMTPStandIn()
+        self.addCleanup(server.stop)
+        connection = get_connection(
+            'django.core.mail.backends.smtp.EmailBackend', host='127.0.0.1', port=server.port, use_tls=False
+        )
+        recipients = ['a@example.com', 'b@example.com', 'c@example.com']
+
+        sent = notifications.send_email(notifications.build_digest(self.since), recipients, connection=connection)
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(server.connections, 1)
+        self.assertEqual([to for to, _ in server.messages], [[r] for r in recipients])
+        message = server.messages[0][1]
+        self.assertTrue(message['Subject'].endswith("3 contenuti cambiati, 3 errori"))
+        self.assertIn("Regioni: 1 cambiati, 0 errori", message.get_payload())
+
+    def test_slack_chunks_and_rate_limits(self):
+        """The digest is posted on Slack in chunks, spaced by the minimum interval, retrying rate limited posts."""
+        server = SlackStandIn(rate_limited=1)
+        self.addCleanup(server.stop)
+        clock = FakeClock()
+        client = notifications.SlackClient(
+            token='xoxb-test', channel='#monitor', api_url=server.url, min_interval=1.0,
+            sleep=clock.sleep, clock=clock
+        )
+
+        posted = client.post_lines([f"riga {n:03}" for n in range(100)], max_length=200)
+
+        self.assertEqual(posted, 5)
+        self.assertEqual(len(server.posted), 5)
+        self.assertEqual(server.posted[0][0], 'Bearer xoxb-test')
+        self.assertEqual(server.posted[0][1]['channel'], '#monitor')
+        self.assertEqual(''.join(body['text'] for _, body in server.posted).count('riga'), 100)
+        # the retry after 7s, then one second between the posts
+        self.assertEqual(clock.sleeps, [7.0, 1.0, 1.0, 1.0, 1.0])
+
+
+class ChunkLinesTests(SimpleTestCase):
+    """chunk_lines test class."""
+
+    def test_chunk_lines(self):
+        """Lines are packed in chunks within the length, long lines are truncated."""
+        self.assertEqual(notifications.chunk_lines(['aaa', 'bb', 'c', 'dddddd'], 6), ['aaa\nbb', 'c', 'dddddd'])
+        self.assertEqual(notifications.chunk_lines(['x' * 10], 4), ['xxxx'])
+        self.assertEqual(notifications.chunk_lines([], 4), [])
+
+
+class ParseSinceTests(SimpleTestCase):
+    """parse_since test class."""
+
+    def test_parse_since(self):
+        """Times with no offset are in the current time zone, the others keep theirs."""
+        with timezone.override('Europe/Rome'):
+            since = notifications.parse_since('2026-10-19T08:00')
+        self.assertEqual(since, datetime.datetime(2026, 10, 19, 6, 0, tzinfo=datetime.timezone.utc))
+        self.assertEqual(
+            notifications.parse_since('2026-10-19T08:00+00:00'),
+            datetime.datetime(2026, 10, 19, 8, 0, tzinfo=datetime.timezone.utc)
+        )
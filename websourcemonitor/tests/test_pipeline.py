@@ -0,0 +1,177 @@
+"""Verification pipeline tests."""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError
+from django.test import SimpleTestCase, TestCase
+
+from websourcemonitor.models import Content, SourceType, StatusCounter, StatusCounterManager
+from websourcemonitor.services.circuit_breaker import HostCircuitBreaker
+from websourcemonitor.services.pipeline import VerificationPipeline
+from websourcemonitor.services.processing import diff_stats, process
+from websourcemonitor.services.results import VerificationResult
+from websourcemonitor.services.retry import RetryQueue
+
+
+class FakeRawWrapper:
+    """Returns canned raw results for each url: the extracted fragments, or an error message."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.fetched = 0
+
+    def get_live_content(self, url, selector, output_format, raw=False, **kwargs):
+        self.fetched += 1
+        status, payload = self.responses[url].pop(0)
+        if status == 200 and raw:
+            return VerificationResult(status, None, fragments=payload)
+        return VerificationResult(status, payload)
+
+
+class ProcessingTests(SimpleTestCase):
+    """Fragments processing test class."""
+
+    def test_process_renders_fragments(self):
+        """Fragments are cleaned into the content, and compared with the stored one."""
+        data = process(['  Sindaco ', 'Mario Rossi'], 'text', 'http://example.com', True, None, 'Sindaco\nLuca Verdi')
+
+        self.assertEqual(data['content'], 'Sindaco\nMario Rossi')
+        self.assertEqual(data['diff_stats'], {'added': 1, 'removed': 1})
+
+    def test_process_keeps_content_without_fragments(self):
+        """Results with no fragments (unchanged sections) keep their content."""
+        data = process(None, 'text', 'http://example.com', True, 'Sindaco', 'Sindaco')
+
+        self.assertEqual(data, {'content': 'Sindaco', 'diff_stats': {'added': 0, 'removed': 0}})
+
+    def test_diff_stats_of_empty_contents(self):
+        """Missing contents count as empty."""
+        self.assertEqual(diff_stats(None, 'a\nb'), {'added': 2, 'removed': 0})
+
+
+class VerificationPipelineTests(TestCase):
+    """VerificationPipeline test class."""
+
+    def setUp(self):
+        cache.clear()
+        self.source_type = SourceType.objects.create(name='Test')
+
+    def create(self, n, content='Sindaco\nMario Rossi'):
+        return Content.objects.create(
+            title=f'Fonte {n}', source_type=self.source_type, url=f'http://www.comune{n}.it/giunta', content=content
+        )
+
+    def test_contents_are_processed_and_saved_in_order(self):
+        """Fetched fragments are processed, compared and saved, in the order of the contents."""
+        same, changed = self.create(1), self.create(2)
+        pw = FakeRawWrapper({
+            same.url: [(200, ['Sindaco ', ' Mario Rossi'])],
+            changed.url: [(200, ['Sindaco', 'Maria Bianchi'])],
+        })
+
+        verified = list(VerificationPipeline(processes=0, playwright_wrapper=pw).run([same, changed]))
+
+        self.assertEqual(verified, [(same, None), (changed, None)])
+        self.assertEqual(Content.objects.get(pk=same.pk).verification_status, Content.STATUS_NOT_CHANGED)
+        changed.refresh_from_db()
+        self.assertEqual(changed.verification_status, Content.STATUS_CHANGED)
+        self.assertEqual(changed.next_content, 'Sindaco\nMaria Bianchi')
+        self.assertEqual(changed.status_code, 200)
+
+    def test_dry_run_saves_nothing(self):
+        """Without commit, the verifications are set on the contents, and not saved."""
+        content = self.create(1)
+        pw = FakeRawWrapper({content.url: [(200, ['Sindaco', 'Maria Bianchi'])]})
+
+        verified = list(VerificationPipeline(processes=0, commit=False, playwright_wrapper=pw).run([content]))
+
+        self.assertEqual(verified, [(content, None)])
+        self.assertEqual(content.verification_status, Content.STATUS_CHANGED)
+        self.assertIsNone(Content.objects.get(pk=content.pk).verification_status)
+
+    def test_failed_batches_are_saved_one_by_one(self):
+        """When saving a batch fails, its contents are saved one by one, and the offending ones reported."""
+        good, bad = self.create(1), self.create(2)
+        # a negative status code violates the column's check constraint
+        pw = FakeRawWrapper({good.url: [(200, ['Sindaco', 'Mario Rossi'])], bad.url: [(-1, 'Errore')]})
+
+        verified = dict(VerificationPipeline(processes=0, playwright_wrapper=pw).run([good, bad]))
+
+        self.assertIsNone(verified[good])
+        self.assertIsInstance(verified[bad], IntegrityError)
+        counters = dict(StatusCounter.objects.values_list('verification_status', 'count'))
+        self.assertEqual(counters[Content.STATUS_NOT_CHANGED], 1)
+        self.assertEqual(counters[StatusCounter.NOT_VERIFIED], 1)
+
+    def test_failed_batches_keep_the_counters(self):
+        """Contents moved between the counters by a batch rolled back are moved again when saved one by one."""
+        contents = [self.create(n) for n in range(2)]
+        pw = FakeRawWrapper({c.url: [(200, ['Sindaco', 'Maria Bianchi'])] for c in contents})
+        add, calls = StatusCounterManager.add, []
+
+        def add_failing_once(manager, deltas):
+            calls.append(deltas)
+            if len(calls) == 1:
+                raise DatabaseError("deadlock detected")
+            return add(manager, deltas)
+
+        with patch.object(StatusCounterManager, 'add', add_failing_once):
+            verified = list(VerificationPipeline(processes=0, playwright_wrapper=pw).run(contents))
+
+        self.assertEqual(verified, [(content, None) for content in contents])
+        self.assertEqual(
+            dict(StatusCounter.objects.filter(count__gt=0).values_list('verification_status', 'count')),
+            {Content.STATUS_CHANGED: 2}
+        )
+
+    def test_processing_in_a_process_pool(self):
+        """Fragments are processed by a pool of processes."""
+        content = self.create(1)
+        pw = FakeRawWrapper({content.url: [(200, ['Sindaco', 'Maria Bianchi'])]})
+
+        list(VerificationPipeline(processes=1, playwright_wrapper=pw).run([content]))
+
+        self.assertEqual(Content.objects.get(pk=content.pk).next_content, 'Sindaco\nMaria Bianchi')
+        self.assertEqual(content.diff_stats, {'added': 1, 'removed': 1})
+
+    def test_retries_and_skips(self):
+        """Transient failures are retried in the fetch stage, unreachable hosts are skipped."""
+        flaky, down, other = self.create(1), self.create(2), self.create(3)
+        other.url = down.url + '/consiglio'
+        pw = FakeRawWrapper({
+            flaky.url: [(503, 'Service Unavailable'), (200, ['Sindaco', 'Mario Rossi'])],
+            down.url: [(990, 'Timeout')],
+        })
+
+        list(VerificationPipeline(
+            processes=0, retry_queue=RetryQueue(max_attempts=2, backoff_base=0),
+            circuit_breaker=HostCircuitBreaker(threshold=1, cooldown=3600), playwright_wrapper=pw
+        ).run([flaky, down, other]))
+
+        self.assertEqual(Content.objects.get(pk=flaky.pk).verification_status, Content.STATUS_NOT_CHANGED)
+        self.assertEqual(Content.objects.get(pk=down.pk).verification_status, Content.STATUS_ERROR)
+        self.assertEqual(Content.objects.get(pk=other.pk).verification_status, Content.STATUS_SKIPPED)
+
+    def test_backpressure_bounds_fetched_contents(self):
+        """The fetch stage does not run ahead of the persist stage by more than the queues hold."""
+        contents = [self.create(n) for n in range(20)]
+        pw = FakeRawWrapper({c.url: [(200, ['Sindaco', 'Mario Rossi'])] for c in contents})
+
+        ahead = []
+        for persisted, _ in enumerate(VerificationPipeline(
+            processes=0, queue_size=2, batch_size=1, playwright_wrapper=pw
+        ).run(contents), 1):
+            ahead.append(pw.fetched - persisted)
+
+        self.assertEqual(pw.fetched, 20)
+        self.assertLessEqual(max(ahead), 2 * 2 + 1)
+
+    def test_stopping_early(self):
+        """Leaving the pipeline early stops the fetch stage."""
+        contents = [self.create(n) for n in range(20)]
+        pw = FakeRawWrapper({c.url: [(200, ['Sindaco', 'Mario Rossi'])] for c in contents})
+
+        for _ in VerificationPipeline(processes=0, queue_size=2, playwright_wrapper=pw).run(contents):
+            break
+
+        self.assertLess(pw.fetched, 20)
@@ -0,0 +1,86 @@
+"""Proxy pool tests."""
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.proxy_pool import Proxy, ProxyPool
+from websourcemonitor.services.results import VerificationResult
+from websourcemonitor.services.wrapper_pool import WrapperPool
+
+
+class ProxyPoolTests(SimpleTestCase):
+    """ProxyPool test class."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.first = Proxy('http://proxy1.test:3128', max_concurrency=1)
+        self.second = Proxy('http://proxy2.test:3128', max_concurrency=1)
+        self.pool = ProxyPool([self.first, self.second], eviction_threshold=0.5, eviction_time=60,
+                              clock=lambda: self.now)
+
+    def test_concurrency_limits(self):
+        """Proxies with no free slots are not assigned; acquiring times out when all are busy."""
+        acquired = {self.pool.acquire(), self.pool.acquire()}
+
+        self.assertEqual(acquired, {self.first, self.second})
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.01)
+
+    def test_traffic_goes_to_faster_proxies(self):
+        """The proxy with the best success rate and latency is preferred."""
+        self.pool.release(self.pool.acquire(), 200, 5.0)
+
+        self.assertIs(self.pool.acquire(), self.second)
+
+    def test_failing_proxies_are_evicted_temporarily(self):
+        """Proxies failing too often are not used until their eviction ends."""
+        for _ in range(5):
+            self.first.in_flight += 1
+            self.pool.release(self.first, 990, 0.1)
+
+        self.assertGreater(self.first.evicted_until, self.now)
+        self.assertIs(self.pool.acquire(), self.second)
+
+        self.now = 61
+        self.assertIs(self.pool.acquire(), self.first)
+
+    def test_all_evicted_proxies_are_still_used(self):
+        """When all proxies are evicted, the first coming back is used."""
+        self.first.evicted_until = 10
+        self.second.evicted_until = 20
+
+        self.assertIs(self.pool.acquire(), self.first)
+
+
+class FakeWrapper:
+    def __init__(self, browser_set=None, use_proxy=False, proxy=None, **kwargs):
+        self.browser_set = browser_set
+        self.proxy = proxy
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+class WrapperPoolTests(SimpleTestCase):
+    """WrapperPool test class."""
+
+    def setUp(self):
+        self.proxy_pool = ProxyPool([Proxy('http://proxy1.test:3128')])
+        self.wrappers = WrapperPool(self.proxy_pool, wrapper_class=FakeWrapper)
+
+    def test_wrappers_are_shared_by_browser_and_proxy(self):
+        """A browser is launched once for each browser and proxy pair."""
+        with self.wrappers.lease('chrome', use_proxy=True) as (proxied, report):
+            report(VerificationResult(200, 'Giunta', response_time=0.5))
+        with self.wrappers.lease('chrome', use_proxy=True) as (proxied_again, _):
+            pass
+        with self.wrappers.lease('chrome') as (direct, _):
+            pass
+
+        self.assertIs(proxied, proxied_again)
+        self.assertEqual(proxied.proxy['url'], 'http://proxy1.test:3128')
+        self.assertIsNone(direct.proxy)
+        self.assertEqual(self.proxy_pool.proxies[0].samples, 2)
+        self.assertEqual(self.proxy_pool.proxies[0].in_flight, 0)
+
+        self.wrappers.stop()
+        self.assertTrue(proxied.stopped and direct.stopped)
@@ -0,0 +1,43 @@
+"""Verification results tests."""
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.results import VerificationResult, STATUS_NOT_TRANSFERRED
+
+
+class VerificationResultTests(SimpleTestCase):
+    """VerificationResult test class."""
+
+    def test_unpacks_as_status_and_content(self):
+        """Results can still be unpacked as (status, content) tuples."""
+        status, content = VerificationResult(200, 'Sindaco', response_time=0.5)
+
+        self.assertEqual((status, content), (200, 'Sindaco'))
+
+    def test_is_slotted(self):
+        """Results have no instance dict, and reject unknown attributes."""
+        result = VerificationResult(200, 'Sindaco')
+
+        self.assertFalse(hasattr(result, '__dict__'))
+        with self.assertRaises(AttributeError):
+            result.meat = 'Sindaco'
+
+    def test_as_dict_round_trip(self):
+        """Results survive a round trip through plain dicts, without the page html."""
+        result = VerificationResult(
+            200, 'Sindaco', fingerprint='abcd1234-7:00', page_html='<html></html>',
+            final_url='https://www.comune.test.it/giunta/', redirect_chain=['http://www.comune.test.it/giunta'],
+            response_time=1.25, response_size=2048, match_count=1
+        )
+
+        restored = VerificationResult.from_dict(result.as_dict())
+
+        self.assertIsNone(restored.page_html)
+        self.assertEqual(restored.redirect_chain, ('http://www.comune.test.it/giunta',))
+        self.assertTrue(restored.redirected)
+        self.assertEqual(restored.as_dict(), result.as_dict())
+
+    def test_ok(self):
+        """Success statuses include the not transferred one, which is no HTTP status."""
+        self.assertTrue(VerificationResult(STATUS_NOT_TRANSFERRED, None).ok)
+        self.assertFalse(VerificationResult(304, 'Not Modified').ok)
+        self.assertFalse(VerificationResult(900, 'Selettore non trovato').ok)
@@ -0,0 +1,234 @@
+"""Deferred retries tests."""
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from websourcemonitor.models import Content, SourceType
+from websourcemonitor.services.circuit_breaker import HostCircuitBreaker
+from websourcemonitor.services.deadline import RunDeadline
+from websourcemonitor.services.results import VerificationResult
+from websourcemonitor.services.retry import RetryQueue, verify_with_retries
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RetryQueueTests(SimpleTestCase):
+    """RetryQueue test class."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.queue = RetryQueue(max_attempts=3, backoff_base=10, backoff_max=15,
+                                clock=self.clock, sleep=self.clock.sleep)
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Delays double at each attempt, up to the maximum."""
+        self.assertEqual([self.queue.backoff(n) for n in (1, 2, 3)], [10, 15, 15])
+
+    def test_items_without_attempts_left_are_not_queued(self):
+        """Items are not queued after their last attempt."""
+        self.assertTrue(self.queue.push('a', attempt=2))
+        self.assertFalse(self.queue.push('b', attempt=3))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_pop_waits_until_due(self):
+        """Items are returned in due order, waiting only if they are not due yet."""
+        self.queue.push('a', attempt=2)
+        self.queue.push('b', attempt=1)
+        self.clock.now = 4
+
+        self.assertEqual(self.queue.pop(), ('b', 2))
+        self.assertEqual(self.clock.slept, [6])
+        self.assertEqual(self.queue.pop(), ('a', 3))
+
+
+class FakeWrapper:
+    """Returns canned results, or status and content pairs, for each url (raising the exceptions),
+    taking `duration` seconds of the clock, if any."""
+
+    def __init__(self, responses, clock=None, duration=0):
+        self.responses = responses
+        self.clock = clock
+        self.duration = duration
+        self.timeouts = []
+
+    def get_live_content(self, url, selector, output_format, **kwargs):
+        self.timeouts.append(kwargs.get('timeout'))
+        if self.clock is not None:
+            self.clock.now += self.duration
+        response = self.responses[url].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if isinstance(response, VerificationResult):
+            return response
+        return VerificationResult(*response)
+
+
+class VerifyWithRetriesTests(TestCase):
+    """verify_with_retries test class."""
+
+    def setUp(self):
+        cache.clear()
+        source_type = SourceType.objects.create(name='Test')
+        self.flaky = Content.objects.create(
+            title='Flaky', source_type=source_type, url='http://flaky.test.it/', content='Giunta'
+        )
+        self.down = Content.objects.create(
+            title='Down', source_type=source_type, url='http://down.test.it/', content='Giunta'
+        )
+        self.queue = RetryQueue(max_attempts=3, backoff_base=0)
+
+    def test_transient_failures_are_retried_after_main_pass(self):
+        """Contents failing transiently are verified again after the others, and saved only when final."""
+        pw = FakeWrapper({
+            'http://flaky.test.it/': [(503, 'Service Unavailable'), (200, 'Giunta')],
+            'http://down.test.it/': [(990, 'Timeout'), (990, 'Timeout'), (990, 'Timeout')],
+        })
+
+        verified = [(c.title, error) for c, error in verify_with_retries(
+            [self.flaky, self.down], self.queue, playwright_wrapper=pw
+        )]
+
+        self.assertEqual(verified, [('Flaky', None), ('Down', None)])
+        self.assertEqual(Content.objects.get(pk=self.flaky.pk).verification_status, Content.STATUS_NOT_CHANGED)
+        self.assertEqual(Content.objects.get(pk=self.down.pk).verification_status, Content.STATUS_ERROR)
+        self.assertEqual(self.down.retry_attempts, 3)
+
+    def test_retries_left_for_a_later_call(self):
+        """Without drain_retries, the retries are left in the queue, and fetched by the next call."""
+        pw = FakeWrapper({
+            'http://flaky.test.it/': [(503, 'Service Unavailable'), (200, 'Giunta')],
+            'http://down.test.it/': [(200, 'Giunta')],
+        })
+
+        first = [c.title for c, _ in verify_with_retries([self.flaky], self.queue, drain_retries=False,
+                                                         playwright_wrapper=pw)]
+        second = [c.title for c, _ in verify_with_retries([self.down], self.queue, drain_retries=False,
+                                                          playwright_wrapper=pw)]
+        last = [c.title for c, _ in verify_with_retries([], self.queue, playwright_wrapper=pw)]
+
+        self.assertEqual((first, second, last), ([], ['Down'], ['Flaky']))
+        self.assertEqual(self.flaky.retry_attempts, 2)
+
+    def test_dry_run_saves_nothing(self):
+        """Without commit, the verifications are set on the contents, and not saved, nor their pages captured."""
+        pw = FakeWrapper({
+            'http://flaky.test.it/': [VerificationResult(200, 'Giunta\nSindaco', page_html='<html></html>')]
+        })
+
+        list(verify_with_retries([self.flaky], self.queue, commit=False, playwright_wrapper=pw, capture_html=True))
+
+        self.assertEqual(self.flaky.verification_status, Content.STATUS_CHANGED)
+        self.assertIsNone(Content.objects.get(pk=self.flaky.pk).verification_status)
+        self.assertFalse(self.flaky.raw_captures.exists())
+
+    def test_permanent_failures_are_not_retried(self):
+        """Non transient failures are saved at once."""
+        pw = FakeWrapper({'http://flaky.test.it/': [(404, 'Pagina non trovata')]})
+
+        list(verify_with_retries([self.flaky], self.queue, playwright_wrapper=pw))
+
+        self.assertEqual(Content.objects.get(pk=self.flaky.pk).status_code, 404)
+
+    def test_contents_of_unreachable_hosts_are_skipped(self):
+        """Once the host's circuit is open, its other contents are skipped; pending retries fail."""
+        source_type = SourceType.objects.first()
+        other = Content.objects.create(
+            title='Down too', source_type=source_type, url='http://down.test.it/consiglio', content='Consiglio'
+        )
+        pw = FakeWrapper({'http://down.test.it/': [(990, 'Timeout')]})
+        breaker = HostCircuitBreaker(threshold=1, cooldown=3600)
+
+        list(verify_with_retries([self.down, other], self.queue, breaker, playwright_wrapper=pw))
+
+        self.assertEqual(Content.objects.get(pk=other.pk).verification_status, Content.STATUS_SKIPPED)
+        self.assertEqual(Content.objects.get(pk=self.down.pk).verification_status, Content.STATUS_ERROR)
+        self.assertEqual(Content.objects.get(pk=other.pk).content, 'Consiglio')
+        self.assertEqual(breaker.summary(), {'down.test.it': 1})
+
+    def test_probes_raising_reopen_the_circuit(self):
+        """A probe raising an exception counts as a failure: the host is not left half-open."""
+        other = Content.objects.create(
+            title='Down too', source_type=SourceType.objects.first(), url='http://down.test.it/consiglio',
+            content='Consiglio'
+        )
+        pw = FakeWrapper({
+            'http://down.test.it/': [(404, 'Pagina non trovata')],
+            'http://down.test.it/consiglio': [RuntimeError('browser crashed')],
+        })
+        breaker = HostCircuitBreaker(threshold=1, cooldown=0)
+        breaker.record(self.down.url, 990)
+
+        outcomes = dict(verify_with_retries([other, self.down], self.queue, breaker, playwright_wrapper=pw))
+
+        self.assertIsInstance(outcomes[other], RuntimeError)
+        # the circuit opened again, and let the next content through as a new probe, instead of skipping it
+        self.assertEqual(Content.objects.get(pk=self.down.pk).status_code, 404)
+        self.assertEqual(breaker.summary(), {})
+
+    def test_contents_after_the_deadline_are_skipped(self):
+        """Once the deadline expires, contents are left as they are, and recorded as skipped."""
+        clock = FakeClock()
+        deadline = RunDeadline(15, clock=clock)
+        pw = FakeWrapper({'http://flaky.test.it/': [(200, 'Giunta')]}, clock=clock, duration=20)
+
+        verified = [c for c, _ in verify_with_retries([self.flaky, self.down], self.queue, deadline=deadline,
+                                                      playwright_wrapper=pw)]
+
+        self.assertEqual(verified, [self.flaky])
+        self.assertEqual(deadline.skipped, [self.down])
+        self.assertIsNone(Content.objects.get(pk=self.down.pk).verified_at)
+        self.assertEqual(pw.timeouts, [10])
+
+    def test_retries_due_after_the_deadline_are_final(self):
+        """Retries that would be due after the deadline are not waited for: the last failure is final."""
+        clock = FakeClock()
+        queue = RetryQueue(max_attempts=3, backoff_base=60, clock=clock, sleep=clock.sleep)
+        deadline = RunDeadline(30, clock=clock)
+        pw = FakeWrapper({'http://down.test.it/': [(990, 'Timeout')]}, clock=clock, duration=5)
+
+        list(verify_with_retries([self.down], queue, deadline=deadline, playwright_wrapper=pw))
+
+        self.assertEqual(clock.slept, [])
+        self.assertEqual(Content.objects.get(pk=self.down.pk).verification_status, Content.STATUS_ERROR)
+        self.assertEqual(self.down.retry_attempts, 1)
+
+
+class RunDeadlineTests(SimpleTestCase):
+    """RunDeadline test class."""
+
+    def test_cap_shortens_timeouts_to_the_time_left(self):
+        """Timeouts never exceed the time left to the deadline."""
+        clock = FakeClock()
+        deadline = RunDeadline(60, clock=clock)
+        clock.now = 55
+
+        self.assertEqual(deadline.cap(None, 10), 5)
+        self.assertEqual(deadline.cap(3, 10), 3)
+        self.assertFalse(deadline.expired())
+        clock.now = 60
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+
+    def test_too_little_time_left(self):
+        """Less than the minimum timeout left counts as expired, and timeouts are never shorter than that."""
+        clock = FakeClock()
+        deadline = RunDeadline(60, clock=clock, min_timeout=1.0)
+        clock.now = 59.9995
+
+        self.assertTrue(deadline.expired())
+        self.assertTrue(deadline.expires_before(59.5))
+        self.assertEqual(deadline.cap(None, 10), 1.0)
+        clock.now = 60
+        self.assertEqual(deadline.cap(3, 10), 1.0)
@@ -0,0 +1,106 @@
+"""Scheduler service tests."""
+import threading
+import time
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.scheduler import WorkerPool, due_between, slot_offset
+
+DAY = 24 * 3600
+
+
+class SlotTests(SimpleTestCase):
+    """Content slots test class."""
+
+    def test_slot_offset_is_deterministic(self):
+        """The same content always gets the same slot, within the period."""
+        self.assertEqual(slot_offset(42, DAY), slot_offset(42, DAY))
+        self.assertNotEqual(slot_offset(42, DAY), slot_offset(43, DAY))
+        self.assertTrue(all(0 <= slot_offset(n, DAY) < DAY for n in range(1000)))
+
+    def test_slots_are_spread_evenly(self):
+        """Slots of consecutive ids are spread uniformly over the period."""
+        hours = Counter(int(slot_offset(n, DAY) // 3600) for n in range(24000))
+
+        self.assertEqual(len(hours), 24)
+        self.assertTrue(all(800 < n < 1200 for n in hours.values()), hours)
+
+    def test_each_content_is_due_once_per_period(self):
+        """Consecutive ticks over a period find each content due exactly once."""
+        ids = list(range(500))
+        start = 1_700_000_123.0
+        due = Counter()
+        for tick in range(48):
+            due.update(due_between(ids, start + tick * 1800, start + (tick + 1) * 1800, DAY))
+
+        self.assertEqual(set(due), set(ids))
+        self.assertEqual(set(due.values()), {1})
+
+    def test_interval_across_periods(self):
+        """Intervals spanning the end of a period find the slots at both sides."""
+        ids = list(range(500))
+        last = max(ids, key=lambda n: slot_offset(n, DAY))
+        first = min(ids, key=lambda n: slot_offset(n, DAY))
+
+        due = due_between(ids, DAY * 100 + slot_offset(last, DAY) - 1, DAY * 101 + slot_offset(first, DAY), DAY)
+
+        self.assertIn(last, due)
+        self.assertIn(first, due)
+
+    def test_long_interval_makes_all_due(self):
+        """After a pause longer than the period, all contents are due."""
+        self.assertEqual(due_between([1, 2, 3], 0, 2 * DAY, DAY), [1, 2, 3])
+
+
+class WorkerPoolTests(SimpleTestCase):
+    """WorkerPool test class."""
+
+    def test_concurrency_is_bounded(self):
+        """No more than `concurrency` items are processed at once, and all are processed."""
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        done = []
+
+        def handler(item):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+                done.append(item)
+
+        pool = WorkerPool(handler, concurrency=3)
+        for n in range(20):
+            pool.submit(n)
+        pool.stop()
+
+        self.assertEqual(sorted(done), list(range(20)))
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_errors_do_not_stop_workers(self):
+        """Items failing with exceptions do not stop the worker threads."""
+        done = []
+
+        def handler(item):
+            if item % 2:
+                raise ValueError(item)
+            done.append(item)
+
+        pool = WorkerPool(handler, concurrency=1)
+        with self.assertLogs('websourcemonitor.services.scheduler', 'ERROR'):
+            for n in range(6):
+                pool.submit(n)
+            pool.join()
+        pool.stop()
+
+        self.assertEqual(done, [0, 2, 4])
+
+    def test_on_exit_called_by_each_thread(self):
+        """Each worker thread calls `on_exit` when stopped."""
+        exited = []
+        pool = WorkerPool(lambda item: None, concurrency=4, on_exit=lambda: exited.append(threading.get_ident()))
+        pool.stop()
+
+        self.assertEqual(len(set(exited)), 4)
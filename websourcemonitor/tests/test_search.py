@@ -0,0 +1,150 @@
+"""Full-text search tests."""
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from websourcemonitor import search
+from websourcemonitor.admin import ContentAdmin
+from websourcemonitor.models import Content, ContentSearch, SourceType
+
+
+class SearchHelpersTests(SimpleTestCase):
+    """Search helpers test class."""
+
+    def test_fts_match_quotes_words(self):
+        """FTS5 syntax in the query is neither parsed nor rejected, words are quoted."""
+        self.assertEqual(search.fts_match('Assessore "Rossi" -OR- NEAR(x'), '"assessore" "rossi" "or" "near" "x"')
+
+    def test_snippet(self):
+        """The first line with one of the words is returned."""
+        text = 'Giunta comunale\nSindaco Mario Rossi\nAssessore Luca Verdi'
+        self.assertEqual(search.snippet(text, 'verdi rossi'), 'Sindaco Mario Rossi')
+        self.assertEqual(search.snippet(text, 'bianchi'), '')
+
+
+class ContentSearchTests(TestCase):
+    """ContentSearch test class."""
+
+    def setUp(self):
+        self.source_type = SourceType.objects.create(name='Comuni')
+        self.rossi = Content.objects.create(
+            title='Giunta di Roma', source_type=self.source_type, url='http://www.comune.roma.it/giunta',
+            content='Sindaco Mario Rossi\nAssessore al bilancio Luca Verdi'
+        )
+        self.bianchi = Content.objects.create(
+            title='Giunta di Milano', source_type=self.source_type, url='http://www.comune.milano.it/giunta',
+            content='Sindaco Anna Bianchi', notes='Assessori in aggiornamento'
+        )
+
+    def test_sqlite_uses_fts5(self):
+        """The test db, SQLite, has its FTS5 index."""
+        self.assertEqual(search.backend(), 'fts5')
+
+    def test_search_captured_content(self):
+        """Contents are found by the words of their text, all of them."""
+        self.assertEqual(list(Content.objects.search('assessore verdi')), [self.rossi])
+        self.assertEqual(list(Content.objects.search('SINDACO').order_by('id')), [self.rossi, self.bianchi])
+        self.assertEqual(list(Content.objects.search('assessore bianchi')), [])
+
+    def test_search_title_notes_and_errors(self):
+        """Titles, notes and verification errors are searched too."""
+        self.bianchi.verification_error = 'Timeout 30000ms exceeded'
+        self.bianchi.save(update_fields=['verification_error'])
+
+        self.assertEqual(list(Content.objects.search('milano')), [self.bianchi])
+        self.assertEqual(list(Content.objects.search('aggiornamento')), [self.bianchi])
+        self.assertEqual(list(Content.objects.search('timeout')), [self.bianchi])
+
+    def test_search_diacritics(self):
+        """Accented letters match their plain version."""
+        self.rossi.notes = 'Città metropolitana'
+        self.rossi.save()
+
+        self.assertEqual(list(Content.objects.search('citta')), [self.rossi])
+
+    def test_index_follows_changes(self):
+        """The index follows the changes of the contents, and their deletion."""
+        self.rossi.next_content = 'Sindaco Maria Neri'
+        self.rossi.save()
+        self.assertEqual(list(Content.objects.search('neri')), [self.rossi])
+
+        self.rossi.content, self.rossi.next_content = 'Sindaco Maria Neri', None
+        self.rossi.save()
+        self.assertEqual(list(Content.objects.search('verdi')), [])
+
+        self.rossi.delete()
+        self.assertEqual(list(Content.objects.search('neri')), [])
+        self.assertEqual(list(Content.objects.search('sindaco')), [self.bianchi])
+
+    def test_no_plain_copy(self):
+        """On SQLite, the index reads the text from the contents: no documents are stored."""
+        self.assertEqual(ContentSearch.objects.count(), 0)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT document FROM {search.VIEW} WHERE content_id = %s", (self.rossi.pk, ))
+            self.assertIn('Assessore al bilancio Luca Verdi', cursor.fetchone()[0])
+
+    def test_unchanged_text_is_not_indexed_again(self):
+        """Saving the indexed fields with the same values does not touch the index."""
+        def changes(**values):
+            for field, value in values.items():
+                setattr(self.rossi, field, value)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT total_changes()")
+                before, = cursor.fetchone()
+                self.rossi.save(update_fields=['verified_at', 'content', 'next_content'])
+                cursor.execute("SELECT total_changes()")
+                return cursor.fetchone()[0] - before
+
+        self.assertEqual(changes(verified_at=timezone.now()), 1)
+        self.assertGreater(changes(next_content='Sindaco Maria Neri'), 1)
+
+    def test_restore_triggers(self):
+        """Triggers dropped by migrations copying the contents table are created again, and the index rebuilt."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_insert")
+        neri = Content.objects.create(title='Giunta di Napoli', source_type=self.source_type, url='http://napoli.it')
+
+        search.restore_triggers(None)
+
+        self.assertEqual(list(Content.objects.search('napoli')), [neri])
+
+    def test_unrelated_updates_do_not_reindex(self):
+        """Saving fields out of the documents does not touch the index."""
+        with self.assertNumQueries(1):
+            self.rossi.save(update_fields=['claimed_by'])
+
+    def test_ranked(self):
+        """Ranked searches return the ids of the best matches first, up to the limit."""
+        self.bianchi.notes = 'Sindaco, sindaco, sindaco'
+        self.bianchi.save()
+
+        self.assertEqual(ContentSearch.objects.ranked('sindaco'), [self.bianchi.pk, self.rossi.pk])
+        self.assertEqual(ContentSearch.objects.ranked('sindaco', limit=1), [self.bianchi.pk])
+        self.assertEqual(ContentSearch.objects.ranked('"'), [])
+
+    def test_scan_without_index(self):
+        """Without a full-text index, documents are scanned."""
+        with patch('websourcemonitor.search.backend', return_value='scan'):
+            self.assertEqual(list(Content.objects.search('assessore verdi')), [self.rossi])
+            self.assertEqual(ContentSearch.objects.ranked('giunta'), [self.rossi.pk, self.bianchi.pk])
+
+    def test_admin_search(self):
+        """The admin searches the full-text index."""
+        model_admin = ContentAdmin(Content, admin.site)
+
+        queryset, may_have_duplicates = model_admin.get_search_results(None, Content.objects.all(), 'luca verdi')
+
+        self.assertEqual(list(queryset), [self.rossi])
+        self.assertFalse(may_have_duplicates)
+
+    def test_queries_without_words(self):
+        """Queries with no words match nothing, and are not passed to the index."""
+        model_admin = ContentAdmin(Content, admin.site)
+
+        queryset, _ = model_admin.get_search_results(None, Content.objects.all(), '!!')
+
+        self.assertEqual(list(queryset), [])
+        self.assertEqual(ContentSearch.objects.ranked('!!'), [])
@@ -0,0 +1,80 @@
+"""Snapshots tests."""
+from django.test import TestCase, SimpleTestCase
+
+from websourcemonitor import snapshots
+from websourcemonitor.models import Content, ContentSnapshot, SourceType
+
+
+class DeltaTests(SimpleTestCase):
+    """Delta functions test class."""
+
+    old = ["Sindaco\n", "Mario Rossi\n", "Assessori\n", "Anna Verdi\n", "Luca Neri\n"]
+    new = ["Sindaco\n", "Maria Bianchi\n", "Assessori\n", "Anna Verdi\n", "Paolo Gialli\n", "Luca Neri"]
+
+    def test_apply_delta_reconstructs_new_lines(self):
+        """Applying the delta to the old lines gives the new lines."""
+        delta = snapshots.make_delta(self.old, self.new)
+
+        self.assertEqual(snapshots.apply_delta(self.old, snapshots.loads(snapshots.dumps(delta))), self.new)
+
+    def test_delta_changes_lists_removed_and_added_lines(self):
+        """Changes are described with the removed and added lines."""
+        changes = snapshots.delta_changes(self.old, snapshots.make_delta(self.old, self.new))
+
+        self.assertEqual(changes[0], (2, ["Mario Rossi\n"], ["Maria Bianchi\n"]))
+        self.assertEqual(changes[1], (5, ["Luca Neri\n"], ["Paolo Gialli\n", "Luca Neri"]))
+
+
+class ContentSnapshotTests(TestCase):
+    """ContentSnapshot test class."""
+
+    def setUp(self):
+        self.content = Content.objects.create(
+            title='Test',
+            source_type=SourceType.objects.create(name='Test'),
+            url='http://www.comune.test.it',
+        )
+        self.versions = [
+            "\n".join(f"Assessore {i}: {'Rossi' if i % (v + 2) else 'Bianchi'}" for i in range(30))
+            for v in range(25)
+        ]
+        for text in self.versions:
+            ContentSnapshot.objects.record(self.content, text)
+
+    def test_every_version_can_be_reconstructed(self):
+        """All versions are reconstructed from keyframes and deltas."""
+        for version, text in enumerate(self.versions, start=1):
+            self.assertEqual(ContentSnapshot.objects.get_text(self.content, version), text)
+
+    def test_keyframes_are_stored_every_interval(self):
+        """Whole texts are stored only every SNAPSHOTS_KEYFRAME_INTERVAL versions."""
+        keyframes = [s.version for s in self.content.snapshots.order_by('version') if s.is_keyframe]
+
+        self.assertEqual(keyframes, [1, 11, 21])
+
+    def test_unchanged_text_is_not_recorded(self):
+        """Recording the last text again does not create a new version."""
+        self.assertIsNone(ContentSnapshot.objects.record(self.content, self.versions[-1]))
+        self.assertEqual(self.content.snapshots.count(), 25)
+
+    def test_timeline_reuses_stored_deltas(self):
+        """The timeline lists, for each version, the changes stored in its delta."""
+        timeline = list(ContentSnapshot.objects.timeline(self.content, from_version=12))
+
+        self.assertEqual([s.version for s, _ in timeline], list(range(12, 26)))
+        old_lines = self.versions[10].splitlines(keepends=True)
+        new_lines = self.versions[11].splitlines(keepends=True)
+        self.assertEqual(
+            timeline[0][1], snapshots.delta_changes(old_lines, snapshots.make_delta(old_lines, new_lines))
+        )
+
+    def test_update_records_snapshot(self):
+        """Updating the content records the promoted text."""
+        content = Content.objects.create(
+            title='Test2', source_type=self.content.source_type, url='http://www.comune.test.it',
+            next_content='Sindaco\nMario Rossi', verification_status=Content.STATUS_CHANGED
+        )
+
+        content.update()
+
+        self.assertEqual(ContentSnapshot.objects.get_text(content, 1), 'Sindaco\nMario Rossi')
@@ -0,0 +1,75 @@
+"""Startup cost tests: loading the models must not load the fetch engine."""
+import json
+import os
+import subprocess
+import sys
+from django.test import SimpleTestCase
+
+from websourcemonitor.services import engine
+
+# heavy modules, only needed when contents are fetched
+HEAVY_MODULES = ('playwright', 'bs4')
+
+# generous budget for setting django up, models included, in seconds (it takes less than half a second)
+SETUP_TIME_BUDGET = 3.0
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+import websourcemonitor.models
+setup_time = time.perf_counter() - started
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({
+    'modules': sorted(name for name in sys.modules if name.split('.')[0] in %r),
+    'setup_time': setup_time,
+}))
+""" % (HEAVY_MODULES, )
+
+
+def run_probe(*imports):
+    """Set up django in a fresh interpreter, import the models (and `imports`), and return the probe's report."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    process = subprocess.run(
+        [sys.executable, '-c', PROBE] + list(imports), env=env, capture_output=True, text=True, timeout=120
+    )
+    if process.returncode:
+        raise AssertionError(process.stderr)
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+class StartupTests(SimpleTestCase):
+    """Startup cost regression test class."""
+
+    def test_models_do_not_import_heavy_modules(self):
+        """Loading the models imports neither playwright nor bs4."""
+        report = run_probe()
+        self.assertEqual(report['modules'], [])
+
+    def test_setup_time_within_budget(self):
+        """Setting django up, models included, stays within the time budget."""
+        report = run_probe()
+        self.assertLess(report['setup_time'], SETUP_TIME_BUDGET)
+
+    def test_heavy_modules_are_imported_later(self):
+        """The heavy modules are missing from sys.modules after the setup, and only show up once imported."""
+        self.assertEqual(run_probe()['modules'], [])
+        for name in HEAVY_MODULES:
+            with self.subTest(name):
+                self.assertIn(name, run_probe(name)['modules'])
+
+
+class EngineTests(SimpleTestCase):
+    """Fetch engine loading test class."""
+
+    def test_get_engine_class_imports_by_path(self):
+        """The engine class is imported from its dotted path, PlaywrightWrapper by default."""
+        from websourcemonitor.services.playwright import PlaywrightWrapper
+        from websourcemonitor.tests.test_models import FakePlaywrightWrapper
+
+        self.assertIs(engine.get_engine_class(), PlaywrightWrapper)
+        self.assertIs(
+            engine.get_engine_class('websourcemonitor.tests.test_models.FakePlaywrightWrapper'), FakePlaywrightWrapper
+        )
@@ -0,0 +1,158 @@
+"""Storage state tests."""
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.playwright import PlaywrightWrapper
+from websourcemonitor.services.storage_state import StorageStateStore, domain_of, filter_state, local_storage_script
+
+STATE = {
+    'cookies': [
+        {'name': 'consent', 'value': 'yes', 'domain': '.comune.test.it', 'path': '/'},
+        {'name': 'tracker', 'value': '1', 'domain': '.ads.test', 'path': '/'},
+    ],
+    'origins': [
+        {'origin': 'https://www.comune.test.it', 'localStorage': [{'name': 'cookiebanner', 'value': 'closed'}]},
+        {'origin': 'https://ads.test', 'localStorage': [{'name': 'id', 'value': '42'}]},
+    ],
+}
+
+
+class StorageStateTests(SimpleTestCase):
+    """StorageStateStore test class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = StorageStateStore(self.tmp_dir.name, ttl=3600)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_domain_of(self):
+        """States are kept per host name."""
+        self.assertEqual(domain_of('https://WWW.Comune.Test.it/giunta?x=1'), 'www.comune.test.it')
+
+    def test_filter_state_keeps_domain_cookies_and_origins(self):
+        """Only cookies sent to the domain, and the localStorage of its origins, are kept."""
+        state = filter_state(STATE, 'www.comune.test.it')
+
+        self.assertEqual([c['name'] for c in state['cookies']], ['consent'])
+        self.assertEqual([o['origin'] for o in state['origins']], ['https://www.comune.test.it'])
+
+    def test_filter_state_keeps_final_domain(self):
+        """States of redirected visits keep the cookies of the domain redirected to as well."""
+        state = filter_state(STATE, 'comune.test', 'ads.test')
+
+        self.assertEqual([c['name'] for c in state['cookies']], ['tracker'])
+        self.assertEqual([o['origin'] for o in state['origins']], ['https://ads.test'])
+
+    def test_empty_states_are_not_saved(self):
+        """States with nothing relevant to the domain are not saved."""
+        self.assertIsNone(self.store.save('www.altro.test.it', STATE))
+        self.assertFalse(os.path.exists(self.store.path_for('www.altro.test.it')))
+
+        state = self.store.save('comune.test.it', STATE, 'www.comune.test.it')
+        self.assertEqual([c['name'] for c in state['cookies']], ['consent'])
+
+    def test_save_and_load(self):
+        """Saved states are loaded back until they expire."""
+        self.store.save('www.comune.test.it', STATE)
+
+        self.assertEqual(len(self.store.load('www.comune.test.it')['cookies']), 1)
+        self.assertIsNone(self.store.load('www.altro.test.it'))
+
+    def test_expired_states_are_removed(self):
+        """States older than the TTL are not loaded, and removed."""
+        self.store.save('www.comune.test.it', STATE)
+        past = time.time() - 7200
+        os.utime(self.store.path_for('www.comune.test.it'), (past, past))
+
+        self.assertIsNone(self.store.load('www.comune.test.it'))
+        self.assertFalse(os.path.exists(self.store.path_for('www.comune.test.it')))
+
+    def test_local_storage_script(self):
+        """The init script restores the localStorage of the current origin only."""
+        script = local_storage_script(filter_state(STATE, 'www.comune.test.it'))
+
+        self.assertIn('"https://www.comune.test.it": [["cookiebanner", "closed"]]', script)
+        self.assertIn('window.location.origin', script)
+
+
+class FakeResponse:
+    def __init__(self, status, url):
+        self.status = status
+        self.url = url
+
+
+class FakeContext:
+    def __init__(self, state):
+        self.state = state
+        self.cookies = []
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    def add_init_script(self, script):
+        pass
+
+    def clear_cookies(self):
+        self.cookies = []
+
+    def storage_state(self):
+        return self.state
+
+
+class FakePage:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def goto(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+class OpenTests(SimpleTestCase):
+    """PlaywrightWrapper.open test class, with the page and the context standing in for the browser's."""
+
+    url = 'https://www.comune.test.it/giunta'
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.pw = PlaywrightWrapper.__new__(PlaywrightWrapper)
+        self.pw.storage_states = StorageStateStore(tmp_dir.name, ttl=3600)
+        self.pw.context_domains = set()
+        self.pw.context = FakeContext(STATE)
+        self.pw.request_timeout = 1000
+        self.detours = []
+
+    def by_pass_with_google(self, url):
+        self.detours.append(url)
+        return FakeResponse(200, url)
+
+    def test_rejected_state_takes_the_detour(self):
+        """When the stored state does not let the page through, it is discarded, and the detour is taken."""
+        self.pw.storage_states.save('www.comune.test.it', {'cookies': [
+            {'name': 'stale', 'value': '1', 'domain': '.comune.test.it', 'path': '/'}
+        ], 'origins': []})
+        self.pw.page = FakePage([FakeResponse(403, self.url)])
+        self.pw.by_pass_with_google = self.by_pass_with_google
+
+        response = self.pw.open(self.url, by_pass_with_google=True)
+
+        self.assertEqual((response.status, self.detours), (200, [self.url]))
+        self.assertNotIn('stale', [c['name'] for c in self.pw.context.cookies])
+        # the state of the successful detour replaces the discarded one
+        saved = self.pw.storage_states.load('www.comune.test.it')
+        self.assertEqual([c['name'] for c in saved['cookies']], ['consent'])
+
+    def test_empty_state_keeps_the_detour(self):
+        """Visits leaving no state for the domain take the detour again, the next time."""
+        self.pw.context = FakeContext({'cookies': [], 'origins': []})
+        self.pw.by_pass_with_google = self.by_pass_with_google
+
+        self.pw.open(self.url, by_pass_with_google=True)
+        self.pw.open(self.url, by_pass_with_google=True)
+
+        self.assertEqual(self.detours, [self.url, self.url])
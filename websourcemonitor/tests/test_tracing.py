@@ -0,0 +1,48 @@
+"""Tracing service tests."""
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from websourcemonitor.services.tracing import prune_traces
+
+
+class PruneTracesTests(SimpleTestCase):
+    """prune_traces test class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_trace(self, name, size, age_days=0):
+        trace = os.path.join(self.path, name)
+        with open(trace, 'wb') as f:
+            f.write(b'x' * size)
+        mtime = time.time() - age_days * 86400
+        os.utime(trace, (mtime, mtime))
+        return trace
+
+    def test_prune_removes_traces_older_than_retention(self):
+        """Traces older than the retention period are removed."""
+        old = self._write_trace('content_1_old.zip', 10, age_days=10)
+        new = self._write_trace('content_1_new.zip', 10)
+
+        removed = prune_traces(self.path, max_size=1000, retention_days=7)
+
+        self.assertEqual(removed, [old])
+        self.assertTrue(os.path.exists(new))
+
+    def test_prune_removes_oldest_traces_above_size_cap(self):
+        """The oldest traces are removed until the total size is below the cap."""
+        oldest = self._write_trace('content_1_a.zip', 100, age_days=3)
+        middle = self._write_trace('content_2_b.zip', 100, age_days=2)
+        newest = self._write_trace('content_3_c.zip', 100, age_days=1)
+
+        removed = prune_traces(self.path, max_size=150, retention_days=7)
+
+        self.assertEqual(removed, [oldest, middle])
+        self.assertTrue(os.path.exists(newest))
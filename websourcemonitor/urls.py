@@ -1,11 +1,14 @@
 # coding=utf-8
 from django.contrib import admin
 from django.urls import path
-from .views import diff, signal
+from .views import diff, search, signal, status_api, timeline
 
 admin.autodiscover()
 
 urlpatterns = [
+    path("api/contents/", status_api, name='status_api'),
     path("diff/<int:content_id>/", diff, name='diff'),
     path("signal/<int:content_id>/", signal, name='signal'),
+    path("search/", search, name='search'),
+    path("timeline/<int:content_id>/", timeline, name='timeline'),
 ]
@@ -1,10 +1,19 @@
 import difflib
+import hashlib
+import json
 
-from django.http import HttpResponseRedirect
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from websourcemonitor.models import Content
+from websourcemonitor import search as full_text
+from websourcemonitor.conf import STATUS_API_PAGE_SIZE, STATUS_API_MAX_PAGE_SIZE
+from websourcemonitor.models import Content, ContentSearch, ContentSnapshot
 from websourcemonitor.signal_form import SignalForm
 
 
@@ -18,7 +27,11 @@ def diff(request, content_id):
     """
 
     obj = Content.objects.get(pk=content_id)
-    (resp_code, resp_content) = obj.verification_status, obj.next_content
+    # next_content is not stored when equal to content
+    if obj.next_content is not None:
+        resp_content = obj.next_content
+    else:
+        resp_content = obj.content or ''
 
     live = resp_content.splitlines(1)
     if obj.content:
@@ -37,6 +50,53 @@ def diff(request, content_id):
     )
 
 
+def timeline(request, content_id):
+    """
+    shows the history of the stored content, version after version,
+    using the deltas stored in the snapshots, without computing diffs
+
+    the `from` GET parameter sets the first version shown
+    """
+    obj = Content.objects.get(pk=content_id)
+    try:
+        from_version = max(int(request.GET.get('from', 1)), 1)
+    except ValueError:
+        from_version = 1
+
+    return render(
+        request,
+        "timeline.html",
+        context={
+            'content': obj,
+            'timeline': list(reversed(list(ContentSnapshot.objects.timeline(obj, from_version)))),
+        }
+    )
+
+
+def search(request):
+    """
+    full-text search of the contents, best matches first,
+    with the line of the text where the words are found
+
+    the `q` GET parameter holds the searched words
+    """
+    query = request.GET.get('q', '').strip()
+    results = []
+    if query:
+        ids = ContentSearch.objects.ranked(query)
+        contents = Content.objects.in_bulk(ids)
+        results = [
+            (contents[content_id], full_text.snippet(full_text.document(contents[content_id]), query))
+            for content_id in ids if content_id in contents
+        ]
+
+    return render(
+        request,
+        "search.html",
+        context={'query': query, 'results': results}
+    )
+
+
 def signal(request, content_id):
     """
     generates a form containing the text area where a user can send
@@ -79,3 +139,62 @@ def signal(request, content_id):
         context={'content': obj, 'signal_form': signal_form}
     )
 
+
+# fields of the contents exposed by the status api
+STATUS_API_FIELDS = (
+    'id', 'title', 'url', 'source_type', 'verification_status', 'verified_at', 'status_code', 'fingerprint'
+)
+
+
+def status_api(request):
+    """
+    read-only JSON list of the contents' verification status,
+    ordered by id, and paginated by keyset: each page links to the next one,
+    starting after the last id of the page
+
+    GET parameters:
+    - `status`: verification status (repeatable)
+    - `source_type`: id of the source type (repeatable)
+    - `after`: only contents with a greater id
+    - `limit`: number of contents in the page (at most STATUS_API_MAX_PAGE_SIZE)
+
+    Responses carry an `ETag` (of the page) and a `Last-Modified` (the last modification of any content);
+    requests with the ETag of an unchanged page get a 304 response.
+    Deleted contents leave no modification time behind, so If-Modified-Since alone is not trusted.
+    """
+    try:
+        statuses = [int(value) for value in request.GET.getlist('status')]
+        source_types = [int(value) for value in request.GET.getlist('source_type')]
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', STATUS_API_PAGE_SIZE)), STATUS_API_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return JsonResponse({'error': f"invalid parameter: {e}"}, status=400)
+    if limit < 1:
+        return JsonResponse({'error': "invalid parameter: limit must be positive"}, status=400)
+
+    contents = Content.objects.filter(id__gt=after)
+    if statuses:
+        contents = contents.filter(verification_status__in=statuses)
+    if source_types:
+        contents = contents.filter(source_type__in=source_types)
+    rows = list(contents.order_by('id').values(*STATUS_API_FIELDS)[:limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['after'] = rows[-1]['id']
+        next_url = request.build_absolute_uri(f"{reverse('status_api')}?{params.urlencode()}")
+    for row in rows:
+        status_code = row.pop('status_code')
+        row['error_code'] = status_code if row['verification_status'] == Content.STATUS_ERROR else None
+
+    body = json.dumps({'results': rows, 'next': next_url}, cls=DjangoJSONEncoder)
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = '"{0}"'.format(hashlib.sha1(body.encode()).hexdigest())
+    last_modified = Content.objects.aggregate(last=Max('modified_at'))['last']
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # clients must revalidate, with their ETag
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=response['ETag'], response=response)